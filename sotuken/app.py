@@ -1,208 +1,296 @@
-from flask import Flask, render_template, request, redirect, session, url_for, send_from_directory
-from logic import control as con
-from logic import spl as db
-from logic.face_auth_core import face_auth_bp, TOLERANCE_THRESHOLD
-from werkzeug.utils import secure_filename
-from logic.file_ops import move_upload_temp_to_user
-import time,os
-import shutil #ファイルを移動させるライブラリ
-
-app = Flask(__name__)
-app.register_blueprint(face_auth_bp)
-app.secret_key = "super_secret_key"
-
-MAX_ATTEMPTS = 3
-LOCKOUT_TIME = 30
-attempts = 0
-lock_until = 0
-
-# ---------------------------------
-# ホーム
-# ---------------------------------
-@app.route("/")
-def home():
-    # ★ログインしている場合は user_id / username を渡す
-    if "user_id" in session and "username" in session:
-        return render_template(
-            "home.html",
-            user_id=session["user_id"],
-            username=session["username"]
-        )
-    return render_template("index.html")
-
-# ---------------------------------
-# 顔認証ページ
-# ---------------------------------
-@app.route("/face_page")
-def face_page():
-    return render_template("face.html",tolerance = TOLERANCE_THRESHOLD, message=None)
-
-@app.route("/face_auth", methods=["POST"])
-def face_auth():
-    
-    return redirect(url_for("login_page"))
-
-# ---------------------------------
-# ログインページ
-# ---------------------------------
-@app.route("/login_page")
-def login_page():
-    return render_template("login.html", message=None)
-
-@app.route("/login", methods=["POST"])
-def login():
-    global attempts, lock_until
-
-    userid = request.form.get("id")
-    input_password = request.form.get("password")
-    now = time.time()
-
-    if not userid.isdigit():
-        return render_template("login.html", message="IDは数値で入力してください")
-    userid = int(userid)
-
-    if now < lock_until:
-        remaining = int(lock_until - now)
-        return render_template(
-            "login.html",
-            message=f"🚨 ロック中です。あと {remaining} 秒お待ちください。"
-        )
-
-    user = db.get_user(userid)  # ★追加（ユーザー名取得）
-    if user and db.authenticate_user(userid, input_password):
-        attempts = 0
-        con.log_event("🟢 ログイン成功")
-
-        # ★ユーザー情報を session に保存
-        session["user_id"] = user.id
-        session["username"] = user.username
-
-        return redirect("/")  # ★home に戻す
-
-    attempts += 1
-    con.log_event(f"⚠️ アクセス回数 ({attempts}/{MAX_ATTEMPTS})")
-
-    if attempts >= MAX_ATTEMPTS:
-        lock_until = time.time() + LOCKOUT_TIME
-        attempts = 0
-        return render_template(
-            "login.html",
-            message=f"🚨 最大試行回数を超えました。{LOCKOUT_TIME} 秒後に再試行できます。"
-        )
-
-    return render_template("login.html", message="IDまたはパスワードが違います")
-
-# ---------------------------------
-# 登録ページ
-# ---------------------------------
-@app.route("/register_page", methods=["GET", "POST"])
-def register_page():
-    if request.method == "POST":
-        face_file = request.files.getlist("face_file")
-        username = request.form.get("full_name")
-        password = request.form.get("password")
-
-        if not face_file or not username or not password:
-            return render_template("register.html", message="全ての欄を入力してください。")
-        
-# 空ファイル対策
-        face_file = [f for f in face_file if f.filename]
-        if not face_file:
-            return render_template("register.html", message="画像を選択してください。")
-
-        # ★ここ追加：名前の重複チェック
-        existing_user = db.get_user_by_name(username)
-        if existing_user:
-            return render_template("register.html", message="⚠️ その名前は既に存在しています")
-
-        user = db.create_user(username, password)
-        if not user:
-            return "⚠️ ユーザー登録に失敗しました"
-
-        if not db.authenticate_user(user.id, password):
-            return "⚠️ パスワード保存に問題があります"
-        
-        # 一時保存フォルダ
-        upload_dir = "upload_temp"
-
-        filenames = []
-
-        for f in face_file:
-            filename = secure_filename(f.filename)
-            save_path = os.path.join(upload_dir, filename)
-            f.save(save_path)
-            filenames.append(filename)
-
-        session["registration"] = {
-            "full_name": username,
-            "face_file": filenames,
-            "password": password,
-            "id": user.id
-        }
-
- # セッションからIDの取得
-        user_id = user.id
-        os.makedirs(f'picture/{user_id}', exist_ok=True)
- # print(f"+++++作成したパス{filepass}+++++")
-        return redirect("/register_confirm")
-
-    return render_template("register.html", message=None)
-
-@app.route("/register_confirm", methods=["GET", "POST"])
-def register_confirm():
-    data = session.get("registration")
-    if not data:
-        return redirect("/register_page")
-    
-    if request.method == "POST":
-        user_id = data["id"]
-        move_upload_temp_to_user(user_id)
-        return redirect("/")
-    
-    return render_template("register_confirm.html", data=data)
-
-#Egg追加
-@app.route("/temp_image/<filename>")
-def temp_image(filename):
-    return send_from_directory("upload_temp",filename)
-
-# ---------------------------------
-# ログアウト
-# ---------------------------------
-@app.route("/logout", methods=["POST"])
-def logout():
-    session.clear()  # セッション情報をすべて削除
-    return redirect("/")  # トップページへ戻す
-
-# ---------------------------------
-# アカウント削除処理
-# ---------------------------------
-@app.route("/delete", methods=["POST"])
-def delete_account():
-    if "user_id" not in session:
-        return redirect("/login_page")
-
-    user_id = session["user_id"]
-
-    if db.delete_user(user_id):   # ← DB削除
-        db.delete_user_picture(user_id)  # ← フォルダ削除
-        session.clear()
-        return render_template("delete_done.html")  # 完了ページへ
-    else:
-        return "削除に失敗しました…"
-
-
-# ---------------------------------
-# 削除確認
-# ---------------------------------
-@app.route("/delete_confirm_page")
-def delete_confirm_page():
-    if "user_id" not in session:
-        return redirect("/login_page")
-
-    user = db.get_user(session["user_id"])
-    return render_template("delete_confirm.html", user=user)
-
-
-if __name__ == "__main__":
+from flask import Flask, render_template, request, redirect, session, url_for, send_from_directory, abort
+from logic import control as con
+from logic import spl as db
+from logic.face_auth_core import (
+    face_auth_bp, TOLERANCE_THRESHOLD, VERIFY_THRESHOLD, get_claimed_user_id, reset_auth_state
+)
+from logic.face_gallery import GALLERY
+from logic.file_ops import (
+    create_staging, discard_staging, commit_staging, staging_dir, set_staging_owner, start_staging_gc,
+    PICTURE_DIR,
+)
+from logic.upload_preprocess import preprocess_uploads
+from logic import metrics
+import time,os
+import threading
+import shutil #ファイルを移動させるライブラリ
+
+app = Flask(__name__)
+app.register_blueprint(face_auth_bp)
+app.secret_key = "super_secret_key"
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def startup():
+    """
+    起動時の処理（1回だけ行う）
+    import しただけでは行わない：spawn で起動したプロセスプールの各ワーカーは
+    このファイルを __mp_main__ として読み込み直すので、そのたびにギャラリーを作り直さないように
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        # 顔ギャラリーを一度だけ構築する
+        GALLERY.refresh()
+        GALLERY.index()       # 大規模時のみ近似インデックスを用意
+        GALLERY.save_index()
+        # 確定されずに放置された登録画像を定期的に消す（作りかけのユーザーも消す）
+        start_staging_gc(on_expire=drop_uncommitted_user)
+        _started = True
+
+
+def drop_uncommitted_user(user_id):
+    """確定されずに登録画像が消えたユーザーを削除する（確定と同時に消えた場合は残す）"""
+    if not user_id.isdigit() or os.path.isdir(os.path.join(PICTURE_DIR, user_id)):
+        return
+    if db.delete_user(int(user_id)):
+        con.log_event(f"⚠️ 確定されなかった登録を削除しました (ID: {user_id})")
+
+
+@app.before_request
+def ensure_startup():
+    # startup() を呼ばずに WSGI サーバーから読み込まれた場合も最初のリクエストで行う
+    if not _started:
+        startup()
+
+MAX_ATTEMPTS = 3
+LOCKOUT_TIME = 30
+attempts = 0
+lock_until = 0
+
+# ---------------------------------
+# ホーム
+# ---------------------------------
+@app.route("/")
+def home():
+    # ★ログインしている場合は user_id / username を渡す
+    if "user_id" in session and "username" in session:
+        return render_template(
+            "home.html",
+            user_id=session["user_id"],
+            username=session["username"]
+        )
+    return render_template("index.html")
+
+# ---------------------------------
+# 顔認証ページ
+# ---------------------------------
+@app.route("/face_page")
+def face_page():
+    reset_auth_state()
+    claim = get_claimed_user_id()
+    tolerance = TOLERANCE_THRESHOLD if claim is None else VERIFY_THRESHOLD
+    return render_template("face.html",tolerance = tolerance, claim=claim, message=None)
+
+@app.route("/face_auth", methods=["POST"])
+def face_auth():
+    
+    return redirect(url_for("login_page"))
+
+# ---------------------------------
+# ログインページ
+# ---------------------------------
+@app.route("/login_page")
+def login_page():
+    return render_template("login.html", message=None)
+
+@app.route("/login", methods=["POST"])
+def login():
+    global attempts, lock_until
+
+    userid = request.form.get("id")
+    input_password = request.form.get("password")
+    now = time.time()
+
+    if not userid.isdigit():
+        return render_template("login.html", message="IDは数値で入力してください")
+    userid = int(userid)
+
+    if now < lock_until:
+        remaining = int(lock_until - now)
+        return render_template(
+            "login.html",
+            message=f"🚨 ロック中です。あと {remaining} 秒お待ちください。"
+        )
+
+    user = db.get_user(userid)  # ★追加（ユーザー名取得）
+    if user and db.authenticate_user(userid, input_password):
+        attempts = 0
+        con.log_event("🟢 ログイン成功")
+
+        # ★ユーザー情報を session に保存
+        session["user_id"] = user.id
+        session["username"] = user.username
+
+        return redirect("/")  # ★home に戻す
+
+    attempts += 1
+    con.log_event(f"⚠️ アクセス回数 ({attempts}/{MAX_ATTEMPTS})")
+
+    if attempts >= MAX_ATTEMPTS:
+        lock_until = time.time() + LOCKOUT_TIME
+        attempts = 0
+        return render_template(
+            "login.html",
+            message=f"🚨 最大試行回数を超えました。{LOCKOUT_TIME} 秒後に再試行できます。"
+        )
+
+    return render_template("login.html", message="IDまたはパスワードが違います")
+
+# ---------------------------------
+# 登録ページ
+# ---------------------------------
+@app.route("/register_page", methods=["GET", "POST"])
+def register_page():
+    if request.method == "POST":
+        face_file = request.files.getlist("face_file")
+        username = request.form.get("full_name")
+        password = request.form.get("password")
+
+        if not face_file or not username or not password:
+            return render_template("register.html", message="全ての欄を入力してください。")
+        
+# 空ファイル対策
+        face_file = [f for f in face_file if f.filename]
+        if not face_file:
+            return render_template("register.html", message="画像を選択してください。")
+
+        # ★ここ追加：名前の重複チェック
+        existing_user = db.get_user_by_name(username)
+        if existing_user:
+            return render_template("register.html", message="⚠️ その名前は既に存在しています")
+
+        # 一時保存フォルダ（登録ごとに分ける。やり直した場合は前回の分を消す）
+        previous = session.pop("registration", None)
+        if previous:
+            discard_staging(previous.get("staging"))
+        staging = create_staging()
+
+        # 画像の縮小・顔の確認・特徴量の作成を並列に行う（ユーザー作成より前に確認する）
+        results = preprocess_uploads(face_file, staging_dir(staging))
+        rejects = [r for r in results if not r.ok]
+        if rejects:
+            discard_staging(staging)
+            return render_template("register.html", message="⚠️ 使えない画像があります",
+                                   rejects=rejects)
+        filenames = [r.filename for r in results]
+
+        user = db.create_user(username, password)
+        if not user:
+            discard_staging(staging)
+            return "⚠️ ユーザー登録に失敗しました"
+
+        if not db.authenticate_user(user.id, password):
+            # 他の失敗と同じく、一時保存と作ったユーザーを残さない
+            discard_staging(staging)
+            db.delete_user(user.id)
+            return "⚠️ パスワード保存に問題があります"
+        # 確定されずに放置されたら、ステージングと一緒にユーザーも消す
+        set_staging_owner(staging, user.id)
+
+        session["registration"] = {
+            "full_name": username,
+            "face_file": filenames,
+            "password": password,
+            "id": user.id,
+            "staging": staging
+        }
+
+        # picture/<user_id> は確定時にステージングを rename して作る
+        return redirect("/register_confirm")
+
+    return render_template("register.html", message=None)
+
+@app.route("/register_confirm", methods=["GET", "POST"])
+def register_confirm():
+    data = session.get("registration")
+    if not data:
+        return redirect("/register_page")
+    
+    staging = data.get("staging")
+    if not staging:
+        # 一時保存フォルダを分ける前のセッション：画像が残っていないので登録をやり直してもらう
+        session.pop("registration", None)
+        db.delete_user(data["id"])
+        return redirect("/register_page")
+
+    if request.method == "POST":
+        user_id = data["id"]
+        try:
+            commit_staging(staging, user_id)
+        except (RuntimeError, ValueError, OSError) as e:
+            # 時間切れで一時保存が消えた・保存先が既にある：画像の無いユーザーを残さない
+            con.log_event(f"⚠️ 登録画像の確定に失敗: {e}")
+            discard_staging(staging)
+            session.pop("registration", None)
+            db.delete_user(user_id)
+            return render_template("register.html",
+                                   message="⚠️ 登録の有効期限が切れました。もう一度登録してください。")
+        session.pop("registration", None)
+        GALLERY.reload_user(user_id)  # 新しい画像だけ特徴量を作る
+        return redirect("/")
+    
+    return render_template("register_confirm.html", data=data)
+
+#Egg追加
+@app.route("/temp_image/<filename>")
+def temp_image(filename):
+    # 自分の登録中の画像だけを返す
+    data = session.get("registration")
+    if not data or not data.get("staging"):
+        abort(404)
+    return send_from_directory(staging_dir(data["staging"]), filename)
+
+# ---------------------------------
+# ログアウト
+# ---------------------------------
+@app.route("/logout", methods=["POST"])
+def logout():
+    session.clear()  # セッション情報をすべて削除
+    return redirect("/")  # トップページへ戻す
+
+# ---------------------------------
+# アカウント削除処理
+# ---------------------------------
+@app.route("/delete", methods=["POST"])
+def delete_account():
+    if "user_id" not in session:
+        return redirect("/login_page")
+
+    user_id = session["user_id"]
+
+    if db.delete_user(user_id):   # ← DB削除
+        db.delete_user_picture(user_id)  # ← フォルダ削除
+        GALLERY.remove_user(user_id)     # ← ギャラリーからも外す
+        session.clear()
+        return render_template("delete_done.html")  # 完了ページへ
+    else:
+        return "削除に失敗しました…"
+
+
+# ---------------------------------
+# 削除確認
+# ---------------------------------
+@app.route("/delete_confirm_page")
+def delete_confirm_page():
+    if "user_id" not in session:
+        return redirect("/login_page")
+
+    user = db.get_user(session["user_id"])
+    return render_template("delete_confirm.html", user=user)
+
+
+# ---------------------------------
+# 計測（Prometheus 形式）
+# ---------------------------------
+@app.route("/metrics")
+def metrics_page():
+    return metrics.REGISTRY.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+
+if __name__ == "__main__":
+    startup()
     app.run(debug=True)
\ No newline at end of file
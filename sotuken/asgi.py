@@ -0,0 +1,164 @@
+# ASGI（非同期）で動かすためのエントリポイント
+# 実行: sotuken ディレクトリで  uvicorn asgi:app
+# /video_feed と /auth_events は非同期で処理し、1視聴者が WSGI のスレッドを占有しないようにする。
+# それ以外のルート（/login, /auth_status など）はこれまで通り Flask (app.py) が処理する。
+import asyncio
+import json
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import app as flask_app, startup
+from logic import face_auth_core as core
+from logic.auth_sessions import MemorySessionStore
+
+# ===============================
+# 定数
+# ===============================
+STREAM_WORKERS = 64       # 同期処理（1フレーム分の待ち・JPEG化）を動かすスレッド数（視聴者の数より少なくてよい）
+STATUS_POLL = 0.1         # /auth_events で状態を確認する間隔（秒）
+WSGI_WORKERS = 16         # Flask 側のルートに使うスレッド数
+
+_executor = ThreadPoolExecutor(STREAM_WORKERS, thread_name_prefix="face-stream")
+
+
+# ===============================
+# Flask の session cookie を読み書きする
+# ===============================
+def _serializer():
+    return flask_app.session_interface.get_signing_serializer(flask_app)
+
+
+def load_session(request):
+    value = request.cookies.get(flask_app.config["SESSION_COOKIE_NAME"])
+    if not value:
+        return {}
+    try:
+        max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        return _serializer().loads(value, max_age=max_age)
+    except BadSignature:
+        return {}
+
+
+def session_cookie_header(data):
+    name = flask_app.config["SESSION_COOKIE_NAME"]
+    return f"{name}={_serializer().dumps(dict(data))}; Path=/; HttpOnly; SameSite=Lax"
+
+
+# ===============================
+# Routes
+# ===============================
+async def video_feed(request):
+    session = load_session(request)
+    headers = {}
+    sid = session.get("auth_sid")
+    if not sid:
+        sid = secrets.token_hex(16)
+        session["auth_sid"] = sid
+        headers["set-cookie"] = session_cookie_header(session)
+
+    core.start_auth_session(sid, core.get_claimed_user_id(request.query_params, session),
+                            request.client.host if request.client else None)
+    frames = core.generate_jpeg_frames(sid)
+
+    def close_frames(_future=None):
+        """ジェネレーターを閉じる（カメラの購読解除・パイプラインの停止を待つのでスレッドで行う）"""
+        _executor.submit(_close_quietly, frames)
+
+    async def body():
+        # 1フレームずつスレッドで作って await する。スレッドを使うのは次のフレームを待って JPEG を
+        # 作る間だけで、送信中や受け取りの遅い視聴者を待つ間は使わない（視聴者が多くても詰まらない）
+        step = None
+        try:
+            while True:
+                step = _executor.submit(next, frames, None)
+                try:
+                    jpeg = await asyncio.wrap_future(step)
+                except Exception as e:
+                    print(f"配信の生成に失敗: {e}")
+                    break
+                if jpeg is None:
+                    break
+                yield core.MJPEG_PART_HEADER + jpeg + b"\r\n"
+        finally:
+            # 切断時に next が実行中なら、戻ってから閉じる（実行中のジェネレーターは close できない）
+            if step is None:
+                close_frames()
+            else:
+                step.add_done_callback(close_frames)
+
+    return StreamingResponse(
+        body(),
+        media_type="multipart/x-mixed-replace; boundary=frame",
+        headers=headers,
+    )
+
+
+def _close_quietly(frames):
+    try:
+        frames.close()
+    except Exception as e:
+        print(f"配信の終了処理に失敗: {e}")
+
+
+async def auth_events(request):
+    """logic.face_auth_core.auth_events の非同期版"""
+    sid = load_session(request).get("auth_sid")
+    store = core.AUTH_STATES
+    loop = asyncio.get_running_loop()
+
+    async def get_state():
+        if isinstance(store, MemorySessionStore):
+            return store.get(sid)
+        return await loop.run_in_executor(_executor, store.get, sid)
+
+    async def stream():
+        yield "retry: 1000\n\n"
+        last_status = None
+        last_sent = time.time()
+        deadline = time.time() + core.SSE_MAX_DURATION
+
+        while time.time() < deadline:
+            if await request.is_disconnected():
+                break
+            status = core.auth_state_status(await get_state())
+            if status != last_status:
+                last_status = status
+                last_sent = time.time()
+                yield f"data: {json.dumps({'status': status})}\n\n"
+                if status in ("authenticated", "failed"):
+                    break
+            elif time.time() - last_sent > core.SSE_KEEPALIVE:
+                last_sent = time.time()
+                yield ": keepalive\n\n"
+            await asyncio.sleep(STATUS_POLL)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    # import 時ではなくサーバーの起動時に行う（ギャラリーの構築は時間がかかるのでスレッドで）
+    await asyncio.get_running_loop().run_in_executor(None, startup)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/video_feed", video_feed),
+        Route("/auth_events", auth_events),
+        Mount("/", WSGIMiddleware(flask_app, workers=WSGI_WORKERS)),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,145 @@
+# 画像読み込みのベンチマーク
+# 従来の全画素展開（face_recognition.load_image_file と同じ PIL → np.array）と
+# logic.image_io.load_rgb（JPEG の縮小展開・EXIF 補正・バッファの使い回し）を比べ、
+# 1枚あたりの時間の百分位数と最大メモリ使用量（RSS）の増加分を表示・JSON に書き出す。
+# 実行: sotuken ディレクトリで
+#   python -m bench.bench_decode                       # スマートフォン相当の合成 JPEG で測る
+#   python -m bench.bench_decode --images picture/12   # 実際の登録画像で測る
+# メモリは読み込み方ごとに新しいプロセスで測る（前の読み込み方の確保が残らないように）。
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from logic import image_io
+
+PERCENTILES = (50, 90, 99)
+EXIF_ORIENTATION = 0x0112
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def legacy_load(path):
+    """変更前の読み込み（face_recognition.load_image_file と同じ処理）"""
+    return np.array(Image.open(path).convert("RGB"))
+
+
+def make_loader(max_side, reuse):
+    buffer = image_io.RGBBuffer() if reuse else None
+
+    def load(path):
+        return image_io.load_rgb(path, max_side=max_side, buffer=buffer)
+    return load
+
+
+def synthetic_images(folder, count, width, height, quality):
+    """縦向きで撮った写真を想定し、EXIF の向き（6: 90度回転）を付けた JPEG を作る"""
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        small = rng.integers(0, 255, (height // 16, width // 16, 3), dtype=np.uint8)
+        img = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+        pil = Image.fromarray(img)
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = 6
+        path = os.path.join(folder, f"synthetic_{i}.jpg")
+        pil.save(path, quality=quality, exif=exif)
+        paths.append(path)
+    return paths
+
+
+def rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KiB、macOS はバイト
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def run_mode(name, max_side, reuse, paths, repeat):
+    """1つの読み込み方で全画像を repeat 回読み、結果の dict を返す（別プロセスで呼ぶ）"""
+    load = legacy_load if max_side is None else make_loader(max_side, reuse)
+    load(paths[0])   # ウォームアップ
+    base = rss_mb()
+
+    times, shape = [], None
+    for _ in range(repeat):
+        for path in paths:
+            t0 = time.perf_counter()
+            img = load(path)
+            times.append(time.perf_counter() - t0)
+            shape = img.shape
+    peak = rss_mb()
+
+    arr = np.asarray(times) * 1000.0
+    out = {"mode": name, "images": len(times), "shape": list(shape), "mean_ms": float(arr.mean())}
+    for p in PERCENTILES:
+        out[f"p{p}_ms"] = float(np.percentile(arr, p))
+    out["rss_growth_mb"] = None if base is None else peak - base
+    return out
+
+
+def print_run(run):
+    rss = "-" if run["rss_growth_mb"] is None else f"{run['rss_growth_mb']:6.1f}MB"
+    h, w = run["shape"][:2]
+    print(f"{run['mode']:<26} {w:>5}x{h:<5} mean={run['mean_ms']:8.2f}ms "
+          f"p50={run['p50_ms']:8.2f}ms p99={run['p99_ms']:8.2f}ms rss+={rss}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", help="画像のフォルダ（省略時は合成 JPEG）")
+    parser.add_argument("--count", type=int, default=8, help="合成する画像の枚数")
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--quality", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-sides", default=f"{image_io.DECODE_MAX_SIDE},1024,0",
+                        help="load_rgb の長辺の上限（0 は縮小なし）")
+    parser.add_argument("--output", default="bench_decode_results.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.images:
+            paths = sorted(os.path.join(args.images, f) for f in os.listdir(args.images)
+                           if f.lower().endswith(IMAGE_EXTS))
+        else:
+            paths = synthetic_images(tmp, args.count, args.width, args.height, args.quality)
+        if not paths:
+            parser.error("画像が見つかりません")
+
+        modes = [("legacy (full decode)", None, False)]
+        for side in dict.fromkeys(int(s) for s in args.max_sides.split(",") if s):
+            modes.append((f"image_io max={side or 'full'}", side, False))
+            modes.append((f"image_io max={side or 'full'} +buf", side, True))
+
+        print(f"images={len(paths)} repeat={args.repeat}")
+        runs = []
+        for name, side, reuse in modes:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                run = pool.submit(run_mode, name, side, reuse, paths, args.repeat).result()
+            print_run(run)
+            runs.append(run)
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"結果: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
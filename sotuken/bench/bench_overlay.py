@@ -0,0 +1,87 @@
+# 描画・JPEG化のベンチマーク
+# 従来の PIL 経由の描画（BGR→RGB→PIL→BGR）と OverlayRenderer + JpegEncoder を比べ、
+# 1フレームあたりの時間と一時的なメモリ確保量を表示する。
+# 実行: sotuken ディレクトリで  python -m bench.bench_overlay
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+from logic.overlay import OverlayRenderer, JpegEncoder, load_font
+
+LOCATIONS = [(120, 360, 360, 120), (100, 600, 300, 420)]
+NAMES = ["12", "未確認"]
+
+
+def legacy_frame(frame, font):
+    """変更前の generate_frames と同じ処理"""
+    pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    draw = ImageDraw.Draw(pil)
+    for (t, r, b, l), name in zip(LOCATIONS, NAMES):
+        cv2.rectangle(frame, (l, t), (r, b), (0, 255, 0), 2)
+        draw.text((l + 6, b - 28), name, font=font, fill=(255, 255, 255))
+    frame = cv2.cvtColor(np.array(pil), cv2.COLOR_RGB2BGR)
+    ret, buffer = cv2.imencode(".jpg", frame)
+    return b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + buffer.tobytes() + b"\r\n"
+
+
+def make_overlay_frame(quality, max_width):
+    renderer = OverlayRenderer()
+    encoder = JpegEncoder(quality=quality, max_width=max_width)
+
+    def run(frame, font):
+        out = renderer.render(frame, LOCATIONS, NAMES)
+        return encoder.encode(out).tobytes()
+    return run
+
+
+def measure(name, fn, frame, font, n):
+    for _ in range(5):
+        fn(frame.copy(), font)   # ウォームアップ（ラベルのキャッシュ作成など）
+
+    frames = [frame.copy() for _ in range(n)]
+    t0 = time.perf_counter()
+    for f in frames:
+        fn(f, font)
+    per_frame = (time.perf_counter() - t0) / n
+
+    # 1フレーム処理中に一時的に確保されたメモリ（ピーク）と、残ったままの確保数
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    fn(frames[0], font)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    retained = sum(max(s.count_diff, 0) for s in after.compare_to(before, "lineno"))
+    print(f"{name:<28} {per_frame * 1000:8.2f} ms/frame  "
+          f"peak_alloc={(peak - base) / 1024:8.1f} KiB  retained_allocs={retained}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--max-width", type=int, default=640)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (9, 9), 0)   # JPEG が極端に重くならないよう平滑化
+    font = load_font()
+
+    print(f"frame={args.width}x{args.height} frames={args.frames}")
+    measure("legacy (PIL)", legacy_frame, frame, font, args.frames)
+    measure(f"overlay q={args.quality} w=full", make_overlay_frame(args.quality, 0), frame, font, args.frames)
+    measure(f"overlay q={args.quality} w={args.max_width}",
+            make_overlay_frame(args.quality, args.max_width), frame, font, args.frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+# 認識パイプライン全体のベンチマーク
+# 録画した映像（logic.frame_source のソース）を generate_frames と同じ処理
+# （縮小 → face_locations → face_encodings → ギャラリー照合 → 描画 → JPEG化）に流し、
+# 合成ギャラリーの人数ごとに次を測る：
+#   段階ごとの処理時間の百分位数 / 処理FPS / 認証までの時間 / 最大メモリ使用量（RSS）
+# 結果は JSON に書き出し、保存しておいた基準（baseline）と比べて悪化を検出できる。
+#
+# 実行: sotuken ディレクトリで
+#   python -m bench.bench_pipeline --source video:clip.mp4 --gallery-sizes 10,1000,100000
+#   python -m bench.bench_pipeline --source synthetic:face.jpg --save-baseline bench/baseline.json
+#   python -m bench.bench_pipeline --source video:clip.mp4 --baseline bench/baseline.json
+# 認証までの時間は、映像の先頭で見つけた顔を「本人」としてギャラリーに登録して測る。
+# 時間の流れは映像のFPSに合わせた仮想時計で進める（--source の速さ指定に関係なく再現できる）。
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from logic import metrics
+from logic import face_auth_core as core
+from logic.auth_sessions import FaceAuthState
+from logic.ann_index import IVFIndex
+from logic.face_gallery import ANN_MIN_SIZE, ANN_PARAMS
+from logic.face_tracker import FaceTracker, UNKNOWN_NAME
+from logic.frame_source import open_frame_source
+from logic.gallery_matrix import GalleryMatrix
+from logic.overlay import OverlayRenderer, JpegEncoder
+from logic.recognition_scheduler import AdaptiveScheduler
+from logic.recognition_service import RecognitionService
+from logic.face_prefilter import FacePrefilter
+from logic.recognition_profiles import get_profile
+
+# ===============================
+# 定数
+# ===============================
+STAGES = ("downscale", "detect", "encode", "match", "draw", "imencode")
+PERCENTILES = (50, 90, 95, 99)
+TARGET_USER = "target"
+SYNTHETIC_STD = 0.08      # 合成特徴量のばらつき（本人以外との距離が実際と同程度の 1.2〜1.4 になる）
+ENROLL_NOISE = 0.02       # 本人の登録特徴量に加えるばらつき
+ENROLL_SCAN_FRAMES = 300  # 本人の顔を探す最大フレーム数
+REGRESSION_TOLERANCE = 0.10
+MIN_COMPARED_MS = 0.05    # 基準・今回とも これ未満の段階時間は誤差とみなして比べない
+
+# 基準と比べる値：(名前, 大きいほど良いか)
+COMPARED = [
+    ("fps", True),
+    ("time_to_auth_s", False),
+    ("peak_rss_mb", False),
+] + [(f"stages.{s}.p{p}", False) for s in STAGES for p in (50, 95)]
+
+
+# ===============================
+# 準備
+# ===============================
+def find_enrollment(source_spec, samples, profile):
+    """
+    映像の先頭から最初に見つかった顔の特徴量を取り、本人の登録用サンプルを作る
+    照合と同じ条件になるよう、測るプロファイル（ランドマーク・jitter）で特徴量を作る
+    """
+    source = open_frame_source(source_spec, pacing="fast")
+    try:
+        for _ in range(ENROLL_SCAN_FRAMES):
+            ret, frame = source.read()
+            if not ret:
+                break
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            locations = profile.locations(rgb)
+            if locations:
+                enc = profile.encodings(rgb, locations[:1])[0]
+                rng = np.random.default_rng(1)
+                return [enc + rng.normal(0, ENROLL_NOISE, enc.shape) for _ in range(samples)]
+    finally:
+        source.release()
+    return None
+
+
+def synthetic_gallery(users, samples, enrollment, seed=0):
+    """users 人（本人を含む）×samples 枚の合成ギャラリー"""
+    rng = np.random.default_rng(seed)
+    others = users - (1 if enrollment is not None else 0)
+    # 人ごとの中心 + 小さなばらつき
+    centers = rng.normal(0, SYNTHETIC_STD, (others, 1, 128))
+    encodings = (centers + rng.normal(0, ENROLL_NOISE, (others, samples, 128))).reshape(-1, 128)
+    names = [str(i) for i in range(others) for _ in range(samples)]
+    if enrollment is not None:
+        encodings = np.vstack([encodings, np.asarray(enrollment)])
+        names += [TARGET_USER] * len(enrollment)
+    return encodings.astype(np.float32), names
+
+
+def build_matcher(encodings, names, mode):
+    """match_faces と同じ基準（件数が ANN_MIN_SIZE 以上なら近似インデックス）で照合関数を作る"""
+    if len(encodings) >= ANN_MIN_SIZE:
+        index = IVFIndex(**ANN_PARAMS)
+        index.train(encodings)
+        index.add(encodings, names)
+
+        def matcher(queries, k=1, claimed_user_id=None):
+            return index.match(queries, k=k) if len(queries) else []
+        return matcher, "ivf"
+
+    gallery = GalleryMatrix(encodings, names)
+
+    def matcher(queries, k=1, claimed_user_id=None):
+        return gallery.match(queries, k=k, mode=mode) if len(queries) else []
+    return matcher, "matrix"
+
+
+class FixedScheduler:
+    """固定の間隔（N フレームに1回）・固定の縮小率で認識する（変更前の方式と比べる用）"""
+
+    def __init__(self, every, scale):
+        self.every = every
+        self.scale = scale
+        self.motion_score = 0.0    # 前段フィルタが参照する
+        self._prev_gray = None
+        self._count = 0
+
+    # 動き量の測り方は AdaptiveScheduler と同じ
+    motion = AdaptiveScheduler.motion
+
+    def should_run(self, frame):
+        self.motion(frame)
+        self._count += 1
+        return (self._count - 1) % self.every == 0
+
+    def record(self, detect_time, encode_time, faces_found):
+        pass
+
+
+class ClockedScheduler(AdaptiveScheduler):
+    """AdaptiveScheduler を仮想時計で動かす"""
+    clock = 0.0
+
+    def should_run(self, frame, now=None):
+        return super().should_run(frame, self.clock if now is None else now)
+
+
+# ===============================
+# 計測
+# ===============================
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux は KiB、macOS はバイト
+        return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values) * 1000.0
+    out = {"count": len(values), "mean": float(arr.mean())}
+    for p in PERCENTILES:
+        out[f"p{p}"] = float(np.percentile(arr, p))
+    return out
+
+
+def run_once(args, users, enrollment):
+    """1つのギャラリー人数でベンチマークを1回行い、結果の dict を返す"""
+    # 別プロセスで実行されても設定が効くよう、ここで反映する
+    core.TOLERANCE_THRESHOLD = args.tolerance
+    t_build = time.perf_counter()
+    encodings, names = synthetic_gallery(users, args.samples, enrollment)
+    matcher, backend = build_matcher(encodings, names, args.match_mode)
+    build_time = time.perf_counter() - t_build
+
+    samples = {s: [] for s in STAGES}
+
+    def listener(value, label):
+        if label in samples:
+            samples[label].append(value)
+    metrics.STAGE_SECONDS.listeners.append(listener)
+
+    profile = get_profile(args.profile)
+    service = RecognitionService(workers=args.workers, num_jitters=profile.jitters, model=profile.landmarks)
+    state = FaceAuthState()
+    tracker = FaceTracker()
+    if args.every:
+        scheduler = FixedScheduler(args.every, args.scale)
+    else:
+        scheduler = ClockedScheduler(scales=profile.scales, scale=profile.scale)
+    prefilter = None if args.no_prefilter else FacePrefilter(profile=profile)
+    renderer = OverlayRenderer(unknown_name=UNKNOWN_NAME)
+    encoder = JpegEncoder(quality=args.quality)
+
+    source = open_frame_source(args.source, pacing="fast")
+    fps = args.fps or (1.0 / source.pacer.interval if source.pacer.interval else 30.0)
+    frames = recognitions = 0
+    time_to_auth = frames_to_auth = authenticated_as = None
+    result = None
+    t0 = time.perf_counter()
+    try:
+        while frames < args.frames:
+            ret, frame = source.read()
+            if not ret:
+                break
+            scheduler.clock = frames / fps
+
+            recognized = core.recognize_frame(state, frame, tracker, scheduler,
+                                              matcher=matcher, service=service, prefilter=prefilter,
+                                              profile=profile)
+            if recognized is not None:
+                recognitions += 1
+                result = recognized
+                if state.authenticated and time_to_auth is None:
+                    time_to_auth = frames / fps
+                    frames_to_auth = frames
+                    # 下で state を作り直すので、最初に認証されたユーザー名をここで残す
+                    authenticated_as = state.username
+
+            out = frame
+            if result is not None:
+                with metrics.STAGE_SECONDS.time("draw"):
+                    out = renderer.render(frame, *result)
+            with metrics.STAGE_SECONDS.time("imencode"):
+                encoder.encode(out)
+            frames += 1
+
+            if state.authenticated and args.stop_on_auth:
+                break
+            if state.authenticated:
+                # 本番と同じく認証後も続けて測れるよう状態を戻す
+                state = FaceAuthState()
+    finally:
+        elapsed = time.perf_counter() - t0
+        source.release()
+        service.shutdown()
+        metrics.STAGE_SECONDS.listeners.remove(listener)
+
+    return {
+        "gallery_users": users,
+        "gallery_encodings": len(encodings),
+        "backend": backend,
+        "gallery_build_s": build_time,
+        "frames": frames,
+        "recognitions": recognitions,
+        "fps": frames / elapsed if elapsed > 0 else None,
+        "time_to_auth_s": time_to_auth,
+        "frames_to_auth": frames_to_auth,
+        "authenticated_as": authenticated_as,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {s: summarize(v) for s, v in samples.items()},
+    }
+
+
+# ===============================
+# 基準との比較
+# ===============================
+def _lookup(run, key):
+    value = run
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """基準より tolerance 以上悪化した項目の一覧を返す"""
+    base_runs = {r["gallery_users"]: r for r in baseline.get("runs", [])}
+    regressions = []
+    for run in results["runs"]:
+        base = base_runs.get(run["gallery_users"])
+        if base is None:
+            continue
+        for key, higher_is_better in COMPARED:
+            new, old = _lookup(run, key), _lookup(base, key)
+            if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or old == 0:
+                continue
+            if key.startswith("stages.") and max(new, old) < MIN_COMPARED_MS:
+                continue
+            change = (new - old) / old
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            print(f"  users={run['gallery_users']:<7} {key:<22} {old:10.2f} -> {new:10.2f}  "
+                  f"({change * 100:+6.1f}%){'  REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append((run["gallery_users"], key, old, new))
+    return regressions
+
+
+def print_run(run):
+    auth = "-" if run["time_to_auth_s"] is None else f"{run['time_to_auth_s']:.2f}s"
+    rss = "-" if run["peak_rss_mb"] is None else f"{run['peak_rss_mb']:.0f}MB"
+    print(f"users={run['gallery_users']:<7} backend={run['backend']:<6} frames={run['frames']:<5} "
+          f"fps={run['fps'] or 0:7.1f} recog={run['recognitions']:<4} auth={auth:<7} rss={rss}")
+    for name, s in run["stages"].items():
+        if s["count"]:
+            print(f"    {name:<10} n={s['count']:<5} p50={s['p50']:7.2f}ms p95={s['p95']:7.2f}ms "
+                  f"p99={s['p99']:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default=os.environ.get("FACE_SOURCE", "synthetic"),
+                        help="logic.frame_source の指定（video:clip.mp4 / images:dir / synthetic:face.jpg）")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=0, help="仮想時計のFPS（0 ならソースのFPS）")
+    parser.add_argument("--gallery-sizes", default="10,100,1000,10000,100000")
+    parser.add_argument("--samples", type=int, default=1, help="1人あたりの登録枚数")
+    parser.add_argument("--match-mode", default=core.MATCH_MODE)
+    parser.add_argument("--tolerance", type=float, default=core.TOLERANCE_THRESHOLD,
+                        help="TOLERANCE_THRESHOLD を上書きする")
+    parser.add_argument("--every", type=int, default=0,
+                        help="N フレームに1回認識する（0 なら AdaptiveScheduler）")
+    parser.add_argument("--scale", type=float, default=0.25, help="--every 指定時の縮小率")
+    parser.add_argument("--profile", default="stream",
+                        help="認識プロファイル（realtime / balanced / enroll。既定は FACE_PROFILE_STREAM）")
+    parser.add_argument("--no-prefilter", action="store_true", help="HOG の前段フィルタを使わない")
+    parser.add_argument("--workers", type=int, default=0, help="特徴量計算のプロセス数（0 ならその場で計算）")
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--stop-on-auth", action="store_true")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="人数ごとに別プロセスで測らない（RSS は累積になる）")
+    parser.add_argument("--output", default="bench_pipeline_results.json")
+    parser.add_argument("--baseline", help="比べる基準の JSON")
+    parser.add_argument("--save-baseline", help="結果を基準として保存する先")
+    parser.add_argument("--max-regression", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.gallery_sizes.split(",") if s]
+    enrollment = find_enrollment(args.source, args.samples, get_profile(args.profile))
+    if enrollment is None:
+        print("映像から顔が見つからないため、認証までの時間は測りません")
+
+    runs = []
+    for users in sizes:
+        if args.no_isolate:
+            run = run_once(args, users, enrollment)
+        else:
+            # 最大メモリ使用量を人数ごとに分けて測るため、毎回新しいプロセスで実行する
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                run = pool.submit(run_once, args, users, enrollment).result()
+        print_run(run)
+        runs.append(run)
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline", "output")},
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"結果: {args.output}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"基準を保存: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"基準との比較: {args.baseline}")
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"{len(regressions)} 件の悪化があります")
+            sys.exit(1)
+        print("悪化はありません")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+# 精度と速度の評価（TOLERANCE_THRESHOLD・モデル設定を選ぶため）
+# picture/<user_id>/*.jpg の形のラベル付き画像フォルダから特徴量を作り、
+# 全ての本人同士（genuine）・他人同士（impostor）の距離をまとめて行列計算して
+# FAR（他人受入率）/ FRR（本人拒否率）/ EER（両者が等しくなる点）と処理速度を設定ごとに出す。
+#
+# 設定の組み合わせ：
+#   --detectors   hog,cnn        face_locations の model
+#   --landmarks   small,large    face_encodings の model
+#   --jitters     1,10           face_encodings の num_jitters
+#   --upsample    0,1            face_locations の number_of_times_to_upsample
+#   --scales      1.0,0.25       検出前の縮小率（配信では 0.2〜0.5 で検出している）
+#
+# 実行: sotuken ディレクトリで
+#   python -m bench.eval_accuracy --dir picture --detectors hog --landmarks small,large --jitters 1,5
+#   python -m bench.eval_accuracy --dir picture --target-far 0.001 --max-frr 0.05
+# 判定は配信と同じく「距離 < しきい値」なら本人とみなす。
+# 画像はギャラリーと同じ logic.image_io で（長辺 --max-side まで縮小して）1枚ずつ読む。
+import argparse
+import itertools
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+import face_recognition
+
+from logic.thresholds import TOLERANCE_THRESHOLD
+from logic.face_gallery import IMAGE_EXTS
+from logic.image_io import load_rgb, thread_buffer, DECODE_MAX_SIDE
+
+# ===============================
+# 定数
+# ===============================
+MAX_DISTANCE = 2.0        # ヒストグラムの上限（128次元の特徴量間の距離はほぼこれ未満）
+THRESHOLD_STEP = 0.001    # FAR/FRR を計算するしきい値の刻み
+CURVE_STEP = 0.01         # JSON に書き出す曲線の刻み
+DISTANCE_MEMORY_MB = 256  # 距離行列のブロック1つ分で使う一時メモリの上限
+BYTES_PER_PAIR = 32       # 1組あたりの一時メモリ（距離・取り出した距離・histogram 内部の float64 + マスク2つ）
+TARGET_FARS = (0.0001, 0.001, 0.01)
+
+
+# ===============================
+# 読み込み
+# ===============================
+def load_dataset(root, max_per_user=None, min_per_user=1):
+    """
+    picture/<user_id> から (ラベルのリスト, パスのリスト) を返す
+    画像は全部をメモリに載せず、検出・特徴量計算のたびに1枚ずつ読む
+    """
+    labels, paths = [], []
+    for user_id in sorted(os.listdir(root)):
+        folder = os.path.join(root, user_id)
+        if not os.path.isdir(folder):
+            continue
+        files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTS))
+        if max_per_user:
+            files = files[:max_per_user]
+        if len(files) < min_per_user:
+            continue
+        for f in files:
+            labels.append(user_id)
+            paths.append(os.path.join(folder, f))
+    return labels, paths
+
+
+def read_image(path, max_side):
+    """登録画像と同じ読み方（logic.image_io）で読む。失敗したら None"""
+    try:
+        return load_rgb(path, max_side=max_side, buffer=thread_buffer())
+    except Exception as e:
+        print(f"{path} の読み込みに失敗: {e}")
+        return None
+
+
+# ===============================
+# 特徴量
+# ===============================
+def detect_all(paths, detector, upsample, scale, max_side):
+    """全画像で顔検出し、最も大きい顔の枠（読み込んだ画像の座標）と1枚ごとの時間を返す"""
+    locations, times = [], []
+    for path in paths:
+        img = read_image(path, max_side)
+        if img is None:
+            locations.append(None)
+            continue
+        t0 = time.perf_counter()
+        small = img if scale == 1.0 else cv2.resize(img, (0, 0), fx=scale, fy=scale)
+        found = face_recognition.face_locations(
+            small, number_of_times_to_upsample=upsample, model=detector)
+        times.append(time.perf_counter() - t0)
+        if not found:
+            locations.append(None)
+            continue
+        t, r, b, l = max(found, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]))
+        inv = 1.0 / scale
+        locations.append((int(t * inv), int(r * inv), int(b * inv), int(l * inv)))
+    return locations, times
+
+
+def encode_all(paths, locations, landmarks, jitters, max_side):
+    """検出できた画像の特徴量を作る。(特徴量, 使った画像の添字, 1枚ごとの時間) を返す"""
+    encodings, used, times = [], [], []
+    for i, (path, loc) in enumerate(zip(paths, locations)):
+        if loc is None:
+            continue
+        img = read_image(path, max_side)
+        if img is None:
+            continue
+        t0 = time.perf_counter()
+        enc = face_recognition.face_encodings(img, [loc], num_jitters=jitters, model=landmarks)
+        times.append(time.perf_counter() - t0)
+        if enc:
+            encodings.append(enc[0])
+            used.append(i)
+    return np.asarray(encodings, dtype=np.float64).reshape(-1, 128), used, times
+
+
+# ===============================
+# 距離と FAR / FRR
+# ===============================
+def block_rows(n, memory_mb=DISTANCE_MEMORY_MB):
+    """一時メモリが memory_mb に収まる、1ブロックの行数"""
+    return max(1, int(memory_mb * 1024 * 1024 // (BYTES_PER_PAIR * max(1, n))))
+
+
+def distance_histograms(encodings, labels, step=THRESHOLD_STEP, block=None):
+    """
+    全ペア (i < j) の距離を genuine / impostor に分けてヒストグラムにする
+    距離は |a|^2 + |b|^2 - 2 a・b で行列積としてまとめて計算し、ブロックごとに集計する
+    block（行数）を省略すると DISTANCE_MEMORY_MB に収まるように決める
+    """
+    bins = np.arange(0.0, MAX_DISTANCE + step, step)
+    genuine = np.zeros(len(bins) - 1, dtype=np.int64)
+    impostor = np.zeros(len(bins) - 1, dtype=np.int64)
+
+    _, codes = np.unique(np.asarray(labels), return_inverse=True)
+    sq = np.einsum("ij,ij->i", encodings, encodings)
+    n = len(encodings)
+    block = block or block_rows(n)
+
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        # 上三角（j > i）だけが要るので、列は start 以降だけを計算する
+        cols = slice(start, n)
+        d = encodings[start:stop] @ encodings[cols].T
+        d *= -2.0
+        d += sq[start:stop, None]
+        d += sq[None, cols]
+        np.maximum(d, 0.0, out=d)
+        np.sqrt(d, out=d)
+        np.minimum(d, MAX_DISTANCE - step / 2, out=d)
+
+        upper = np.arange(start, n)[None, :] > np.arange(start, stop)[:, None]
+        same = codes[start:stop, None] == codes[None, cols]
+        same &= upper
+        upper &= ~same      # upper は他人同士の組になる
+        genuine += np.histogram(d[same], bins)[0]
+        impostor += np.histogram(d[upper], bins)[0]
+
+    return bins, genuine, impostor
+
+
+def error_curves(bins, genuine, impostor):
+    """
+    しきい値ごとの FAR / FRR（距離 < しきい値 を受け入れ）
+    thresholds[k] = bins[k] のとき、受け入れるのは bins[k] 未満のビン
+    """
+    thresholds = bins
+    accepted_impostor = np.concatenate([[0], np.cumsum(impostor)])
+    accepted_genuine = np.concatenate([[0], np.cumsum(genuine)])
+    far = accepted_impostor / max(1, impostor.sum())
+    frr = 1.0 - accepted_genuine / max(1, genuine.sum())
+    return thresholds, far, frr
+
+
+def summarize_errors(thresholds, far, frr, tolerance, target_fars=TARGET_FARS):
+    i = int(np.argmin(np.abs(far - frr)))
+    out = {
+        "eer": float((far[i] + frr[i]) / 2),
+        "eer_threshold": float(thresholds[i]),
+    }
+    k = min(int(np.searchsorted(thresholds, tolerance)), len(thresholds) - 1)
+    out["at_tolerance"] = {"threshold": tolerance, "far": float(far[k]), "frr": float(frr[k])}
+
+    out["at_far"] = {}
+    for target in target_fars:
+        # FAR が目標以下になる最大のしきい値（FAR は単調増加）
+        ok = np.nonzero(far <= target)[0]
+        j = int(ok[-1]) if len(ok) else 0
+        out["at_far"][str(target)] = {"threshold": float(thresholds[j]), "frr": float(frr[j])}
+    return out
+
+
+# ===============================
+# 実行
+# ===============================
+def parse_list(text, cast=str):
+    return [cast(v) for v in text.split(",") if v]
+
+
+def evaluate(paths, labels, args):
+    results = []
+    detections = {}
+    for detector, upsample, scale in itertools.product(args.detectors, args.upsample, args.scales):
+        print(f"検出中: detector={detector} upsample={upsample} scale={scale}")
+        detections[(detector, upsample, scale)] = detect_all(
+            paths, detector, upsample, scale, args.max_side)
+
+    for (detector, upsample, scale), landmarks, jitters in itertools.product(
+            detections, args.landmarks, args.jitters):
+        locations, detect_times = detections[(detector, upsample, scale)]
+        encodings, used, encode_times = encode_all(paths, locations, landmarks, jitters, args.max_side)
+        used_labels = [labels[i] for i in used]
+
+        t0 = time.perf_counter()
+        bins, genuine, impostor = distance_histograms(encodings, used_labels)
+        distance_time = time.perf_counter() - t0
+        thresholds, far, frr = error_curves(bins, genuine, impostor)
+
+        per_image = float(np.mean(detect_times)) + (float(np.mean(encode_times)) if encode_times else 0.0)
+        step = max(1, int(round(CURVE_STEP / THRESHOLD_STEP)))
+        result = {
+            "detector": detector,
+            "landmarks": landmarks,
+            "jitters": jitters,
+            "upsample": upsample,
+            "scale": scale,
+            "images": len(paths),
+            "encoded": len(encodings),
+            "failure_to_enroll": 1.0 - len(encodings) / max(1, len(paths)),
+            "genuine_pairs": int(genuine.sum()),
+            "impostor_pairs": int(impostor.sum()),
+            "detect_ms": float(np.mean(detect_times)) * 1000.0,
+            "encode_ms": float(np.mean(encode_times)) * 1000.0 if encode_times else None,
+            "images_per_s": 1.0 / per_image if per_image > 0 else None,
+            "distance_s": distance_time,
+            "curve": {
+                "threshold": [round(float(t), 4) for t in thresholds[::step]],
+                "far": [float(v) for v in far[::step]],
+                "frr": [float(v) for v in frr[::step]],
+            },
+        }
+        # --target-far が既定の一覧に無くても、その値の FRR を出す
+        target_fars = sorted(set(TARGET_FARS) | {args.target_far})
+        result.update(summarize_errors(thresholds, far, frr, args.tolerance, target_fars))
+        results.append(result)
+        print_result(result, args.target_far)
+    return results
+
+
+def print_result(r, target_far):
+    at = r["at_far"].get(str(target_far), {})
+    enc = "-" if r["encode_ms"] is None else f"{r['encode_ms']:.1f}"
+    print(f"  {r['detector']:<4} {r['landmarks']:<5} jit={r['jitters']:<3} up={r['upsample']} "
+          f"scale={r['scale']:<5} | {r['images_per_s'] or 0:6.2f} img/s  det={r['detect_ms']:.1f}ms "
+          f"enc={enc}ms  FTE={r['failure_to_enroll'] * 100:.1f}% | "
+          f"EER={r['eer'] * 100:.2f}% @ {r['eer_threshold']:.3f}  "
+          f"FRR={at.get('frr', 0) * 100:.2f}% @ FAR<={target_far} (t={at.get('threshold', 0):.3f})  "
+          f"tol={r['at_tolerance']['threshold']}: FAR={r['at_tolerance']['far'] * 100:.2f}% "
+          f"FRR={r['at_tolerance']['frr'] * 100:.2f}%")
+
+
+def recommend(results, target_far, max_frr):
+    """目標の FAR で FRR が max_frr 以下になる設定のうち、最も速いもの"""
+    ok = [r for r in results
+          if r["at_far"].get(str(target_far), {}).get("frr", 1.0) <= max_frr and r["images_per_s"]]
+    return max(ok, key=lambda r: r["images_per_s"]) if ok else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default="picture", help="picture/<user_id> 形式の画像フォルダ")
+    parser.add_argument("--detectors", type=lambda s: parse_list(s), default=["hog"])
+    parser.add_argument("--landmarks", type=lambda s: parse_list(s), default=["small", "large"])
+    parser.add_argument("--jitters", type=lambda s: parse_list(s, int), default=[1])
+    parser.add_argument("--upsample", type=lambda s: parse_list(s, int), default=[1])
+    parser.add_argument("--scales", type=lambda s: parse_list(s, float), default=[1.0])
+    parser.add_argument("--max-per-user", type=int, default=0, help="1人あたりの最大画像数（0 なら全部）")
+    parser.add_argument("--max-side", type=int, default=DECODE_MAX_SIDE,
+                        help="読み込み時の長辺の上限（登録画像と同じ既定値。0 なら元の大きさ）")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE_THRESHOLD,
+                        help="FAR/FRR を表示する現在のしきい値")
+    parser.add_argument("--target-far", type=float, default=0.001)
+    parser.add_argument("--max-frr", type=float, default=0.05)
+    parser.add_argument("--output", default="eval_accuracy_results.json")
+    args = parser.parse_args()
+
+    labels, paths = load_dataset(args.dir, args.max_per_user or None)
+    users = len(set(labels))
+    print(f"{users} 人 / {len(paths)} 枚")
+    if users < 2:
+        print("他人同士の組が作れないため、2人以上の画像が必要です")
+        return
+
+    results = evaluate(paths, labels, args)
+    best = recommend(results, args.target_far, args.max_frr)
+    if best is None:
+        print(f"FAR<={args.target_far} で FRR<={args.max_frr} を満たす設定はありません")
+    else:
+        thr = best["at_far"][str(args.target_far)]["threshold"]
+        print(f"推奨: detector={best['detector']} landmarks={best['landmarks']} jitters={best['jitters']} "
+              f"upsample={best['upsample']} scale={best['scale']}  TOLERANCE_THRESHOLD={thr:.3f} "
+              f"({best['images_per_s']:.2f} img/s)")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "dir": args.dir,
+            "users": users,
+            "images": len(paths),
+            "target_far": args.target_far,
+            "max_frr": args.max_frr,
+            "recommended": None if best is None else {
+                k: best[k] for k in ("detector", "landmarks", "jitters", "upsample", "scale")},
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"結果: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+# HTTP 負荷試験
+# app.py を多数の仮想ユーザーで同時に叩き、ルートごとのスループット・応答時間の百分位数・エラー率を出す。
+# 仮想ユーザーはそれぞれ自分の cookie（Flask の session）を持ち、ブラウザと同じ順にページを辿る。
+#
+# シナリオ（--mix で割合を指定）:
+#   register  /register_page (GET, POST 画像複数) → /register_confirm (GET, POST)
+#   login     /login_page → /login (bcrypt)。register で作ったユーザーか --login の ID を使う
+#   face      /face_page → /video_feed（数秒受信）＋ /auth_status を1秒ごとに確認
+#
+# 実行: sotuken ディレクトリで
+#   python -m bench.loadtest --users 20 --duration 60 --face-image face.jpg
+#   python -m bench.loadtest --spawn-server --source synthetic:face.jpg --users 10 --mix face=1
+# 注意: register はユーザーと画像を実際に登録する。試験用の DB / picture で動かすこと
+#       （--cleanup で終了時に作ったユーザーを削除する）
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from logic.frame_source import SyntheticSource
+
+# ===============================
+# 定数
+# ===============================
+DEFAULT_URL = "http://127.0.0.1:5000"
+REQUEST_TIMEOUT = 30
+STATUS_INTERVAL = 1.0     # /auth_status を確認する間隔（秒）
+PERCENTILES = (50, 90, 95, 99)
+LOCK_MARKERS = ("ロック中", "最大試行回数")
+ID_PATTERN = re.compile(r"ID:</strong>\s*(\d+)")
+CLEANUP_TIMEOUT = 90      # 後片付けでロック解除を待つ最大時間（秒）
+IDLE_WAIT = 0.5           # ログインできるユーザーがまだいないときに待つ時間（秒）
+
+
+# ===============================
+# 集計
+# ===============================
+class Stats:
+    """ルートごとの応答時間と結果（ok / 失敗の種類）を集める"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(lambda: defaultdict(int))
+        self.extra = defaultdict(list)
+
+    def record(self, route, latency, outcome="ok"):
+        with self._lock:
+            self.latencies[route].append(latency)
+            self.outcomes[route][outcome] += 1
+
+    def add(self, name, value):
+        with self._lock:
+            self.extra[name].append(value)
+
+    def summary(self, elapsed):
+        out = {}
+        with self._lock:
+            for route, values in sorted(self.latencies.items()):
+                arr = np.asarray(values) * 1000.0
+                outcomes = dict(self.outcomes[route])
+                total = sum(outcomes.values())
+                row = {
+                    "requests": total,
+                    "throughput_rps": total / elapsed if elapsed > 0 else None,
+                    "error_rate": 1.0 - outcomes.get("ok", 0) / total if total else 0.0,
+                    "outcomes": outcomes,
+                    "mean_ms": float(arr.mean()),
+                }
+                for p in PERCENTILES:
+                    row[f"p{p}_ms"] = float(np.percentile(arr, p))
+                out[route] = row
+            extra = {}
+            for name, values in self.extra.items():
+                arr = np.asarray(values, dtype=float)
+                extra[name] = {"count": len(values), "mean": float(arr.mean()),
+                               "p50": float(np.percentile(arr, 50)),
+                               "p95": float(np.percentile(arr, 95))}
+        return out, extra
+
+
+# ===============================
+# 仮想ユーザー
+# ===============================
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """リダイレクトは自分で辿る（ルートごとに時間を測るため）"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def _multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, data in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'.encode() + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class VirtualUser:
+    def __init__(self, base_url, stats):
+        self.base_url = base_url.rstrip("/")
+        self.stats = stats
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect())
+
+    def request(self, method, path, data=None, content_type=None, route=None, classify=None,
+                stream=False):
+        """
+        1リクエストを送り (status, body or response) を返す
+        stream=True なら本文を読まずにレスポンスを返す（呼び出し側で close する）
+        """
+        route = route or f"{method} {path.split('?')[0]}"
+        if isinstance(data, dict):
+            data = urllib.parse.urlencode(data).encode()
+            content_type = "application/x-www-form-urlencoded"
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if content_type:
+            req.add_header("Content-Type", content_type)
+
+        t0 = time.perf_counter()
+        try:
+            try:
+                resp = self.opener.open(req, timeout=REQUEST_TIMEOUT)
+            except urllib.error.HTTPError as e:
+                # 3xx（リダイレクト）も HTTPError として返ってくる
+                resp = e
+            status = resp.status if hasattr(resp, "status") else resp.code
+            if stream and status == 200:
+                self.stats.record(route, time.perf_counter() - t0)
+                return status, resp
+            body = resp.read()
+            resp.close()
+        except Exception as e:
+            self.stats.record(route, time.perf_counter() - t0, type(e).__name__)
+            return None, b""
+
+        outcome = "ok" if status < 400 else f"http_{status}"
+        if classify and outcome == "ok":
+            outcome = classify(status, body)
+        self.stats.record(route, time.perf_counter() - t0, outcome)
+        return status, body
+
+    # ---------- シナリオ ----------
+    def register(self, images, password):
+        name = f"load_{uuid.uuid4().hex[:12]}"
+        self.request("GET", "/register_page")
+        body, ctype = _multipart(
+            {"full_name": name, "password": password},
+            [("face_file", f"{name}_{i}.jpg", img) for i, img in enumerate(images)],
+        )
+        status, _ = self.request(
+            "POST", "/register_page", body, ctype,
+            classify=lambda s, b: "ok" if s == 302 else "rejected")
+        if status != 302:
+            return None
+        status, page = self.request("GET", "/register_confirm")
+        match = ID_PATTERN.search(page.decode("utf-8", "replace")) if status == 200 else None
+        self.request("POST", "/register_confirm", {})
+        return int(match.group(1)) if match else None
+
+    def login(self, user_id, password):
+        def classify(status, body):
+            if status == 302:
+                return "ok"
+            text = body.decode("utf-8", "replace")
+            # 全ユーザー共通の attempts / lock_until によるロック
+            return "locked" if any(m in text for m in LOCK_MARKERS) else "rejected"
+
+        self.request("GET", "/login_page")
+        status, _ = self.request("POST", "/login", {"id": str(user_id), "password": password},
+                                 classify=classify)
+        return status == 302
+
+    def face(self, watch_seconds):
+        self.request("GET", "/face_page")
+        status, resp = self.request("GET", "/video_feed", stream=True)
+        if status != 200:
+            return
+
+        frames = {"count": 0, "first": None}
+        done = threading.Event()
+        t0 = time.perf_counter()
+
+        def read_stream():
+            try:
+                while not done.is_set():
+                    chunk = resp.read1(65536) if hasattr(resp, "read1") else resp.read(65536)
+                    if not chunk:
+                        break
+                    n = chunk.count(b"--frame")
+                    if n and frames["first"] is None:
+                        frames["first"] = time.perf_counter() - t0
+                    frames["count"] += n
+            except Exception:
+                pass
+
+        reader = threading.Thread(target=read_stream, daemon=True)
+        reader.start()
+
+        result = None
+        deadline = time.time() + watch_seconds
+        while time.time() < deadline:
+            time.sleep(STATUS_INTERVAL)
+            _, body = self.request("GET", "/auth_status")
+            try:
+                status_value = json.loads(body).get("status")
+            except ValueError:
+                continue
+            if status_value in ("authenticated", "failed"):
+                result = status_value
+                break
+
+        done.set()
+        resp.close()
+        reader.join(1.0)
+        elapsed = time.perf_counter() - t0
+        if frames["first"] is not None:
+            self.stats.add("video_first_frame_ms", frames["first"] * 1000.0)
+        self.stats.add("video_fps", frames["count"] / elapsed if elapsed > 0 else 0.0)
+        if result == "authenticated":
+            self.stats.add("face_time_to_auth_s", elapsed)
+        self.stats.record("face session", elapsed, result or "timeout")
+
+    def delete_account(self, user_id, password):
+        if not self.login(user_id, password):
+            return False
+        status, _ = self.request("POST", "/delete")
+        return status == 200
+
+
+# ===============================
+# 実行
+# ===============================
+def make_images(count, face_path=None):
+    """登録に使う JPEG（--images が無ければ合成映像から作る）"""
+    source = SyntheticSource(face_path, realtime=False)
+    images = []
+    for _ in range(count):
+        _, frame = source.read()
+        ok, buf = cv2.imencode(".jpg", frame)
+        images.append(buf.tobytes())
+    return images
+
+
+def load_images(path, count):
+    names = sorted(f for f in os.listdir(path) if f.lower().endswith((".jpg", ".jpeg", ".png")))
+    images = []
+    for f in names[:count]:
+        with open(os.path.join(path, f), "rb") as fp:
+            images.append(fp.read())
+    return images
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {"register", "login", "face"}
+    if unknown:
+        raise ValueError(f"unknown scenario: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def spawn_server(port, source):
+    """FACE_SOURCE を指定して app.py をスレッド付きで起動する"""
+    env = dict(os.environ, FACE_SOURCE=source, FACE_SOURCE_PACING="realtime")
+    code = f"from app import app, startup; startup(); app.run(host='127.0.0.1', port={port}, threaded=True)"
+    # 特徴量計算の子プロセスもまとめて止められるよう、別のプロセスグループで起動する
+    proc = subprocess.Popen([sys.executable, "-c", code], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=(os.name != "nt"))
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url + "/login_page", timeout=1).read()
+            return proc, url
+        except Exception:
+            time.sleep(0.2)
+    stop_server(proc)
+    raise RuntimeError("server did not start")
+
+
+def stop_server(proc):
+    if os.name == "nt":
+        proc.terminate()
+    else:
+        os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def run(args):
+    stats = Stats()
+    mix = parse_mix(args.mix)
+    images = (load_images(args.images, args.images_per_user) if args.images
+              else make_images(args.images_per_user, args.face_image))
+
+    credentials = [tuple(c.split(":", 1)) for c in args.login]
+    created = []
+    cred_lock = threading.Lock()
+    stop_at = time.time() + args.duration
+
+    def worker(n):
+        rng = random.Random(n)
+        user = VirtualUser(args.url, stats)
+        names, weights = zip(*mix.items())
+        while time.time() < stop_at:
+            scenario = rng.choices(names, weights)[0]
+            if scenario == "register":
+                user_id = user.register(images, args.password)
+                if user_id is not None:
+                    with cred_lock:
+                        created.append((user_id, args.password))
+            elif scenario == "login":
+                with cred_lock:
+                    pool = credentials + created
+                if not pool:
+                    # register でユーザーができるまで待つ（空回りして CPU を使い切らない）
+                    time.sleep(max(args.think_time, IDLE_WAIT))
+                    continue
+                user_id, password = rng.choice(pool)
+                if rng.random() < args.bad_login_rate:
+                    password = "wrong-" + password
+                user.login(user_id, password)
+            else:
+                user.face(args.face_watch)
+            # 次の操作は新しい訪問者として行う
+            user.cookies.clear()
+            if args.think_time:
+                time.sleep(rng.uniform(0, args.think_time))
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    if args.cleanup:
+        # 試験中のログイン失敗でロックされていることがあるので、解除を待ちながら削除する
+        cleaner = VirtualUser(args.url, Stats())
+        remaining = list(created)
+        deadline = time.time() + CLEANUP_TIMEOUT
+        while remaining and time.time() < deadline:
+            user_id, password = remaining[0]
+            ok = cleaner.delete_account(user_id, password)
+            cleaner.cookies.clear()
+            if ok:
+                remaining.pop(0)
+            else:
+                time.sleep(1.0)
+        if remaining:
+            print(f"削除できなかったユーザー: {', '.join(str(u) for u, _ in remaining)}")
+
+    routes, extra = stats.summary(elapsed)
+    return {
+        "url": args.url,
+        "users": args.users,
+        "duration_s": elapsed,
+        "mix": mix,
+        "registered_users": len(created),
+        "routes": routes,
+        "extra": extra,
+    }
+
+
+def print_results(results):
+    print(f"users={results['users']} duration={results['duration_s']:.1f}s "
+          f"registered={results['registered_users']}")
+    print(f"{'route':<26}{'req':>7}{'rps':>8}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}  outcomes")
+    for route, r in results["routes"].items():
+        outcomes = ", ".join(f"{k}={v}" for k, v in sorted(r["outcomes"].items()))
+        print(f"{route:<26}{r['requests']:>7}{r['throughput_rps']:>8.1f}{r['error_rate'] * 100:>7.1f}"
+              f"{r['p50_ms']:>8.1f}m{r['p95_ms']:>8.1f}m{r['p99_ms']:>8.1f}m  {outcomes}")
+    for name, e in results["extra"].items():
+        print(f"{name:<26} n={e['count']} mean={e['mean']:.2f} p50={e['p50']:.2f} p95={e['p95']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--users", type=int, default=10, help="同時に動かす仮想ユーザー数")
+    parser.add_argument("--duration", type=float, default=30, help="試験時間（秒）")
+    parser.add_argument("--mix", default="register=1,login=4,face=1", help="シナリオの割合")
+    parser.add_argument("--login", action="append", default=[], metavar="ID:PASSWORD",
+                        help="login シナリオで使う既存ユーザー（複数指定可）")
+    parser.add_argument("--password", default="load-test-pass", help="register で作るユーザーのパスワード")
+    parser.add_argument("--bad-login-rate", type=float, default=0.0,
+                        help="わざと間違ったパスワードで送る割合（ロックの競合を見る）")
+    parser.add_argument("--images", help="登録に使う顔画像のフォルダ（無ければ --face-image から合成）")
+    parser.add_argument("--face-image", help="合成画像に使う顔画像")
+    parser.add_argument("--images-per-user", type=int, default=3)
+    parser.add_argument("--face-watch", type=float, default=5.0, help="face で映像を受信する秒数")
+    parser.add_argument("--think-time", type=float, default=0.0, help="操作の間の最大待ち時間（秒）")
+    parser.add_argument("--cleanup", action="store_true", help="終了時に register で作ったユーザーを削除する")
+    parser.add_argument("--spawn-server", action="store_true", help="app.py をこのプロセスから起動する")
+    parser.add_argument("--port", type=int, default=5055, help="--spawn-server 時のポート")
+    parser.add_argument("--source", default="synthetic", help="--spawn-server 時の FACE_SOURCE")
+    parser.add_argument("--output", default="loadtest_results.json")
+    args = parser.parse_args()
+
+    # 顔の写っていない画像は登録時に弾かれるので、register には顔画像が必要
+    if parse_mix(args.mix).get("register", 0) > 0:
+        if not args.images and not args.face_image:
+            parser.error("register には --images か --face-image（顔の写った画像）が必要です")
+        if args.images and not load_images(args.images, 1):
+            parser.error(f"{args.images} に画像がありません")
+
+    proc = None
+    if args.spawn_server:
+        proc, args.url = spawn_server(args.port, args.source)
+    try:
+        results = run(args)
+    finally:
+        if proc is not None:
+            stop_server(proc)
+
+    print_results(results)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"結果: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+# 近似最近傍探索インデックス（NumPy のみ）
+# IVF（粗いクラスタリング）で探索範囲を nprobe 個のクラスタに絞り、
+# 必要に応じて PQ（直積量子化）で候補を粗く並べ替えてから、元の特徴量で厳密に再計算する。
+import threading
+import numpy as np
+
+# ===============================
+# 定数
+# ===============================
+DEFAULT_NLIST = 256       # クラスタ数
+DEFAULT_NPROBE = 8        # 探索するクラスタ数（大きいほど正確で遅い）
+DEFAULT_RERANK = 64       # PQ 使用時に厳密再計算する候補数
+KMEANS_ITERS = 10
+KMEANS_MAX_TRAIN = 50000  # 学習に使う最大件数
+
+
+def _sq_dist(q, c, c_sq=None):
+    """二乗ユークリッド距離 (len(q), len(c))"""
+    if c_sq is None:
+        c_sq = np.einsum("ij,ij->i", c, c)
+    q_sq = np.einsum("ij,ij->i", q, q)
+    d2 = q_sq[:, None] + c_sq[None, :] - 2.0 * (q @ c.T)
+    return np.maximum(d2, 0.0, out=d2)
+
+
+def kmeans(x, k, iters=KMEANS_ITERS, seed=0):
+    """単純な Lloyd 法（空クラスタは適当な点で埋め直す）"""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(x))
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+
+    for _ in range(iters):
+        assign = _sq_dist(x, centroids).argmin(axis=1)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+
+        # クラスタ順に並べて reduceat で合計する（np.add.at より高速）
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[~empty]
+        sums = np.add.reduceat(x[order], starts, axis=0)
+        centroids[~empty] = sums / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), int(empty.sum()))]
+
+    return centroids.astype(np.float32)
+
+
+# ===============================
+# IVF(+PQ) インデックス
+# ===============================
+class IVFIndex:
+    def __init__(self, dim=128, nlist=DEFAULT_NLIST, nprobe=DEFAULT_NPROBE,
+                 pq_m=0, rerank=DEFAULT_RERANK):
+        if pq_m and dim % pq_m:
+            raise ValueError("dim must be divisible by pq_m")
+
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.rerank = rerank
+        self._lock = threading.RLock()
+
+        self.centroids = None   # (nlist, dim)
+        self.codebooks = None   # (pq_m, 256, dim // pq_m)
+        self._codebook_sq = None
+
+        # id ごとのデータ（id = 行番号、削除は alive で管理）
+        self._vecs = np.zeros((0, dim), dtype=np.float32)
+        self._codes = np.zeros((0, max(pq_m, 1)), dtype=np.uint8)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._labels = []
+        self._size = 0
+
+        self._lists = [[] for _ in range(nlist)]
+        self._list_cache = {}
+
+    # ---------- 学習 ----------
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def train(self, vectors, seed=0):
+        x = np.asarray(vectors, dtype=np.float32)
+        if len(x) > KMEANS_MAX_TRAIN:
+            rng = np.random.default_rng(seed)
+            x = x[rng.choice(len(x), KMEANS_MAX_TRAIN, replace=False)]
+
+        with self._lock:
+            self.centroids = kmeans(x, self.nlist, seed=seed)
+            self.nlist = len(self.centroids)
+
+            if self.pq_m:
+                # 残差をサブベクトルごとにクラスタリング
+                residual = x - self.centroids[_sq_dist(x, self.centroids).argmin(axis=1)]
+                sub = self.dim // self.pq_m
+                self.codebooks = np.stack([
+                    self._pad_codebook(kmeans(residual[:, j * sub:(j + 1) * sub], 256, seed=seed + j))
+                    for j in range(self.pq_m)
+                ])
+                self._codebook_sq = np.einsum("mks,mks->mk", self.codebooks, self.codebooks)
+
+            # 既存データがあれば割り当て直す
+            ids = self.ids()
+            self._lists = [[] for _ in range(self.nlist)]
+            self._list_cache = {}
+            if len(ids):
+                self._assign_ids(ids)
+
+    @staticmethod
+    def _pad_codebook(cb):
+        if len(cb) < 256:
+            cb = np.concatenate([cb, np.repeat(cb[-1:], 256 - len(cb), axis=0)])
+        return cb
+
+    def _encode_pq(self, residual):
+        sub = self.dim // self.pq_m
+        codes = np.empty((len(residual), self.pq_m), dtype=np.uint8)
+        for j in range(self.pq_m):
+            codes[:, j] = _sq_dist(residual[:, j * sub:(j + 1) * sub], self.codebooks[j]).argmin(axis=1)
+        return codes
+
+    def _assign_ids(self, ids):
+        vecs = self._vecs[ids]
+        assign = _sq_dist(vecs, self.centroids).argmin(axis=1).astype(np.int32)
+        self._assign[ids] = assign
+        if self.pq_m:
+            self._codes[ids] = self._encode_pq(vecs - self.centroids[assign])
+        for i, c in zip(ids.tolist(), assign.tolist()):
+            self._lists[c].append(i)
+            self._list_cache.pop(c, None)
+
+    # ---------- 追加・削除 ----------
+    def _grow(self, n):
+        need = self._size + n
+        if need <= len(self._vecs):
+            return
+        cap = max(need, 2 * len(self._vecs), 1024)
+        self._vecs = np.resize(self._vecs, (cap, self.dim))
+        self._codes = np.resize(self._codes, (cap, self._codes.shape[1]))
+        self._assign = np.resize(self._assign, cap)
+        alive = np.zeros(cap, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._alive = alive
+
+    def add(self, vectors, labels):
+        """特徴量を追加し、割り当てた id の配列を返す"""
+        x = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            self._grow(len(x))
+            ids = np.arange(self._size, self._size + len(x))
+            self._vecs[ids] = x
+            self._alive[ids] = True
+            self._labels.extend(str(l) for l in labels)
+            self._size += len(x)
+            if self.is_trained:
+                self._assign_ids(ids)
+            return ids
+
+    def remove(self, ids):
+        with self._lock:
+            ids = np.asarray(ids, dtype=np.intp)
+            self._alive[ids] = False
+            for c in set(self._assign[ids].tolist()) if self.is_trained else ():
+                self._list_cache.pop(c, None)
+
+    def __len__(self):
+        return int(self._alive[:self._size].sum())
+
+    @property
+    def deleted_fraction(self):
+        """削除済みの行の割合（探索・保存で無駄になる分。compact() で 0 に戻る）"""
+        return 1.0 - len(self) / self._size if self._size else 0.0
+
+    def label(self, i):
+        return self._labels[i]
+
+    def ids(self):
+        """削除されていない id の配列"""
+        return np.flatnonzero(self._alive[:self._size])
+
+    def vectors(self, ids=None):
+        return self._vecs[self.ids() if ids is None else ids]
+
+    # ---------- 検索 ----------
+    def _list(self, c):
+        """クラスタ c の (ids, 特徴量, 二乗ノルム, PQコード) を連続配列で返す"""
+        entry = self._list_cache.get(c)
+        if entry is None:
+            ids = np.asarray(self._lists[c], dtype=np.intp)
+            ids = ids[self._alive[ids]]
+            self._lists[c] = ids.tolist()
+            vecs = self._vecs[ids]
+            entry = (ids, vecs, np.einsum("ij,ij->i", vecs, vecs), self._codes[ids])
+            self._list_cache[c] = entry
+        return entry
+
+    @staticmethod
+    def _top(d2, ids, k):
+        k = min(k, len(ids))
+        top = np.argpartition(d2, k - 1)[:k]
+        top = top[np.argsort(d2[top])]
+        return np.sqrt(d2[top]), ids[top]
+
+    def _exact(self, q, ids, k):
+        d2 = _sq_dist(q[None, :], self._vecs[ids])[0]
+        return self._top(d2, ids, k)
+
+    def search(self, queries, k=1, nprobe=None, exact=False):
+        """
+        各クエリの近い順 k 件を返す
+        戻り値: [(distances, ids), ...]（クエリごと）
+        未学習または exact=True のときは全件の厳密探索を行う
+        """
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+
+        with self._lock:
+            all_ids = self.ids()
+            if len(all_ids) == 0:
+                return [(np.zeros(0), np.zeros(0, dtype=np.intp)) for _ in q]
+
+            if exact or not self.is_trained:
+                return [self._exact(v, all_ids, k) for v in q]
+
+            probes = np.argpartition(_sq_dist(q, self.centroids), nprobe - 1, axis=1)[:, :nprobe]
+            results = []
+            for v, probe in zip(q, probes):
+                lists = [self._list(c) for c in probe]
+                ids = np.concatenate([entry[0] for entry in lists])
+                if len(ids) == 0:
+                    # 候補が無い場合は厳密探索に戻す
+                    results.append(self._exact(v, all_ids, k))
+                    continue
+
+                if self.pq_m and len(ids) > self.rerank:
+                    # PQ の近似距離で候補を絞ってから元の特徴量で厳密に再計算する
+                    approx = np.concatenate([
+                        self._pq_distances(v, c, entry[3]) for c, entry in zip(probe, lists)
+                    ])
+                    n = max(self.rerank, k)
+                    cand = ids[np.argpartition(approx, n - 1)[:n]]
+                    results.append(self._exact(v, cand, k))
+                    continue
+
+                # クラスタごとに連続配列のまま距離を計算する（候補をコピーしない）
+                v_sq = float(v @ v)
+                d2 = np.concatenate([entry[2] - 2.0 * (entry[1] @ v) for entry in lists]) + v_sq
+                np.maximum(d2, 0.0, out=d2)
+                results.append(self._top(d2, ids, k))
+            return results
+
+    def _pq_distances(self, v, c, codes):
+        """クラスタ c の PQ コードに対する近似二乗距離（距離表を引くだけ）"""
+        # ||r - c||^2 = ||r||^2 + ||c||^2 - 2 r・c
+        residual = (v - self.centroids[c]).reshape(self.pq_m, -1)
+        table = self._codebook_sq - 2.0 * np.einsum("ms,mks->mk", residual, self.codebooks)
+        r_sq = float(residual.ravel() @ residual.ravel())
+        return table[np.arange(self.pq_m), codes].sum(axis=1) + r_sq
+
+    def match(self, queries, k=1, nprobe=None, candidates=32):
+        """
+        GalleryMatrix.match と同じ形でユーザー単位の上位 k 件を返す
+        （近いサンプルを candidates 件取り、ユーザーごとに最小距離でまとめる）
+        """
+        results = []
+        for dist, ids in self.search(queries, k=max(k, candidates), nprobe=nprobe):
+            top, seen = [], set()
+            for d, i in zip(dist.tolist(), ids.tolist()):
+                user = self._labels[i]
+                if user in seen:
+                    continue
+                seen.add(user)
+                top.append((user, d))
+                if len(top) == k:
+                    break
+            results.append(top)
+        return results
+
+    # ---------- 保存・読み込み ----------
+    def save(self, path):
+        with self._lock:
+            n = self._size
+            np.savez(
+                path,
+                params=np.array([self.dim, self.nlist, self.nprobe, self.pq_m, self.rerank]),
+                centroids=self.centroids if self.is_trained else np.zeros((0, self.dim), np.float32),
+                codebooks=self.codebooks if self.codebooks is not None else np.zeros(0, np.float32),
+                vecs=self._vecs[:n],
+                alive=self._alive[:n],
+                labels=np.array(self._labels, dtype=str),
+            )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        dim, nlist, nprobe, pq_m, rerank = (int(v) for v in data["params"])
+        index = cls(dim=dim, nlist=nlist, nprobe=nprobe, pq_m=pq_m, rerank=rerank)
+        if len(data["centroids"]):
+            index.centroids = data["centroids"]
+            index.nlist = len(index.centroids)
+            index._lists = [[] for _ in range(index.nlist)]
+        if pq_m:
+            index.codebooks = data["codebooks"]
+            index._codebook_sq = np.einsum("mks,mks->mk", index.codebooks, index.codebooks)
+
+        alive = data["alive"]
+        if len(alive):
+            ids = index.add(data["vecs"], data["labels"].tolist())
+            index.remove(ids[~alive])
+        return index
+
+    def compact(self):
+        """削除済みの行を詰めて作り直す（id は振り直される）"""
+        with self._lock:
+            keep = self.ids()
+            vecs = self._vecs[keep].copy()
+            labels = [self._labels[i] for i in keep.tolist()]
+            self._vecs = np.zeros((0, self.dim), dtype=np.float32)
+            self._codes = np.zeros((0, self._codes.shape[1]), dtype=np.uint8)
+            self._assign = np.zeros(0, dtype=np.int32)
+            self._alive = np.zeros(0, dtype=bool)
+            self._labels = []
+            self._size = 0
+            self._lists = [[] for _ in range(self.nlist)]
+            self._list_cache = {}
+            return self.add(vecs, labels)
@@ -0,0 +1,321 @@
+# 顔認証セッションの状態管理
+# AUTH_STATES（auth_sid -> FaceAuthState）を、ロック分割・TTL・件数上限付きのストアにする。
+# バックエンドは1プロセス用のメモリと、複数ワーカーで共有できる SQLite を選べる。
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+
+# ===============================
+# 定数
+# ===============================
+AUTH_STORE_BACKEND = os.environ.get("AUTH_STORE", "memory")   # memory / sqlite
+AUTH_STORE_PATH = os.environ.get("AUTH_STORE_PATH", "auth_states.db")
+SESSION_TTL = 300         # 最後に触られてからこの秒数で破棄
+MAX_SESSIONS = 10000      # 保持する最大件数（超えたら古いものから破棄）
+LOCK_STRIPES = 16         # ロックの分割数
+PURGE_INTERVAL = 30       # 期限切れを掃除する間隔（秒）
+POLL_INTERVAL = 0.1       # SQLite で変更を待つときの確認間隔（秒）
+MAX_LIMITER_KEYS = 10000  # AttemptLimiter が覚えておく sid / IP の最大数
+
+
+class FaceAuthState:
+    __slots__ = (
+        "authenticated", "username", "success_frames",
+        "face_detected", "face_detected_time", "failed",
+        "claimed_user_id",
+    )
+
+    def __init__(self):
+        self.authenticated = False
+        self.username = "未確認"
+        self.success_frames = 0
+        self.face_detected = False
+        self.face_detected_time = None
+        self.failed = False
+        # 1:1 照合モードで申告されたユーザーID（None なら 1:N）
+        self.claimed_user_id = None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(state, name, data[name])
+        return state
+
+    def snapshot(self):
+        """変更検出用"""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+# ===============================
+# メモリ（1プロセス用）
+# ===============================
+class MemorySessionStore:
+    def __init__(self, ttl=SESSION_TTL, max_size=MAX_SESSIONS, stripes=LOCK_STRIPES):
+        self.ttl = ttl
+        # 各ストライプのロックは Condition にして、保存時に待機中のスレッドを起こす
+        self._stripes = [(threading.Condition(), OrderedDict()) for _ in range(stripes)]
+        self._max_per_stripe = max(1, max_size // stripes)
+        self._last_purge = time.time()
+
+    def _stripe(self, sid):
+        return self._stripes[zlib.crc32(sid.encode()) % len(self._stripes)]
+
+    def get(self, sid, default=None):
+        if not sid:
+            return default
+        lock, items = self._stripe(sid)
+        now = time.time()
+        with lock:
+            entry = items.get(sid)
+            if entry is None:
+                return default
+            if now - entry[1] > self.ttl:
+                del items[sid]
+                return default
+            # 触ったものは最新として末尾へ
+            items[sid] = (entry[0], now)
+            items.move_to_end(sid)
+            return entry[0]
+
+    def save(self, sid, state):
+        lock, items = self._stripe(sid)
+        with lock:
+            items[sid] = (state, time.time())
+            items.move_to_end(sid)
+            while len(items) > self._max_per_stripe:
+                items.popitem(last=False)
+            lock.notify_all()
+        self._maybe_purge()
+
+    def pop(self, sid, default=None):
+        if not sid:
+            return default
+        lock, items = self._stripe(sid)
+        with lock:
+            entry = items.pop(sid, None)
+            lock.notify_all()
+        return default if entry is None else entry[0]
+
+    def wait_for_change(self, sid, last=None, timeout=None):
+        """
+        状態の snapshot() が last と変わるまで待つ
+        戻り値: (state or None, snapshot or None)。timeout までに変わらなければ現在の値を返す
+        """
+        if not sid:
+            # sid がまだ無い（/video_feed より先に呼ばれた）：状態は無いまま timeout まで待つ
+            if timeout:
+                time.sleep(timeout)
+            return None, None
+        lock, items = self._stripe(sid)
+        deadline = None if timeout is None else time.time() + timeout
+        with lock:
+            while True:
+                entry = items.get(sid)
+                state = entry[0] if entry else None
+                snap = state.snapshot() if state else None
+                remaining = None if deadline is None else deadline - time.time()
+                if snap != last or (remaining is not None and remaining <= 0):
+                    return state, snap
+                lock.wait(remaining)
+
+    def purge(self):
+        """期限切れを全て削除する"""
+        now = time.time()
+        for lock, items in self._stripes:
+            with lock:
+                # 末尾ほど新しいので、先頭から期限切れを落とす
+                while items:
+                    sid, (_, touched) = next(iter(items.items()))
+                    if now - touched <= self.ttl:
+                        break
+                    items.popitem(last=False)
+
+    def _maybe_purge(self):
+        if time.time() - self._last_purge > PURGE_INTERVAL:
+            self._last_purge = time.time()
+            self.purge()
+
+    def __len__(self):
+        return sum(len(items) for _, items in self._stripes)
+
+    # dict と同じ書き方もできるようにしておく
+    def __contains__(self, sid):
+        return self.get(sid) is not None
+
+    def __getitem__(self, sid):
+        state = self.get(sid)
+        if state is None:
+            raise KeyError(sid)
+        return state
+
+    def __setitem__(self, sid, state):
+        self.save(sid, state)
+
+
+# ===============================
+# SQLite（複数ワーカープロセスで共有）
+# ===============================
+class SqliteSessionStore:
+    """
+    状態を JSON で SQLite に保存する
+    get() はコピーを返すので、変更後は save() で書き戻すこと
+    """
+
+    def __init__(self, path=AUTH_STORE_PATH, ttl=SESSION_TTL, max_size=MAX_SESSIONS):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS auth_states (
+            sid TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            touched REAL NOT NULL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_auth_states_touched ON auth_states (touched)")
+        conn.commit()
+
+    def _conn(self):
+        # 接続はスレッドごとに持つ
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid, default=None):
+        if not sid:
+            return default
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT data, touched FROM auth_states WHERE sid = ?", (sid,)
+        ).fetchone()
+        if row is None:
+            return default
+        if time.time() - row[1] > self.ttl:
+            # pop() は get() を呼ぶので、ここでは直接消す
+            conn.execute("DELETE FROM auth_states WHERE sid = ?", (sid,))
+            conn.commit()
+            return default
+        return FaceAuthState.from_dict(json.loads(row[0]))
+
+    def save(self, sid, state):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO auth_states (sid, data, touched) VALUES (?, ?, ?)",
+            (sid, json.dumps(state.to_dict()), time.time()),
+        )
+        conn.commit()
+        self._maybe_purge()
+
+    def pop(self, sid, default=None):
+        state = self.get(sid) if sid else None
+        if sid:
+            conn = self._conn()
+            conn.execute("DELETE FROM auth_states WHERE sid = ?", (sid,))
+            conn.commit()
+        return default if state is None else state
+
+    def wait_for_change(self, sid, last=None, timeout=None):
+        """MemorySessionStore.wait_for_change と同じ（別プロセスの変更も見えるよう短い間隔で確認する）"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            state = self.get(sid)
+            snap = state.snapshot() if state else None
+            if snap != last or (deadline is not None and time.time() >= deadline):
+                return state, snap
+            time.sleep(POLL_INTERVAL)
+
+    def purge(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM auth_states WHERE touched < ?", (time.time() - self.ttl,))
+        # 件数上限を超えた分は古い順に削除
+        conn.execute("""
+        DELETE FROM auth_states WHERE sid IN (
+            SELECT sid FROM auth_states ORDER BY touched DESC LIMIT -1 OFFSET ?
+        )
+        """, (self.max_size,))
+        conn.commit()
+
+    def _maybe_purge(self):
+        if time.time() - self._last_purge > PURGE_INTERVAL:
+            self._last_purge = time.time()
+            self.purge()
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM auth_states").fetchone()[0]
+
+    def __contains__(self, sid):
+        return self.get(sid) is not None
+
+    def __getitem__(self, sid):
+        state = self.get(sid)
+        if state is None:
+            raise KeyError(sid)
+        return state
+
+    def __setitem__(self, sid, state):
+        self.save(sid, state)
+
+
+# ===============================
+# 試行回数の制限
+# ===============================
+class AttemptLimiter:
+    """
+    キー（sid・IP アドレスなど）ごとに、直近 window 秒の試行を max_attempts 回までに制限する
+    プロセスごとに数えるので、複数ワーカーでは最大でワーカー数倍まで試行できる
+    """
+
+    def __init__(self, max_attempts, window, max_keys=MAX_LIMITER_KEYS):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> 試行時刻の deque（古いキーから先頭に並ぶ）
+        self._attempts = OrderedDict()
+
+    def hit(self, *keys, now=None):
+        """全てのキーが上限未満なら試行を記録して True、どれかが上限なら何も記録せず False"""
+        now = time.time() if now is None else now
+        with self._lock:
+            recent = []
+            for key in keys:
+                times = self._attempts.get(key)
+                if times is None:
+                    times = deque()
+                while times and now - times[0] >= self.window:
+                    times.popleft()
+                if len(times) >= self.max_attempts:
+                    return False
+                recent.append((key, times))
+
+            for key, times in recent:
+                times.append(now)
+                self._attempts[key] = times
+                self._attempts.move_to_end(key)
+            while len(self._attempts) > self.max_keys:
+                self._attempts.popitem(last=False)
+            return True
+
+
+def create_session_store(backend=AUTH_STORE_BACKEND):
+    if backend == "sqlite":
+        return SqliteSessionStore()
+    if backend == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"unknown auth store backend: {backend}")
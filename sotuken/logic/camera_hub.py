@@ -0,0 +1,149 @@
+# カメラ共有ハブ
+# カメラはプロセス内で1回だけ開き、読み込んだフレームを全ての視聴者（購読者）に配る。
+# 購読者が0人になってから IDLE_TIMEOUT 秒たつとカメラを閉じる。
+import threading
+import time
+
+from logic.stream_pipeline import LatestQueue
+from logic.frame_source import open_frame_source
+
+# ===============================
+# 定数
+# ===============================
+IDLE_TIMEOUT = 10.0       # 購読者がいなくなってからカメラを閉じるまで（秒）
+READ_TIMEOUT = 2.0        # 購読者がフレームを待つ最大時間（秒）
+CLOSE_TIMEOUT = 5.0       # close() で読み込みスレッドの終了を待つ最大時間（秒）
+SUBSCRIBER_QUEUE_SIZE = 1
+
+
+class CameraSubscription:
+    """1視聴者分の購読。cap.read() と同じ形の read() を持つ"""
+
+    def __init__(self, hub):
+        self._hub = hub
+        self.queue = LatestQueue(SUBSCRIBER_QUEUE_SIZE)
+        self.closed = False
+
+    def read(self):
+        if self.closed:
+            return False, None
+        frame = self.queue.get(READ_TIMEOUT)
+        return frame is not None, frame
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.queue.close()
+            self._hub._unsubscribe(self)
+
+
+class CameraHub:
+    def __init__(self, open_capture=None, idle_timeout=IDLE_TIMEOUT):
+        # 既定は環境変数 FACE_SOURCE のソース（カメラ・動画・画像フォルダ・合成映像）
+        self._open_capture = open_capture or open_frame_source
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._cap = None
+        self._thread = None
+        self._idle_since = None
+        # close() が読み込みスレッドに終了を頼んだ（スレッドがカメラを閉じて False に戻す）
+        self._stopping = False
+
+    # ---------- 購読 ----------
+    def subscribe(self):
+        """購読を開始する（カメラを開けなければ None）"""
+        while True:
+            with self._lock:
+                stopping = self._thread if self._stopping else None
+                if stopping is None:
+                    return self._subscribe_locked()
+            # close() 中：前の読み込みスレッドがカメラを閉じ終わるまで待ってから開き直す
+            stopping.join(READ_TIMEOUT)
+
+    def _subscribe_locked(self):
+        if self._cap is None:
+            cap = self._open_capture()
+            if not cap.isOpened():
+                cap.release()
+                return None
+            self._cap = cap
+
+        sub = CameraSubscription(self)
+        self._subscribers.append(sub)
+        self._idle_since = None
+
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._reader_loop, daemon=True)
+            self._thread.start()
+        return sub
+
+    def _unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+            if not self._subscribers:
+                self._idle_since = time.time()
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    # ---------- 読み込みスレッド ----------
+    # スレッドが動いている間、カメラを閉じるのはこのスレッドだけ（cap.read() 中に閉じないように）
+    def _reader_loop(self):
+        while True:
+            with self._lock:
+                cap = self._cap
+                idle = (
+                    not self._subscribers
+                    and self._idle_since is not None
+                    and time.time() - self._idle_since > self.idle_timeout
+                )
+                if cap is None or idle or self._stopping:
+                    self._release_locked()
+                    return
+
+            ret, frame = cap.read()
+
+            with self._lock:
+                subscribers = list(self._subscribers)
+                if not ret:
+                    # カメラが外れた等：全購読者を終了させる
+                    for sub in subscribers:
+                        sub.queue.close()
+                    self._release_locked()
+                    return
+
+            for sub in subscribers:
+                sub.queue.put(frame)
+
+    def _release_locked(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self._thread = None
+        self._stopping = False
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """
+        カメラを閉じる。読み込みスレッドがあれば、今の read() が戻ってから
+        スレッド自身に閉じさせ、その終了を待つ
+        """
+        with self._lock:
+            for sub in self._subscribers:
+                sub.queue.close()
+            self._subscribers = []
+            thread = self._thread
+            if thread is None:
+                self._release_locked()
+                return
+            self._stopping = True
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+
+
+# プロセス全体で共有するハブ
+CAMERA_HUB = CameraHub()
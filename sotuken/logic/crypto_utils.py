@@ -1,17 +1,44 @@
-# 暗号化・複合化　モジュール
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
-
-# AES鍵（16, 24, 32バイトで設定可能）
-KEY = b"this_is_my_key16"
-
-def encrypt_bytes(data: bytes) -> bytes:  #暗号化
-    cipher = AES.new(KEY, AES.MODE_CBC)
-    ct_bytes = cipher.encrypt(pad(data, AES.block_size))
-    return cipher.iv + ct_bytes
-
-def decrypt_bytes(enc_data: bytes) -> bytes:  #複号化
-    iv = enc_data[:16]
-    ct = enc_data[16:]
-    cipher = AES.new(KEY, AES.MODE_CBC, iv)
-    return unpad(cipher.decrypt(ct), AES.block_size)
+# 暗号化・複合化　モジュール
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+import numpy as np
+
+# AES鍵（16, 24, 32バイトで設定可能）
+KEY = b"this_is_my_key16"
+
+def encrypt_bytes(data: bytes) -> bytes:  #暗号化
+    cipher = AES.new(KEY, AES.MODE_CBC)
+    ct_bytes = cipher.encrypt(pad(data, AES.block_size))
+    return cipher.iv + ct_bytes
+
+def decrypt_bytes(enc_data: bytes) -> bytes:  #複号化
+    iv = enc_data[:16]
+    ct = enc_data[16:]
+    cipher = AES.new(KEY, AES.MODE_CBC, iv)
+    return unpad(cipher.decrypt(ct), AES.block_size)
+
+
+def decrypt_fixed_size_bulk(enc_list, size: int) -> np.ndarray:
+    """
+    平文の長さが全て size バイトの暗号データ（encrypt_bytes の出力）をまとめて復号し、
+    (件数, size) の uint8 配列で返す
+    CBC の復号は P_i = D(C_i) xor C_{i-1} なので、全件の暗号ブロックを1回の ECB 復号にかけ、
+    1つ前のブロック（先頭は IV）との xor を NumPy でまとめて行う（1件ずつ AES を作らない）
+    """
+    n_blocks = size // AES.block_size + 1            # パディング込みのブロック数
+    blob_size = AES.block_size * (n_blocks + 1)      # IV + 暗号ブロック
+    if not enc_list:
+        return np.empty((0, size), dtype=np.uint8)
+    if any(len(enc) != blob_size for enc in enc_list):
+        raise ValueError(f"暗号データの長さが {blob_size} バイトではありません")
+
+    blobs = np.frombuffer(b"".join(enc_list), dtype=np.uint8).reshape(len(enc_list), blob_size)
+    ct = np.ascontiguousarray(blobs[:, AES.block_size:])
+    plain = np.frombuffer(AES.new(KEY, AES.MODE_ECB).decrypt(ct.tobytes()), dtype=np.uint8)
+    plain = plain.reshape(ct.shape) ^ blobs[:, :-AES.block_size]
+
+    # PKCS#7 パディングの確認（鍵違い・壊れたデータの検出）
+    pad_len = n_blocks * AES.block_size - size
+    if not (plain[:, size:] == pad_len).all():
+        raise ValueError("パディングが正しくありません")
+    return plain[:, :size]
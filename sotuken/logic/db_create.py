@@ -1,34 +1,51 @@
-#テーブル作成用
-import sqlite3
-
-DB_NAME = "faces.db"
-
-def create_database():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    # ユーザー情報テーブル（パスワードを追加）
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        password_hash TEXT NOT NULL
-    )
-    ''')
-
-    # 顔画像テーブル（ユーザーIDと紐づく）
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS faces (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        face_data BLOB NOT NULL,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    )
-    ''')
-
-    conn.commit()
-    conn.close()
-    print(f"データベース '{DB_NAME}' を作成しました。")
-
-if __name__ == "__main__":
-    create_database()
\ No newline at end of file
+#テーブル作成用
+import sqlite3
+
+DB_NAME = "faces.db"
+
+def ensure_embedding_column(conn):
+    """
+    既存の faces テーブルに face_embedding 列（暗号化した特徴量 128 x float32）が無ければ追加する
+    古い faces.db をそのまま使えるようにするための移行処理
+    """
+    c = conn.cursor()
+    columns = [row[1] for row in c.execute("PRAGMA table_info(faces)")]
+    if columns and "face_embedding" not in columns:
+        c.execute("ALTER TABLE faces ADD COLUMN face_embedding BLOB")
+        conn.commit()
+        print("faces テーブルに face_embedding 列を追加しました。")
+
+def create_database():
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+
+    # ユーザー情報テーブル（パスワードを追加）
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        password_hash TEXT NOT NULL
+    )
+    ''')
+
+    # 顔画像テーブル（ユーザーIDと紐づく）
+    # face_embedding: 登録時に作った顔特徴量（float32 x 128 = 512バイト）を暗号化したもの
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS faces (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        face_data BLOB NOT NULL,
+        face_embedding BLOB,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''')
+
+    # 以前の版で作った faces.db には列を追加する
+    ensure_embedding_column(conn)
+
+    conn.commit()
+    conn.close()
+    print(f"データベース '{DB_NAME}' を作成しました。")
+
+if __name__ == "__main__":
+    create_database()
@@ -1,250 +1,455 @@
-import cv2
-import os
-import time
-import secrets
-import numpy as np
-import face_recognition
-
-from flask import (
-    Blueprint, Response,
-    render_template, jsonify,
-    session, redirect
-)
-
-from PIL import Image, ImageDraw, ImageFont
-from logic import spl as db
-
-# ===============================
-# 定数
-# ===============================
-# 許容値
-TOLERANCE_THRESHOLD = 1
-FAIL_TIMEOUT = 3
-MAX_SUCCESS_FRAMES = 15
-FONT_PATH = "C:/Windows/Fonts/meiryo.ttc"
-
-# ===============================
-# グローバル認証状態
-# ===============================
-AUTH_STATES = {}
-
-
-class FaceAuthState:
-    def __init__(self):
-        self.authenticated = False
-        self.username = "未確認"
-        self.success_frames = 0
-        self.face_detected = False
-        self.face_detected_time = None
-        self.failed = False
-
-
-# ===============================
-# 認証状態取得（混線防止の核）
-# ===============================
-def get_auth_state():
-    sid = session.get("auth_sid")
-
-    if not sid:
-        sid = secrets.token_hex(16) #ここでauth_sidを生成している
-        session["auth_sid"] = sid
-
-    if sid not in AUTH_STATES:
-        AUTH_STATES[sid] = FaceAuthState()
-
-    return AUTH_STATES[sid]
-
-
-def clear_auth_state():
-    sid = session.get("auth_sid")
-    if sid:
-        AUTH_STATES.pop(sid, None)
-    session.clear()
-
-
-# ===============================
-# 顔データロード
-# ===============================
-def load_known_faces():
-    encodings, names = [], []
-
-    for root, _, files in os.walk("picture"):
-        person = os.path.basename(root)
-        if person == "picture":
-            continue
-
-        for f in files:
-            if f.lower().endswith((".jpg", ".png")):
-                img = face_recognition.load_image_file(os.path.join(root, f))
-                enc = face_recognition.face_encodings(img)
-                if enc:
-                    encodings.append(enc[0])
-                    names.append(person)
-
-    return encodings, names
-
-
-# ===============================
-# Blueprint
-# ===============================
-face_auth_bp = Blueprint(
-    "face_auth",
-    __name__,
-    template_folder="../templates"
-)
-
-# ===============================
-# カメラストリーム
-# ===============================
-def generate_frames(auth_sid):
-    # state = get_auth_state()
-    if auth_sid not in AUTH_STATES:
-        AUTH_STATES[auth_sid] = FaceAuthState()
-    state = AUTH_STATES[auth_sid]
-    known_encodings, known_names = load_known_faces()
-
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        return
-
-    font = ImageFont.truetype(FONT_PATH, 20)
-    frame_count = 0
-
-    try:
-        while True:
-            if state.authenticated and state.success_frames >= MAX_SUCCESS_FRAMES:
-                break
-
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            if frame_count % 3 == 0 and not state.authenticated:
-                small = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-                rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
-
-                locations = face_recognition.face_locations(rgb)
-                encodings = face_recognition.face_encodings(rgb, locations)
-
-                if locations and not state.face_detected:
-                    state.face_detected = True
-                    state.face_detected_time = time.time()
-
-                names = []
-                for enc in encodings:
-                    name = "未確認"
-                    if known_encodings:
-                        dist = face_recognition.face_distance(known_encodings, enc)
-                        idx = np.argmin(dist)
-                        if dist[idx] < TOLERANCE_THRESHOLD:
-                            name = known_names[idx]
-                            state.authenticated = True
-                            state.username = name
-                    names.append(name)
-
-                saved_locations = locations
-                saved_names = names
-
-            if "saved_locations" in locals():
-                pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                draw = ImageDraw.Draw(pil)
-
-                for (t, r, b, l), name in zip(saved_locations, saved_names):
-                    t *= 4; r *= 4; b *= 4; l *= 4
-                    color = (0, 255, 0) if name != "未確認" else (255, 0, 0)
-                    cv2.rectangle(frame, (l, t), (r, b), color, 2)
-                    draw.text((l + 6, b - 28), name, font=font, fill=(255, 255, 255))
-
-                frame = cv2.cvtColor(np.array(pil), cv2.COLOR_RGB2BGR)
-
-            if state.authenticated:
-                state.success_frames += 1
-
-            if state.face_detected and not state.authenticated:
-                if time.time() - state.face_detected_time > FAIL_TIMEOUT:
-                    state.failed = True
-                    clear_auth_state()
-                    break
-
-            ret, buffer = cv2.imencode(".jpg", frame)
-            yield (
-                b"--frame\r\n"
-                b"Content-Type: image/jpeg\r\n\r\n"
-                + buffer.tobytes()
-                + b"\r\n"
-            )
-
-            frame_count += 1
-
-    finally:
-        cap.release()
-        cv2.destroyAllWindows()
-
-
-# ===============================
-# Routes
-# ===============================
-@face_auth_bp.route("/face_recognition_page")
-def face_recognition_page():
-    return render_template("Face_recognition.html")
-
-@face_auth_bp.route("/video_feed")
-def video_feed():
- # コンテキストが生きているここで session を操作する
-    sid = session.get("auth_sid")
-    if not sid:
-        sid = secrets.token_hex(16)
-        session["auth_sid"] = sid
-    
-    if sid not in AUTH_STATES:
-        AUTH_STATES[sid] = FaceAuthState()
-    else:
-        # 開始時にリセット
-        AUTH_STATES[sid] = FaceAuthState()
-
-    return Response(
-        generate_frames(sid), # 引数として sid を渡す
-        mimetype="multipart/x-mixed-replace; boundary=frame"
-    )
-
-
-@face_auth_bp.route("/auth_status")
-def auth_status():
-    sid = session.get("auth_sid")
-    state = AUTH_STATES.get(sid)
-
-    if not state:
-        return jsonify({"status": "unauthenticated"})
-
-    # 認証成功時の処理
-    if state.authenticated and state.success_frames >= MAX_SUCCESS_FRAMES:
-        # ここは「リクエストコンテキスト内」なのでsessionが使える
-        user = db.search_user(state.username)
-        if user:
-            session["user_id"] = user.id
-            session["username"] = user.username
-            return jsonify({
-                "status": "authenticated",
-                "username": user.username,
-                "redirect_url": "/"
-            })
-
-    # 失敗時の処理
-    if state.failed:
-        AUTH_STATES.pop(sid, None)
-        return jsonify({
-            "status": "failed",
-            "redirect_url": "/login_page" # 手打ちに遷移
-        })
-
-    return jsonify({"status": "unauthenticated"})
-
-
-@face_auth_bp.route("/delete_account", methods=["POST"])
-def delete_account():
-    user_id = session.get("user_id")
-    if user_id:
-        db.delete_user(user_id)
-
-    clear_auth_state()
-    return redirect("/login_page")
+import cv2
+import os
+import json
+import time
+import secrets
+import numpy as np
+
+from flask import (
+    Blueprint, Response,
+    render_template, jsonify,
+    session, redirect, request
+)
+
+from logic import spl as db
+from logic.face_gallery import GALLERY
+from logic.stream_pipeline import StreamPipeline
+from logic.camera_hub import CAMERA_HUB
+from logic.recognition_service import RECOGNITION_SERVICE
+from logic.face_tracker import FaceTracker, UNKNOWN_NAME
+from logic.recognition_scheduler import AdaptiveScheduler
+from logic.overlay import OverlayRenderer, JpegEncoder
+from logic.face_prefilter import FacePrefilter
+from logic.recognition_profiles import get_profile
+from logic.auth_sessions import FaceAuthState, AttemptLimiter, create_session_store
+from logic import metrics
+from logic.thresholds import TOLERANCE_THRESHOLD, VERIFY_THRESHOLD
+
+# ===============================
+# 定数
+# ===============================
+# 1:1 照合を始められる回数（sid・IP アドレスごとに CLAIM_WINDOW 秒あたり）
+CLAIM_MAX_ATTEMPTS = 5
+CLAIM_WINDOW = 300
+FAIL_TIMEOUT = 3
+MAX_SUCCESS_FRAMES = 15
+STATE_TOUCH_INTERVAL = 5.0   # 配信中に状態ストアの期限を延ばす間隔（秒）
+SSE_KEEPALIVE = 15           # /auth_events の生存確認コメントの間隔（秒）
+SSE_MAX_DURATION = 300       # /auth_events の1接続の最長時間（ブラウザが自動で再接続する）
+MJPEG_PART_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+# 照合方法（sample: ユーザー内で最も近い画像 / centroid: ユーザーの平均特徴量）
+# 近似最近傍インデックスを使う大規模時は、centroid を指定しても sample で照合する
+MATCH_MODE = "sample"
+
+# ===============================
+# グローバル認証状態
+# ===============================
+# auth_sid -> FaceAuthState（TTL・件数上限付き。AUTH_STORE=sqlite で複数ワーカー共有）
+AUTH_STATES = create_session_store()
+# 1:1 照合の試行回数（他人の ID を指定して何度も試すのを防ぐ）
+CLAIM_LIMITER = AttemptLimiter(CLAIM_MAX_ATTEMPTS, CLAIM_WINDOW)
+
+metrics.register_gauge("face_auth_sessions", "Face auth sessions held in AUTH_STATES.",
+                       lambda: len(AUTH_STATES))
+metrics.register_gauge("face_gallery_users", "Users in the face gallery.", GALLERY.user_count)
+metrics.register_gauge("face_gallery_encodings", "Face encodings in the face gallery.",
+                       GALLERY.encoding_count)
+
+
+# ===============================
+# 認証状態取得（混線防止の核）
+# ===============================
+def get_auth_state():
+    sid = session.get("auth_sid")
+
+    if not sid:
+        sid = secrets.token_hex(16) #ここでauth_sidを生成している
+        session["auth_sid"] = sid
+
+    state = AUTH_STATES.get(sid)
+    if state is None:
+        state = FaceAuthState()
+        AUTH_STATES.save(sid, state)
+
+    return state
+
+
+def reset_auth_state():
+    """顔認証ページを開いたときに前回の状態を捨てる（古い結果を通知しないため）"""
+    sid = session.get("auth_sid")
+    if sid:
+        AUTH_STATES.pop(sid, None)
+    else:
+        # /video_feed と /auth_events が同じ sid を使えるよう、ページを返す時点で作っておく
+        session["auth_sid"] = secrets.token_hex(16)
+
+
+def clear_auth_state():
+    sid = session.get("auth_sid")
+    if sid:
+        AUTH_STATES.pop(sid, None)
+    session.clear()
+
+
+# ===============================
+# 顔データロード
+# ===============================
+def load_known_faces():
+    """
+    キャッシュ済みの (encodings, names) を返す
+    初回のみ picture 以下を全走査し、以降は GALLERY.reload_user() 等で更新する
+    """
+    if GALLERY.version == 0:
+        GALLERY.refresh()
+    return GALLERY.get()
+
+
+def load_gallery():
+    """照合用の GalleryMatrix を返す"""
+    if GALLERY.version == 0:
+        GALLERY.refresh()
+    return GALLERY.matrix()
+
+
+def match_faces(encodings, k=1, claimed_user_id=None):
+    """
+    顔ごとに上位 k ユーザーを [(user_id, distance), ...] で返す
+    claimed_user_id を指定すると、そのユーザーの画像とだけ照合する（1:1）
+    登録枚数が多いときは近似最近傍インデックス（MATCH_MODE によらず sample）、少ないときは全件照合を使う
+    """
+    if len(encodings) == 0:
+        return []
+    if claimed_user_id is not None:
+        return GALLERY.user_matrix(claimed_user_id).match(encodings, k=k, mode=MATCH_MODE)
+    index = GALLERY.index()
+    if index is not None:
+        return index.match(encodings, k=k)
+    return load_gallery().match(encodings, k=k, mode=MATCH_MODE)
+
+
+# ===============================
+# Blueprint
+# ===============================
+face_auth_bp = Blueprint(
+    "face_auth",
+    __name__,
+    template_folder="../templates"
+)
+
+# ===============================
+# カメラストリーム
+# ===============================
+def scale_locations(locations, scale):
+    """縮小画像上の顔枠を元のフレームの座標に戻す"""
+    inv = 1.0 / scale
+    return [tuple(int(round(v * inv)) for v in loc) for loc in locations]
+
+
+def recognize_frame(state, frame, tracker, scheduler, matcher=match_faces, service=RECOGNITION_SERVICE,
+                    prefilter=None, profile=None):
+    """
+    1フレーム分の顔検出・照合を行い (locations, names) を返す（座標は元のフレーム基準）
+    パイプラインの認識スレッドから呼ばれる
+    前回と同じ顔（トラック）は照合結果を引き継ぎ、特徴量を計算し直さない
+    認識するかどうか・縮小率はスケジューラが実測時間と動き量から決める
+    prefilter があれば、Haar・動き・追跡中の顔で HOG を行う範囲を絞る（誰もいなければ HOG しない）
+    profile は検出の設定（None なら FACE_PROFILE_STREAM。縮小率はスケジューラが決める）
+    matcher / service はベンチマークで合成ギャラリー・別設定に差し替えるためのもの
+    """
+    if state.authenticated or not scheduler.should_run(frame):
+        return None
+    profile = profile or get_profile("stream")
+
+    scale = scheduler.scale
+    t0 = time.perf_counter()
+    small = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+    rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - t0, "downscale")
+
+    t0 = time.perf_counter()
+    if prefilter is not None:
+        hints = [tuple(int(v * scale) for v in t.box) for t in tracker.tracks]
+        small_locations = prefilter.detect(rgb, hints, scheduler.motion_score)
+        metrics.PREFILTER.inc(result=prefilter.last_decision)
+    else:
+        small_locations = profile.locations(rgb)
+    t1 = time.perf_counter()
+    metrics.RECOGNITIONS.inc()
+    metrics.STAGE_SECONDS.observe(t1 - t0, "detect")
+    locations = scale_locations(small_locations, scale)
+    if locations and not state.face_detected:
+        state.face_detected = True
+        state.face_detected_time = time.time()
+
+    tracks, need = tracker.update(locations)
+    encode_time = 0.0
+    # 1:1 は指定されたユーザーとだけ比べるので、1:N の緩い許容値は使わない
+    threshold = TOLERANCE_THRESHOLD if state.claimed_user_id is None else VERIFY_THRESHOLD
+    if need:
+        # 特徴量計算はプロセスプールでセッション横断にまとめて行う
+        encodings = service.encode(rgb, [small_locations[i] for i in need])
+        t2 = time.perf_counter()
+        encode_time = t2 - t1
+        metrics.STAGE_SECONDS.observe(encode_time, "encode")
+
+        # 新しい顔・信頼度の落ちた顔だけをまとめて照合する（特徴量を作れなかった顔は None で、照合しない）
+        valid = [j for j, enc in enumerate(encodings) if enc is not None]
+        matches = matcher([encodings[j] for j in valid], k=1, claimed_user_id=state.claimed_user_id)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - t2, "match")
+        tops = dict(zip(valid, matches))
+        for j, i in enumerate(need):
+            top = tops.get(j)
+            name, dist = UNKNOWN_NAME, None
+            if top and top[0][1] < threshold:
+                name, dist = top[0]
+                state.authenticated = True
+                state.username = name
+            tracker.set_identity(tracks[i], name, dist)
+
+    if prefilter is not None and prefilter.last_decision == "skip":
+        # HOG を行わなかった回は処理時間として記録しない（平均が下がって縮小率が上がり続けるため）
+        scheduler.faces_seen = False
+    else:
+        scheduler.record(t1 - t0, encode_time, bool(locations))
+    names = [t.name or UNKNOWN_NAME for t in tracks]
+    return locations, names
+
+
+def start_auth_session(sid, claimed_user_id=None, client=None):
+    """
+    配信開始時に状態をリセットする
+    1:1 照合は sid と client（IP アドレス）ごとに回数を制限し、超えたら失敗の状態で始める
+    """
+    state = FaceAuthState()
+    state.claimed_user_id = claimed_user_id
+    if claimed_user_id is not None:
+        keys = [f"sid:{sid}"] + ([f"ip:{client}"] if client else [])
+        if not CLAIM_LIMITER.hit(*keys):
+            state.failed = True
+    AUTH_STATES.save(sid, state)
+    return state
+
+
+def generate_frames(auth_sid):
+    """MJPEG（multipart/x-mixed-replace）の各パートを返す"""
+    for jpeg in generate_jpeg_frames(auth_sid):
+        # 連結によるコピーを避けるため分けて送る
+        yield MJPEG_PART_HEADER
+        yield jpeg
+        yield b"\r\n"
+
+
+def generate_jpeg_frames(auth_sid):
+    """認識結果を描画した JPEG を1枚ずつ返す（WSGI / ASGI どちらの配信からも使う）"""
+    # state = get_auth_state()
+    state = AUTH_STATES.get(auth_sid)
+    if state is None:
+        state = FaceAuthState()
+        AUTH_STATES.save(auth_sid, state)
+    if state.failed:
+        # 1:1 の試行回数の上限（/auth_events → /auth_status で失敗として通知される）
+        return
+    if state.claimed_user_id is None:
+        load_gallery()
+
+    # カメラは全視聴者で共有する（各自が VideoCapture(0) を開かない）
+    camera = CAMERA_HUB.subscribe()
+    if camera is None:
+        return
+
+    # 名前ラベルのキャッシュと、描画・JPEG化用のバッファは配信ごとに使い回す
+    renderer = OverlayRenderer(unknown_name=UNKNOWN_NAME)
+    encoder = JpegEncoder()
+
+    # 取得・認識・配信を別スレッドに分ける（認識中も配信が止まらない）
+    profile = get_profile("stream")
+    tracker = FaceTracker()
+    scheduler = AdaptiveScheduler(scales=profile.scales, scale=profile.scale)
+    prefilter = FacePrefilter(profile=profile)
+    pipeline = StreamPipeline(
+        camera.read,
+        lambda frame: recognize_frame(state, frame, tracker, scheduler, prefilter=prefilter, profile=profile),
+    )
+    pipeline.start()
+
+    # 状態が変わったとき（と定期的に）ストアへ書き戻す（別ワーカーの /auth_status から見えるように）
+    saved = state.snapshot()
+    saved_at = time.time()
+    dropped = 0
+    metrics.ACTIVE_STREAMS.inc()
+
+    try:
+        for frame, result in pipeline.frames():
+            if state.snapshot() != saved or time.time() - saved_at > STATE_TOUCH_INTERVAL:
+                AUTH_STATES.save(auth_sid, state)
+                saved, saved_at = state.snapshot(), time.time()
+
+            if state.authenticated and state.success_frames >= MAX_SUCCESS_FRAMES:
+                break
+
+            if state.authenticated:
+                # 認証できたら認識スレッドは止める
+                pipeline.recognition_enabled = False
+
+            if result is not None:
+                with metrics.STAGE_SECONDS.time("draw"):
+                    frame = renderer.render(frame, *result)
+
+            if state.authenticated:
+                state.success_frames += 1
+
+            if state.face_detected and not state.authenticated:
+                if time.time() - state.face_detected_time > FAIL_TIMEOUT:
+                    # 失敗は /auth_status 側で通知・後片付けする
+                    state.failed = True
+                    break
+
+            with metrics.STAGE_SECONDS.time("imencode"):
+                buffer = encoder.encode(frame)
+            if buffer is None:
+                continue
+            if pipeline.dropped_frames != dropped:
+                metrics.DROPPED_FRAMES.inc(pipeline.dropped_frames - dropped)
+                dropped = pipeline.dropped_frames
+            metrics.observe_stream_frame()
+            yield buffer.tobytes()
+
+    finally:
+        metrics.ACTIVE_STREAMS.dec()
+        metrics.DROPPED_FRAMES.inc(pipeline.dropped_frames - dropped)
+        # 購読を先に閉じると、取得スレッドの camera.read() がフレームを待たずにすぐ戻る
+        camera.close()
+        pipeline.stop()
+        if state.snapshot() != saved:
+            AUTH_STATES.save(auth_sid, state)
+
+
+# ===============================
+# Routes
+# ===============================
+def get_claimed_user_id(args=None, sess=None):
+    """
+    1:1 照合の対象ユーザーIDを決める
+    ?claim=<id>（ログイン画面で入力されたID）> ログイン中の session["user_id"] の順
+    args / sess を省略すると Flask の request.args / session を使う（ASGI 側は自分で読んだものを渡す）
+    """
+    args = request.args if args is None else args
+    sess = session if sess is None else sess
+    claim = args.get("claim", "")
+    if claim.isdigit():
+        return int(claim)
+    return sess.get("user_id")
+
+
+@face_auth_bp.route("/face_recognition_page")
+def face_recognition_page():
+    reset_auth_state()
+    return render_template("Face_recognition.html", claim=get_claimed_user_id())
+
+@face_auth_bp.route("/video_feed")
+def video_feed():
+ # コンテキストが生きているここで session を操作する
+    sid = session.get("auth_sid")
+    if not sid:
+        sid = secrets.token_hex(16)
+        session["auth_sid"] = sid
+    
+    # 開始時にリセット
+    start_auth_session(sid, get_claimed_user_id(), request.remote_addr)
+
+    return Response(
+        generate_frames(sid), # 引数として sid を渡す
+        mimetype="multipart/x-mixed-replace; boundary=frame"
+    )
+
+
+def auth_state_status(state):
+    """状態から /auth_status と同じ status 文字列を作る（session には触らない）"""
+    if state is None:
+        return "unauthenticated"
+    if state.authenticated and state.success_frames >= MAX_SUCCESS_FRAMES:
+        return "authenticated"
+    if state.failed:
+        return "failed"
+    return "unauthenticated"
+
+
+@face_auth_bp.route("/auth_events")
+def auth_events():
+    """
+    認証状態を Server-Sent Events で通知する
+    ストリーム側が状態を保存した瞬間に送るので、1秒ごとのポーリングは不要
+    authenticated / failed を受け取ったら、ブラウザは /auth_status を1回呼んで session を確定する
+    """
+    sid = session.get("auth_sid")
+
+    def stream():
+        last_status = None
+        snap = None
+        deadline = time.time() + SSE_MAX_DURATION
+        # 接続直後に再接続間隔を伝える
+        yield "retry: 1000\n\n"
+
+        while time.time() < deadline:
+            state, new_snap = AUTH_STATES.wait_for_change(sid, snap, SSE_KEEPALIVE)
+            if new_snap == snap and last_status is not None:
+                yield ": keepalive\n\n"
+                continue
+            snap = new_snap
+
+            status = auth_state_status(state)
+            if status != last_status:
+                last_status = status
+                yield f"data: {json.dumps({'status': status})}\n\n"
+            if status in ("authenticated", "failed"):
+                break
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@face_auth_bp.route("/auth_status")
+def auth_status():
+    sid = session.get("auth_sid")
+    state = AUTH_STATES.get(sid)
+
+    if not state:
+        return jsonify({"status": "unauthenticated"})
+
+    # 認証成功時の処理
+    if state.authenticated and state.success_frames >= MAX_SUCCESS_FRAMES:
+        # ここは「リクエストコンテキスト内」なのでsessionが使える
+        user = db.search_user(state.username)
+        if user:
+            session["user_id"] = user.id
+            session["username"] = user.username
+            return jsonify({
+                "status": "authenticated",
+                "username": user.username,
+                "redirect_url": "/"
+            })
+
+    # 失敗時の処理
+    if state.failed:
+        AUTH_STATES.pop(sid, None)
+        return jsonify({
+            "status": "failed",
+            "redirect_url": "/login_page" # 手打ちに遷移
+        })
+
+    return jsonify({"status": "unauthenticated"})
+
+
+@face_auth_bp.route("/delete_account", methods=["POST"])
+def delete_account():
+    user_id = session.get("user_id")
+    if user_id and db.delete_user(user_id):
+        # app.py の削除と同じく、画像とギャラリーからも外す（残ると削除後も顔で照合される）
+        db.delete_user_picture(user_id)
+        GALLERY.remove_user(user_id)
+
+    clear_auth_state()
+    return redirect("/login_page")
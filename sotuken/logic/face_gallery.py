@@ -0,0 +1,343 @@
+# 顔ギャラリーキャッシュ
+# picture/<user_id> 以下の画像から作った顔特徴量をプロセス全体で保持する。
+# /video_feed のたびに全画像を読み直さず、変更のあったユーザーフォルダだけを更新する。
+import os
+import hashlib
+import threading
+import numpy as np
+from logic.gallery_matrix import GalleryMatrix
+from logic.ann_index import IVFIndex
+from logic.recognition_profiles import get_profile, STAGE_PROFILES
+from logic.image_io import load_rgb, thread_buffer
+
+# ===============================
+# 定数
+# ===============================
+PICTURE_DIR = "picture"
+IMAGE_EXTS = (".jpg", ".png")
+# True にするとファイル内容のハッシュでも変更を判定する（遅いが確実）
+USE_CONTENT_HASH = False
+
+# 登録枚数がこの数を超えたら近似最近傍インデックス（IVF）で照合する
+ANN_MIN_SIZE = 20000
+# 特徴量の作り方（プロファイル）が変われば別のインデックスにする
+ANN_INDEX_PATH = f"gallery_index.{STAGE_PROFILES['gallery']}.npz"
+# nprobe を上げると再現率が上がり、遅くなる
+ANN_PARAMS = {"nlist": 1024, "nprobe": 16, "pq_m": 0, "rerank": 128}
+# pq_m > 0 で直積量子化を使う（候補を粗く絞ってから厳密に再計算する）
+# 学習時の件数からこの倍率を超えて増えたらクラスタを学習し直す
+ANN_RETRAIN_GROWTH = 4
+# 削除済みの行（登録し直し・削除で残った古い特徴量）がこの割合を超えたら詰める
+ANN_COMPACT_FRACTION = 0.2
+# 登録時に作っておいた特徴量（<画像名>.<プロファイル名>.npy）
+EMBEDDING_SIDECAR_EXT = ".npy"
+
+
+def _file_signature(path):
+    """ファイルの変更判定用シグネチャ（mtime, size, [hash]）"""
+    st = os.stat(path)
+    if not USE_CONTENT_HASH:
+        return (st.st_mtime_ns, st.st_size, None)
+
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return (st.st_mtime_ns, st.st_size, h.hexdigest())
+
+
+def embedding_sidecar_path(image_path):
+    """登録時に作った特徴量の保存先（特徴量の作り方が変われば別のファイルになり、使われない）"""
+    return f"{image_path}.{STAGE_PROFILES['gallery']}{EMBEDDING_SIDECAR_EXT}"
+
+
+def _load_sidecar(path):
+    """画像より新しい特徴量ファイルがあれば読み込む（無い・壊れている場合は None）"""
+    sidecar = embedding_sidecar_path(path)
+    try:
+        if os.stat(sidecar).st_mtime_ns < os.stat(path).st_mtime_ns:
+            return None
+        enc = np.load(sidecar)
+    except (OSError, ValueError):
+        return None
+    return enc if enc.shape == (128,) else None
+
+
+def _encode_file(path):
+    """画像1枚から顔特徴量を1つ作る（顔が無ければ None）"""
+    enc = _load_sidecar(path)
+    if enc is not None:
+        return enc
+    # 長辺 DECODE_MAX_SIDE まで縮小して読む（使い回しのバッファ。特徴量は別の配列で返る）
+    img = load_rgb(path, buffer=thread_buffer())
+    # FACE_PROFILE_GALLERY（既定 balanced）の設定で作る（登録時に保存した特徴量と同じ設定）
+    enc = get_profile("gallery").encodings(img)
+    return enc[0] if enc else None
+
+
+# ===============================
+# ギャラリーキャッシュ
+# ===============================
+class FaceGalleryCache:
+    def __init__(self, root=PICTURE_DIR):
+        self.root = root
+        self._lock = threading.RLock()
+        # {user_id: {filename: (signature, encoding or None)}}
+        self._users = {}
+        # 内容が変わるたびに増える（利用側が再構築の要否を判定する）
+        self.version = 0
+        self._snapshot = None
+        self._matrix = None
+        # 1:1 照合用のユーザー別行列 {user_id: GalleryMatrix}
+        self._user_matrices = {}
+
+        # 近似最近傍インデックス（大規模時のみ使用）
+        self._index = None
+        self._index_ids = {}
+        self._index_trained_size = 0
+        self._dirty_users = set()
+
+    # ---------- 読み込み ----------
+    # 特徴量の計算（dlib）は時間がかかるのでロックの外で行い、結果を入れ替えるときだけロックを取る。
+    # 計算中も配信は古い内容の matrix() / index() で照合を続けられる。
+    def _scan_user(self, user_id, old):
+        """
+        ユーザーフォルダを走査し、変更があったファイルだけ特徴量を作り直す（ロックの外で呼ぶ）
+        old は走査前のそのユーザーの内容（無ければ None）。戻り値: (変更の有無, 新しい内容 or フォルダが無ければ None)
+        """
+        folder = os.path.join(self.root, user_id)
+        old = old or {}
+        new = {}
+
+        try:
+            files = os.listdir(folder)
+        except FileNotFoundError:
+            return old != {}, None
+
+        for f in files:
+            if not f.lower().endswith(IMAGE_EXTS):
+                continue
+            path = os.path.join(folder, f)
+            try:
+                sig = _file_signature(path)
+            except OSError:
+                continue
+
+            cached = old.get(f)
+            if cached and cached[0] == sig:
+                new[f] = cached
+                continue
+
+            try:
+                new[f] = (sig, _encode_file(path))
+            except Exception as e:
+                print(f"{path} の特徴量取得に失敗: {e}")
+                new[f] = (sig, None)
+
+        changed = new.keys() != old.keys() or any(
+            new[f][0] != old[f][0] for f in new
+        )
+        return changed, new
+
+    def _apply_scan(self, user_id, old, changed, entries):
+        """走査結果を反映する（ロック内で呼ぶ）。走査中に別の更新が入っていれば、そちらを優先する"""
+        if self._users.get(user_id) is not old:
+            return False
+        if entries is None:
+            self._users.pop(user_id, None)
+        elif changed:
+            self._users[user_id] = entries
+        return changed
+
+    def refresh(self):
+        """picture 以下を走査し、変更のあったユーザーだけ更新する"""
+        try:
+            users = [
+                d for d in os.listdir(self.root)
+                if os.path.isdir(os.path.join(self.root, d))
+            ]
+        except FileNotFoundError:
+            users = []
+
+        with self._lock:
+            olds = {user_id: self._users.get(user_id) for user_id in users}
+
+        scans = {user_id: self._scan_user(user_id, olds[user_id]) for user_id in users}
+
+        with self._lock:
+            changed = set(self._users) - set(users)
+            for user_id in changed:
+                del self._users[user_id]
+
+            for user_id, (user_changed, entries) in scans.items():
+                if self._apply_scan(user_id, olds[user_id], user_changed, entries):
+                    changed.add(user_id)
+
+            if changed:
+                self._bump(*changed)
+            return bool(changed)
+
+    def reload_user(self, user_id):
+        """登録・更新後に1ユーザー分だけ読み直す"""
+        user_id = str(user_id)
+        with self._lock:
+            old = self._users.get(user_id)
+
+        changed, entries = self._scan_user(user_id, old)
+
+        with self._lock:
+            changed = self._apply_scan(user_id, old, changed, entries)
+            if changed:
+                self._bump(user_id)
+            return changed
+
+    def remove_user(self, user_id):
+        """削除時にユーザーをキャッシュから外す"""
+        user_id = str(user_id)
+        with self._lock:
+            if self._users.pop(user_id, None) is not None:
+                self._bump(user_id)
+
+    def _bump(self, *user_ids):
+        self.version += 1
+        self._snapshot = None
+        self._matrix = None
+        self._dirty_users.update(user_ids)
+        for user_id in user_ids:
+            self._user_matrices.pop(user_id, None)
+
+    # ---------- 参照 ----------
+    def get(self):
+        """(encodings, names) を返す（load_known_faces と同じ形）"""
+        with self._lock:
+            if self._snapshot is None:
+                encodings, names = [], []
+                for user_id in sorted(self._users):
+                    for f in sorted(self._users[user_id]):
+                        enc = self._users[user_id][f][1]
+                        if enc is not None:
+                            encodings.append(enc)
+                            names.append(user_id)
+                self._snapshot = (encodings, names)
+            return self._snapshot
+
+    def matrix(self):
+        """照合用の GalleryMatrix を返す（内容が変わったときだけ作り直す）"""
+        with self._lock:
+            if self._matrix is None:
+                encodings, names = self.get()
+                self._matrix = GalleryMatrix(encodings, names)
+            return self._matrix
+
+    def user_matrix(self, user_id):
+        """
+        1ユーザー分だけの GalleryMatrix を返す（1:1 照合用）
+        キャッシュに無ければ picture/<user_id> だけを読み込む
+        """
+        user_id = str(user_id)
+        with self._lock:
+            known = user_id in self._users
+        if not known:
+            self.reload_user(user_id)
+
+        with self._lock:
+            matrix = self._user_matrices.get(user_id)
+            if matrix is None:
+                encs = self._user_encodings(user_id)
+                matrix = GalleryMatrix(list(encs), [user_id] * len(encs))
+                self._user_matrices[user_id] = matrix
+            return matrix
+
+    def _user_encodings(self, user_id):
+        entries = self._users.get(user_id, {})
+        encs = [entries[f][1] for f in sorted(entries) if entries[f][1] is not None]
+        return np.asarray(encs, dtype=np.float32).reshape(-1, 128)
+
+    def _sync_index_user(self, user_id):
+        """1ユーザー分のインデックスをキャッシュと揃える（同じなら何もしない）"""
+        index = self._index
+        current = self._user_encodings(user_id)
+        old_ids = self._index_ids.get(user_id)
+
+        if old_ids is not None and len(old_ids):
+            old = index.vectors(old_ids)
+            if old.shape == current.shape and np.allclose(old, current):
+                return
+            index.remove(old_ids)
+        self._index_ids.pop(user_id, None)
+
+        if len(current):
+            self._index_ids[user_id] = index.add(current, [user_id] * len(current))
+
+    def index(self):
+        """
+        登録枚数が ANN_MIN_SIZE 以上なら IVFIndex を返す（それ未満は None）
+        変更のあったユーザー分だけ挿入・削除して追従させる
+        照合はサンプル単位の最小距離（IVFIndex.match）で、MATCH_MODE の centroid は使わない
+        """
+        with self._lock:
+            if len(self.get()[0]) < ANN_MIN_SIZE:
+                return None
+
+            if self._index is None:
+                self._index = self._load_index()
+                self._dirty_users = set(self._users) | set(self._index_ids)
+
+            for user_id in self._dirty_users:
+                self._sync_index_user(user_id)
+            self._dirty_users = set()
+
+            if self._index.deleted_fraction > ANN_COMPACT_FRACTION:
+                # 削除済みの行は探索のたびに読み飛ばされ、保存もされるので詰める（id は振り直される）
+                self._index.compact()
+                self._index_ids = self._ids_by_user(self._index)
+
+            size = len(self._index)
+            if not self._index.is_trained or size > ANN_RETRAIN_GROWTH * self._index_trained_size:
+                self._index.train(self._index.vectors())
+                self._index_trained_size = size
+            return self._index
+
+    def _load_index(self):
+        """保存済みのインデックスがあれば読み込む（クラスタ学習を省略できる）"""
+        self._index_ids = {}
+        if not os.path.exists(ANN_INDEX_PATH):
+            return IVFIndex(**ANN_PARAMS)
+
+        try:
+            index = IVFIndex.load(ANN_INDEX_PATH)
+        except Exception as e:
+            print(f"インデックスの読み込みに失敗: {e}")
+            return IVFIndex(**ANN_PARAMS)
+
+        self._index_ids = self._ids_by_user(index)
+        self._index_trained_size = len(index)
+        return index
+
+    @staticmethod
+    def _ids_by_user(index):
+        """インデックスの {user_id: id の配列}"""
+        ids_by_user = {}
+        for i in index.ids().tolist():
+            ids_by_user.setdefault(index.label(i), []).append(i)
+        return {u: np.asarray(ids) for u, ids in ids_by_user.items()}
+
+    def save_index(self):
+        """インデックスをディスクに保存する（使っていなければ何もしない）"""
+        with self._lock:
+            if self._index is not None:
+                self._index.save(ANN_INDEX_PATH)
+
+    def user_count(self):
+        with self._lock:
+            return len(self._users)
+
+    def encoding_count(self):
+        with self._lock:
+            return sum(
+                1 for files in self._users.values() for _, enc in files.values() if enc is not None
+            )
+
+
+# プロセス全体で共有するキャッシュ
+GALLERY = FaceGalleryCache()
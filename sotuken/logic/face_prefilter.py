@@ -0,0 +1,126 @@
+# 顔検出の前段フィルタ
+# HOG（face_recognition.face_locations）は重いので、まず安い判定をして
+#   ・Haar カスケードで顔らしい所が見つかった / 追跡中の顔がある → その周辺だけ HOG で検出
+#   ・何も無く、動きも無い → HOG を行わない
+#   ・Haar では見つからないが動きがある → 取りこぼし防止のため時々だけ全体を HOG で検出
+# とする。誰も映っていない（キオスクで最も多い）状態の CPU 使用量をほぼ 0 にする。
+import time
+import cv2
+import numpy as np
+import face_recognition
+
+from logic.face_tracker import iou
+
+# ===============================
+# 定数
+# ===============================
+HAAR_CASCADE = "haarcascade_frontalface_default.xml"   # face_hiding.py と同じもの
+HAAR_SCALE_FACTOR = 1.1
+HAAR_MIN_NEIGHBORS = 3
+HAAR_MIN_SIZE = 16        # 縮小画像上での最小の顔サイズ（px）
+ROI_MARGIN = 0.5          # 候補領域の周りに付ける余白（枠サイズ比）
+MOTION_THRESHOLD = 2.0    # recognition_scheduler と同じ基準
+FULL_SCAN_INTERVAL = 2.0  # 動きがあるのに候補が無いとき、全体を検出する最短間隔（秒）
+DUPLICATE_IOU = 0.5       # 重なった領域で同じ顔が2回見つかったときに1つにまとめる基準
+
+
+def load_cascade():
+    """Haar カスケードを読み込む（無ければ None：動きだけで判定する）"""
+    if not hasattr(cv2, "CascadeClassifier"):
+        # objdetect を含まない OpenCV のビルド
+        return None
+    path = cv2.data.haarcascades + HAAR_CASCADE if hasattr(cv2, "data") else HAAR_CASCADE
+    cascade = cv2.CascadeClassifier(path)
+    return None if cascade.empty() else cascade
+
+
+def _expand(box, margin, width, height):
+    t, r, b, l = box
+    m = int(max(b - t, r - l) * margin)
+    return (max(0, t - m), min(width, r + m), min(height, b + m), max(0, l - m))
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[3] < b[1] and b[3] < a[1]
+
+
+def merge_regions(regions):
+    """重なる領域を1つの外接矩形にまとめる（同じ所を2回 HOG しない）"""
+    merged = []
+    for box in regions:
+        box = tuple(box)
+        changed = True
+        while changed:
+            changed = False
+            for other in merged:
+                if _overlaps(box, other):
+                    merged.remove(other)
+                    box = (min(box[0], other[0]), max(box[1], other[1]),
+                           max(box[2], other[2]), min(box[3], other[3]))
+                    changed = True
+                    break
+        merged.append(box)
+    return merged
+
+
+class FacePrefilter:
+    """配信ごとに1つ作る（全体検出をした時刻を覚えておく）"""
+
+    def __init__(self, cascade=None, full_scan_interval=FULL_SCAN_INTERVAL, profile=None):
+        self.cascade = cascade if cascade is not None else load_cascade()
+        # HOG の設定（recognition_profiles.RecognitionProfile。None なら既定の設定）
+        self.profile = profile
+        self.full_scan_interval = full_scan_interval
+        self._last_full_scan = 0.0
+        self.last_decision = None     # "skip" / "roi" / "full"（計測用）
+
+    def regions(self, rgb, hints=(), motion=0.0, now=None):
+        """
+        HOG を行うべき領域 (top, right, bottom, left) のリストを返す（座標は rgb 上）
+        None なら画像全体、空リストなら検出不要
+        hints: 追跡中の顔の枠（rgb 上の座標）
+        """
+        now = time.time() if now is None else now
+        h, w = rgb.shape[:2]
+        candidates = list(hints)
+
+        if self.cascade is not None:
+            gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+            found = self.cascade.detectMultiScale(
+                gray, HAAR_SCALE_FACTOR, HAAR_MIN_NEIGHBORS,
+                minSize=(HAAR_MIN_SIZE, HAAR_MIN_SIZE))
+            candidates += [(int(y), int(x + fw), int(y + fh), int(x)) for (x, y, fw, fh) in found]
+
+        if candidates:
+            self.last_decision = "roi"
+            return merge_regions(_expand(c, ROI_MARGIN, w, h) for c in candidates)
+
+        # 候補なし：動きがあれば時々だけ全体を検出する（Haar が苦手な横顔などの取りこぼし対策）
+        # 配信開始直後の1回目も全体を検出する
+        first = self._last_full_scan == 0.0
+        if first or (motion >= MOTION_THRESHOLD and now - self._last_full_scan >= self.full_scan_interval):
+            self._last_full_scan = now
+            self.last_decision = "full"
+            return None
+
+        self.last_decision = "skip"
+        return []
+
+    def detect(self, rgb, hints=(), motion=0.0, now=None):
+        """regions() で絞った範囲だけ face_locations を行い、rgb 上の枠を返す"""
+        regions = self.regions(rgb, hints, motion, now)
+        detect = self.profile.locations if self.profile is not None else face_recognition.face_locations
+        if regions is None:
+            return detect(rgb)
+
+        locations = []
+        for t, r, b, l in regions:
+            # dlib には連続したメモリの配列を渡す
+            crop = np.ascontiguousarray(rgb[t:b, l:r])
+            if crop.size == 0:
+                continue
+            for ct, cr, cb, cl in detect(crop):
+                loc = (ct + t, cr + l, cb + t, cl + l)
+                if all(iou(loc, other) < DUPLICATE_IOU for other in locations):
+                    locations.append(loc)
+        return locations
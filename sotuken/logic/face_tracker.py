@@ -0,0 +1,99 @@
+# 顔トラッキング
+# 検出した顔枠を IoU で前回の枠と対応付け、同じ顔には前回の照合結果を引き継ぐ。
+# 特徴量（face_encodings）は新しい顔・信頼度が落ちた顔・一定時間たった顔だけ計算する。
+import itertools
+import time
+
+# ===============================
+# 定数
+# ===============================
+IOU_THRESHOLD = 0.3       # これ以上重なれば同じ顔とみなす
+MAX_MISSES = 3            # 連続でこの回数見失ったらトラックを消す
+MIN_CONFIDENCE = 0.5      # 信頼度がこれを下回ったら特徴量を計算し直す
+KNOWN_REENCODE = 3.0      # 照合済みの顔を確認し直す間隔（秒）
+UNKNOWN_REENCODE = 0.5    # 未確認の顔を照合し直す間隔（秒）
+
+UNKNOWN_NAME = "未確認"
+
+
+def iou(a, b):
+    """(top, right, bottom, left) 形式の枠同士の IoU"""
+    t, r = max(a[0], b[0]), min(a[1], b[1])
+    bt, l = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, r - l) * max(0, bt - t)
+    if inter == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    _ids = itertools.count(1)
+
+    def __init__(self, box):
+        self.id = next(self._ids)
+        self.box = box
+        self.name = None          # None = まだ照合していない
+        self.distance = None
+        self.confidence = 0.0
+        self.misses = 0
+        self.encoded_at = 0.0
+
+    def needs_encoding(self, now):
+        if self.name is None or self.confidence < MIN_CONFIDENCE:
+            return True
+        interval = UNKNOWN_REENCODE if self.name == UNKNOWN_NAME else KNOWN_REENCODE
+        return now - self.encoded_at > interval
+
+
+class FaceTracker:
+    def __init__(self):
+        self.tracks = []
+
+    def update(self, locations, now=None):
+        """
+        今回検出した枠でトラックを更新する
+        戻り値: (locations と同じ順のトラック, 特徴量を計算すべき添字のリスト)
+        """
+        now = time.time() if now is None else now
+        matched = [None] * len(locations)
+        free = set(range(len(self.tracks)))
+
+        # IoU の大きい組から貪欲に対応付ける
+        pairs = sorted(
+            ((iou(loc, self.tracks[j].box), i, j)
+             for i, loc in enumerate(locations) for j in free),
+            reverse=True,
+        )
+        for score, i, j in pairs:
+            if score < IOU_THRESHOLD:
+                break
+            if matched[i] is not None or j not in free:
+                continue
+            track = self.tracks[j]
+            track.box = locations[i]
+            track.misses = 0
+            # 動きが大きいほど信頼度を下げる
+            track.confidence *= score
+            matched[i] = track
+            free.discard(j)
+
+        for j in free:
+            self.tracks[j].misses += 1
+
+        for i, loc in enumerate(locations):
+            if matched[i] is None:
+                matched[i] = Track(loc)
+                self.tracks.append(matched[i])
+
+        self.tracks = [t for t in self.tracks if t.misses <= MAX_MISSES]
+        need = [i for i, t in enumerate(matched) if t.needs_encoding(now)]
+        return matched, need
+
+    @staticmethod
+    def set_identity(track, name, distance, now=None):
+        track.name = name
+        track.distance = distance
+        track.confidence = 1.0
+        track.encoded_at = time.time() if now is None else now
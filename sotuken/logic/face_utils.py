@@ -1,16 +1,16 @@
-#顔特徴量の生成。
-import face_recognition
-import io
-from PIL import Image
-import numpy as np
-
-def get_face_embedding(image_bytes: bytes) -> np.ndarray:
-    """
-    復号済み画像データ（bytes）から顔特徴量を生成して返す
-    """
-    img = Image.open(io.BytesIO(image_bytes))
-    img_array = np.array(img)
-    encodings = face_recognition.face_encodings(img_array)
-    if not encodings:
-        raise ValueError("顔が検出できませんでした")
+#顔特徴量の生成。
+import numpy as np
+from recognition_profiles import get_profile
+from image_io import load_rgb, thread_buffer
+
+def get_face_embedding(image_bytes: bytes) -> np.ndarray:
+    """
+    復号済み画像データ（bytes）から顔特徴量を生成して返す
+    """
+    # 縮小展開・EXIF の向き補正をして RGB で読む（スレッドごとのバッファを使い回す）
+    img_array = load_rgb(image_bytes, buffer=thread_buffer())
+    # FACE_PROFILE_EMBEDDING（既定 enroll）の設定で作る
+    encodings = get_profile("embedding").encodings(img_array)
+    if not encodings:
+        raise ValueError("顔が検出できませんでした")
     return encodings[0]  # 1枚の画像につき1つの顔特徴量を返す
\ No newline at end of file
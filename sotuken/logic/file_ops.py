@@ -1,32 +1,135 @@
-# フォルダ内の画像を移動させる関数
-import os
-import shutil
-
-# app.py 159行目
-def move_upload_temp_to_user(user_id):
-    # 移動元（upload_temp）
-    src_dir = "upload_temp"
-
-    # 移動先（picture/<user_id>）
-    dst_dir = os.path.join("picture", str(user_id))
-
-    # 念のため存在チェックだけ行う（作成はしない）
-    if not os.path.isdir(dst_dir):
-        raise RuntimeError(f"Destination directory does not exist: {dst_dir}")
-
-    # upload_temp 内のファイルを走査
-    for name in os.listdir(src_dir):
-        src = os.path.join(src_dir, name)
-
-        # ファイルのみ対象
-        if not os.path.isfile(src):
-            continue
-
-        dst = os.path.join(dst_dir, name)
-
-        # 同名ファイルがあればエラー
-        if os.path.exists(dst):
-            raise RuntimeError(f"Already exists: {dst}")
-
-        # ファイル移動
-        shutil.move(src, dst)
+# 登録画像の一時保存（ステージング）と確定
+# 登録中の画像は upload_temp/<キー> に登録ごとに分けて置き、確定したらフォルダごと
+# picture/<user_id> へ1回の rename で移す（同時に登録している他の人の画像を巻き込まない）。
+# 確定されずに放置されたステージングは、バックグラウンドのスレッドが一定時間後に消す。
+# 登録時に作ったユーザーをステージングに記録しておき（set_staging_owner）、消すときに
+# on_expire で知らせる（画像の無いアカウントを残さないため）。
+import os
+import re
+import secrets
+import shutil
+import threading
+import time
+
+# ===============================
+# 定数
+# ===============================
+STAGING_ROOT = "upload_temp"
+PICTURE_DIR = "picture"
+STAGING_TTL = 30 * 60        # 確定されないステージングを消すまでの時間（秒）
+STAGING_GC_INTERVAL = 60     # 放置されたステージングを探す間隔（秒）
+STAGING_OWNER_FILE = ".owner"  # ステージングを作ったユーザーのID（確定時に消す）
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+_gc_thread = None
+_gc_lock = threading.Lock()
+
+
+def staging_dir(key):
+    """キーに対応するステージングのフォルダ（キーの形式が違えば ValueError）"""
+    if not isinstance(key, str) or not _KEY_PATTERN.match(key):
+        raise ValueError(f"invalid staging key: {key!r}")
+    return os.path.join(STAGING_ROOT, key)
+
+
+def create_staging():
+    """新しいステージングを作り、キーを返す（キーはセッションに保存しておく）"""
+    key = secrets.token_hex(16)
+    os.makedirs(staging_dir(key))
+    return key
+
+
+def discard_staging(key):
+    """ステージングを中身ごと消す（無ければ何もしない）"""
+    try:
+        path = staging_dir(key)
+    except ValueError:
+        return
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def set_staging_owner(key, user_id):
+    """ステージングに登録中のユーザーIDを記録する（放置されて消すときに on_expire へ渡す）"""
+    with open(os.path.join(staging_dir(key), STAGING_OWNER_FILE), "w", encoding="utf-8") as f:
+        f.write(str(user_id))
+
+
+def _read_owner(path):
+    try:
+        with open(os.path.join(path, STAGING_OWNER_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def commit_staging(key, user_id):
+    """ステージングのフォルダを picture/<user_id> に rename して確定する"""
+    src_dir = staging_dir(key)
+    dst_dir = os.path.join(PICTURE_DIR, str(user_id))
+
+    if not os.path.isdir(src_dir):
+        raise RuntimeError(f"Staging directory does not exist: {src_dir}")
+    # 移動先はここで初めて作られる（既にあれば別の登録と衝突している）
+    if os.path.exists(dst_dir):
+        raise RuntimeError(f"Already exists: {dst_dir}")
+
+    os.makedirs(PICTURE_DIR, exist_ok=True)
+    try:
+        os.remove(os.path.join(src_dir, STAGING_OWNER_FILE))
+    except FileNotFoundError:
+        pass
+    os.rename(src_dir, dst_dir)
+    return dst_dir
+
+
+def collect_stale_stagings(ttl=STAGING_TTL, now=None, on_expire=None):
+    """
+    最後の更新から ttl 秒を過ぎたステージングを消し、消した数を返す
+    on_expire があれば、記録されていたユーザーID（文字列）を渡して呼ぶ
+    """
+    now = time.time() if now is None else now
+    try:
+        entries = list(os.scandir(STAGING_ROOT))
+    except FileNotFoundError:
+        return 0
+
+    removed = 0
+    for entry in entries:
+        if not entry.is_dir() or not _KEY_PATTERN.match(entry.name):
+            continue
+        try:
+            if now - entry.stat().st_mtime < ttl:
+                continue
+        except FileNotFoundError:
+            continue    # 確定・破棄と同時に走査した
+        owner = _read_owner(entry.path)
+        shutil.rmtree(entry.path, ignore_errors=True)
+        removed += 1
+        if owner is not None and on_expire is not None:
+            on_expire(owner)
+    return removed
+
+
+def _gc_loop(interval, ttl, on_expire):
+    while True:
+        time.sleep(interval)
+        try:
+            removed = collect_stale_stagings(ttl, on_expire=on_expire)
+            if removed:
+                print(f"放置された登録画像を {removed} 件削除しました")
+        except Exception as e:
+            print(f"登録画像の削除に失敗: {e}")
+
+
+def start_staging_gc(interval=STAGING_GC_INTERVAL, ttl=STAGING_TTL, on_expire=None):
+    """
+    放置されたステージングを消すスレッドを開始する（2回目以降は何もしない）
+    on_expire(user_id) は消したステージングに記録されていたユーザーごとに呼ばれる
+    """
+    global _gc_thread
+    with _gc_lock:
+        if _gc_thread is None:
+            _gc_thread = threading.Thread(
+                target=_gc_loop, args=(interval, ttl, on_expire), name="staging-gc", daemon=True)
+            _gc_thread.start()
+    return _gc_thread
@@ -0,0 +1,240 @@
+# 映像の入力元（フレームソース）
+# cv2.VideoCapture と同じ isOpened() / read() / release() を持つので、そのまま差し替えられる。
+# Webカメラの無い環境でも、動画ファイル・画像フォルダ・合成映像で認識処理を動かせる。
+#
+# 環境変数 FACE_SOURCE で選ぶ：
+#   device:0               カメラ（既定）。数字だけ（"1" など）でもよい
+#   video:path/to/a.mp4    動画ファイル
+#   images:path/to/dir     画像フォルダ（名前順に繰り返す）
+#   synthetic              合成映像（顔なし）
+#   synthetic:face.jpg     合成映像（指定した顔画像が動き回る）
+# 環境変数 FACE_SOURCE_PACING で速さを選ぶ：
+#   realtime  実時間の速さで返す（FACE_SOURCE_FPS、動画は動画のFPS）
+#   fast      待たずにできるだけ速く返す（ベンチマーク用）
+import os
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+# ===============================
+# 定数
+# ===============================
+FACE_SOURCE = os.environ.get("FACE_SOURCE", "device:0")
+FACE_SOURCE_PACING = os.environ.get("FACE_SOURCE_PACING", "realtime")
+FACE_SOURCE_FPS = float(os.environ.get("FACE_SOURCE_FPS", "30"))
+SYNTHETIC_SIZE = (640, 480)
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+IMAGE_CACHE_SIZE = 64     # ImageDirSource が展開済みで持っておく画像の最大枚数
+
+
+class Pacer:
+    """realtime のときだけ、1フレームごとに 1/fps 秒になるよう待つ"""
+
+    def __init__(self, fps, realtime=True):
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.realtime = realtime
+        self._next = None
+
+    def wait(self):
+        if not self.realtime or not self.interval:
+            return
+        now = time.monotonic()
+        if self._next is None or now - self._next > self.interval:
+            # 初回・大きく遅れたときは基準を今に合わせる（遅れを取り戻そうと連続で返さない）
+            self._next = now
+        elif self._next > now:
+            time.sleep(self._next - now)
+        self._next += self.interval
+
+
+class FrameSource:
+    """フレームソースの基底クラス（cv2.VideoCapture 互換）"""
+
+    def __init__(self, fps=FACE_SOURCE_FPS, realtime=True):
+        self.pacer = Pacer(fps, realtime)
+        self.frames_read = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        frame = self._next_frame()
+        if frame is None:
+            return False, None
+        self.pacer.wait()
+        self.frames_read += 1
+        return True, frame
+
+    def _next_frame(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+
+class DeviceSource(FrameSource):
+    """カメラ（速さはカメラ自体が決めるので待たない）"""
+
+    def __init__(self, index=0):
+        super().__init__(realtime=False)
+        self.cap = cv2.VideoCapture(index)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def _next_frame(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, realtime=True, loop=True):
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or FACE_SOURCE_FPS
+        super().__init__(fps, realtime)
+        self.loop = loop
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def _next_frame(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop and self.frames_read > 0:
+            # 最後まで読んだら先頭に戻る
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirSource(FrameSource):
+    """
+    フォルダ内の画像を名前順に繰り返し返す
+    展開した画像は最近の cache_size 枚だけ持つ（枚数が少なければ2周目以降は読み直さない）
+    返すフレームは毎回コピーなので、呼び出し側で書き換えてよい
+    """
+
+    def __init__(self, path, fps=FACE_SOURCE_FPS, realtime=True, loop=True, size=None,
+                 cache_size=IMAGE_CACHE_SIZE):
+        super().__init__(fps, realtime)
+        self.loop = loop
+        self.size = size
+        self.cache_size = cache_size
+        try:
+            names = sorted(f for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTS))
+        except FileNotFoundError:
+            names = []
+        self.paths = [os.path.join(path, f) for f in names]
+        self._cache = OrderedDict()
+        self._unreadable = set()
+        self._pos = 0
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def _load(self, i):
+        if i in self._unreadable:
+            return None
+        frame = self._cache.get(i)
+        if frame is not None:
+            self._cache.move_to_end(i)
+            return frame.copy()
+
+        frame = cv2.imread(self.paths[i])
+        if frame is None:
+            self._unreadable.add(i)
+            return None
+        if self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if self.cache_size > 0:
+            self._cache[i] = frame
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            frame = frame.copy()
+        return frame
+
+    def _next_frame(self):
+        # 読めない画像は飛ばす（全部読めなければ終了）
+        for _ in range(len(self.paths)):
+            if self._pos >= len(self.paths):
+                if not self.loop:
+                    return None
+                self._pos = 0
+            frame = self._load(self._pos)
+            self._pos += 1
+            if frame is not None:
+                return frame
+        return None
+
+
+class SyntheticSource(FrameSource):
+    """
+    合成映像：ゆっくり変わる背景の上を、顔画像（あれば）が円を描いて動く
+    顔画像を渡せば検出・照合まで一通り動かせる
+    """
+
+    def __init__(self, face_path=None, size=SYNTHETIC_SIZE, fps=FACE_SOURCE_FPS,
+                 realtime=True, num_frames=None):
+        super().__init__(fps, realtime)
+        self.width, self.height = size
+        self.num_frames = num_frames
+        self.face = cv2.imread(face_path) if face_path else None
+        if self.face is not None:
+            # 顔が画面の高さの半分程度になるよう縮小する
+            scale = min(1.0, self.height * 0.5 / self.face.shape[0], self.width * 0.5 / self.face.shape[1])
+            if scale < 1.0:
+                self.face = cv2.resize(self.face, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        ys, xs = np.mgrid[0:self.height, 0:self.width]
+        self._gradient = ((xs + ys) * 255 // (self.width + self.height)).astype(np.uint8)
+
+    def _next_frame(self):
+        i = self.frames_read
+        if self.num_frames is not None and i >= self.num_frames:
+            return None
+
+        # 返したフレームは呼び出し側が保持するので毎回新しい配列にする
+        frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        frame[:, :, 0] = self._gradient
+        frame[:, :, 1] = self._gradient // 2 + np.uint8(i % 128)
+        frame[:, :, 2] = 128
+
+        if self.face is not None:
+            fh, fw = self.face.shape[:2]
+            cx = (self.width - fw) // 2 + int(np.cos(i / 30.0) * (self.width - fw) / 4)
+            cy = (self.height - fh) // 2 + int(np.sin(i / 30.0) * (self.height - fh) / 4)
+            frame[cy:cy + fh, cx:cx + fw] = self.face
+        else:
+            cx = int(self.width / 2 + np.cos(i / 30.0) * self.width / 4)
+            cy = int(self.height / 2 + np.sin(i / 30.0) * self.height / 4)
+            cv2.circle(frame, (cx, cy), self.height // 8, (200, 200, 200), -1)
+        return frame
+
+
+def open_frame_source(spec=None, pacing=None, fps=None):
+    """
+    設定（既定は環境変数 FACE_SOURCE / FACE_SOURCE_PACING / FACE_SOURCE_FPS）からソースを開く
+    """
+    spec = FACE_SOURCE if spec is None else str(spec)
+    realtime = (FACE_SOURCE_PACING if pacing is None else pacing) != "fast"
+    fps = FACE_SOURCE_FPS if fps is None else fps
+
+    kind, _, arg = spec.partition(":")
+    if kind.isdigit():
+        kind, arg = "device", kind
+
+    if kind == "device":
+        return DeviceSource(int(arg or 0))
+    if kind == "video":
+        return VideoFileSource(arg, realtime=realtime)
+    if kind == "images":
+        return ImageDirSource(arg, fps=fps, realtime=realtime)
+    if kind == "synthetic":
+        return SyntheticSource(arg or None, fps=fps, realtime=realtime)
+    raise ValueError(f"unknown frame source: {spec}")
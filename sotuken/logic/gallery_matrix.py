@@ -0,0 +1,130 @@
+# 顔特徴量ギャラリー（連続配列版）
+# 登録済み特徴量を1つの float32 行列にまとめ、1フレーム内の全ての顔を
+# 行列積1回でまとめて照合する。
+import numpy as np
+
+# ===============================
+# 定数
+# ===============================
+EMBEDDING_DIM = 128
+MATCH_MODES = ("sample", "centroid")
+
+
+class GalleryMatrix:
+    """
+    登録済み特徴量の行列と、行ごとのユーザーIDを保持する
+    行はユーザーごとに連続して並べる（ユーザー単位の集約を reduceat で行うため）
+    """
+
+    def __init__(self, encodings=(), names=(), dim=EMBEDDING_DIM):
+        n = len(encodings)
+
+        # 作った後は変更しない（ギャラリーが変わったら作り直す。照合中のスレッドと競合しない）
+        self._emb = np.zeros((n, dim), dtype=np.float32)
+        self._sq = np.zeros(n, dtype=np.float32)
+        self._labels = np.zeros(n, dtype=np.int32)
+        self.size = 0
+        self.dim = dim
+
+        # ユーザー単位の情報
+        self.user_ids = []
+        self._starts = np.zeros(0, dtype=np.intp)
+        self._centroids = np.zeros((0, dim), dtype=np.float32)
+        self._centroid_sq = np.zeros(0, dtype=np.float32)
+
+        if n:
+            self._fill(encodings, names)
+
+    # ---------- 構築 ----------
+    def _fill(self, encodings, names):
+        # 名前ごとにまとめる（安定ソートで元の順序を保つ）
+        order = sorted(range(len(names)), key=lambda i: str(names[i]))
+        emb = self._emb[:len(order)]
+        for row, i in enumerate(order):
+            emb[row] = encodings[i]
+
+        sorted_names = [str(names[i]) for i in order]
+        starts, user_ids = [], []
+        for row, name in enumerate(sorted_names):
+            if not user_ids or user_ids[-1] != name:
+                starts.append(row)
+                user_ids.append(name)
+            self._labels[row] = len(user_ids) - 1
+
+        self.size = len(order)
+        np.einsum("ij,ij->i", emb, emb, out=self._sq[:self.size])
+        self.user_ids = user_ids
+        self._starts = np.asarray(starts, dtype=np.intp)
+
+        # ユーザーごとの重心
+        counts = np.diff(np.append(self._starts, self.size))
+        self._centroids = (
+            np.add.reduceat(emb, self._starts, axis=0) / counts[:, None]
+        ).astype(np.float32)
+        self._centroid_sq = np.einsum("ij,ij->i", self._centroids, self._centroids)
+
+    @property
+    def embeddings(self):
+        return self._emb[:self.size]
+
+    @property
+    def labels(self):
+        """各行のユーザーID"""
+        return [self.user_ids[i] for i in self._labels[:self.size]]
+
+    def __len__(self):
+        return self.size
+
+    # ---------- 照合 ----------
+    def _as_queries(self, queries):
+        """(顔数, dim) にそろえる（1顔分の1次元配列も、空のリストも受け付ける）"""
+        return np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+
+    @staticmethod
+    def _euclidean(q, g, g_sq):
+        """||q - g|| を行列積1回で計算する"""
+        q_sq = np.einsum("ij,ij->i", q, q)
+        d2 = q_sq[:, None] + g_sq[None, :] - 2.0 * (q @ g.T)
+        np.maximum(d2, 0.0, out=d2)
+        return np.sqrt(d2, out=d2)
+
+    def distances(self, queries):
+        """全サンプルとの距離 (顔数, サンプル数)"""
+        q = self._as_queries(queries)
+        return self._euclidean(q, self.embeddings, self._sq[:self.size])
+
+    def user_distances(self, queries, mode="sample"):
+        """
+        ユーザー単位の距離 (顔数, ユーザー数)
+        sample: そのユーザーの最も近いサンプルとの距離
+        centroid: そのユーザーの重心との距離
+        """
+        if mode not in MATCH_MODES:
+            raise ValueError(f"unknown match mode: {mode}")
+        q = self._as_queries(queries)
+
+        if mode == "centroid":
+            return self._euclidean(q, self._centroids, self._centroid_sq)
+        return np.minimum.reduceat(self.distances(q), self._starts, axis=1)
+
+    def match(self, queries, k=1, mode="sample"):
+        """
+        各顔について距離の近い順に上位 k ユーザーを返す
+        戻り値: [[(user_id, distance), ...], ...]（顔ごと）
+        """
+        q = self._as_queries(queries)
+        if self.size == 0 or len(q) == 0:
+            return [[] for _ in range(len(q))]
+
+        d = self.user_distances(q, mode)
+        k = min(k, d.shape[1])
+        if k < d.shape[1]:
+            top = np.argpartition(d, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(d.shape[1]), d.shape)
+
+        results = []
+        for row, idx in zip(d, top):
+            idx = idx[np.argsort(row[idx])]
+            results.append([(self.user_ids[i], float(row[i])) for i in idx])
+        return results
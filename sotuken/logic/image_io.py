@@ -0,0 +1,89 @@
+# 画像の読み込み（登録・ギャラリー・復元で共通）
+# スマートフォンの写真（数千万画素）をそのまま展開すると遅くメモリも食うが、
+# 顔特徴量を作るには長辺 640px 程度あれば足りる。そこで
+#   ・JPEG は PIL の draft モードで 1/2・1/4・1/8 の縮小展開をする（DCT の段階で縮小するので速い）
+#   ・EXIF の向き情報どおりに回転する（縦向きで撮った写真の顔が横倒しにならないように）
+#   ・RGB uint8 の配列に変換する（使い回せるバッファにも書き込める）
+# ※ このファイルは logic/ 内のスクリプト（face_utils.py など）からも import されるので、
+#    logic パッケージの他のモジュールを import しないこと
+import io
+import os
+import threading
+import numpy as np
+from PIL import Image, ImageOps
+
+# ===============================
+# 定数
+# ===============================
+# 読み込み後の長辺の上限（0 なら元の大きさのまま）
+DECODE_MAX_SIDE = int(os.environ.get("FACE_DECODE_MAX_SIDE", "640"))
+
+
+class RGBBuffer:
+    """読み込み先の RGB 配列を使い回す（同じ大きさ以下なら確保し直さない）"""
+
+    def __init__(self):
+        self._data = np.empty(0, dtype=np.uint8)
+
+    def get(self, height, width):
+        size = height * width * 3
+        if self._data.size < size:
+            self._data = np.empty(size, dtype=np.uint8)
+        return self._data[:size].reshape(height, width, 3)
+
+
+_local = threading.local()
+
+
+def thread_buffer():
+    """スレッドごとの RGBBuffer（並列に読み込んでも互いに上書きしない）"""
+    buf = getattr(_local, "buffer", None)
+    if buf is None:
+        buf = _local.buffer = RGBBuffer()
+    return buf
+
+
+def _target_size(size, max_side):
+    w, h = size
+    if max_side <= 0 or max(w, h) <= max_side:
+        return size
+    ratio = max_side / max(w, h)
+    return (max(1, round(w * ratio)), max(1, round(h * ratio)))
+
+
+def open_image(source, max_side=DECODE_MAX_SIDE):
+    """
+    画像を開き、縮小・向きの補正・RGB 化をした PIL 画像を返す
+    source: ファイルパス / バイト列 / ファイルオブジェクト
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    img = Image.open(source)
+
+    target = _target_size(img.size, max_side)
+    if target != img.size and img.format == "JPEG":
+        # 目標以上の大きさで展開できる最小の縮小率を PIL が選ぶ（向きは回転前でも長辺の比は同じ）
+        img.draft("RGB", target)
+
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    target = _target_size(img.size, max_side)
+    if target != img.size:
+        img = img.resize(target, Image.BILINEAR, reducing_gap=2.0)
+    return img
+
+
+def load_rgb(source, max_side=DECODE_MAX_SIDE, buffer=None):
+    """
+    画像を (高さ, 幅, 3) の RGB uint8 配列として読み込む（face_recognition.load_image_file の代わり）
+    buffer (RGBBuffer) を渡すとその中に書き込んで返す。次に同じ buffer で読み込むと上書きされるので、
+    結果を残したい場合はコピーすること
+    """
+    img = open_image(source, max_side)
+    if buffer is None:
+        return np.array(img)
+    out = buffer.get(img.height, img.width)
+    out[...] = np.asarray(img)
+    return out
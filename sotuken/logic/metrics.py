@@ -0,0 +1,257 @@
+# 計測（Prometheus のテキスト形式で /metrics に出す）
+# 外部ライブラリは使わない。記録は「ロック1回＋配列の加算」だけなので本番でも常時有効にしてよい。
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# ===============================
+# 定数
+# ===============================
+# 処理時間のバケット（秒）：1ms〜2.5s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+FPS_WINDOW = 10           # 配信FPSを平均する時間（秒）
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape_label_value(value):
+    # テキスト形式ではラベル値の \ と " と改行をエスケープする（ユーザー名などがそのまま入るため）
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _escape_help(text):
+    # HELP 行では \ と改行だけをエスケープする
+    return str(text).replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.type = "counter"
+        self._values = {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        if len(items) > 1:
+            # ラベル付きで使われている場合、初期値のラベル無し 0 は出さない
+            items = [(key, value) for key, value in items if key or value]
+        return [(self.name, key, value) for key, value in items]
+
+
+class Gauge:
+    """値を set() するか、出力時に呼ぶ関数（callback）を渡す"""
+
+    def __init__(self, name, help_text, callback=None):
+        self.name = name
+        self.help = help_text
+        self.type = "gauge"
+        self.callback = callback
+        self._values = {(): 0}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                return [(self.name, (), self.callback())]
+            except Exception:
+                # 計測のせいで /metrics 全体を落とさない
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, key, value) for key, value in items]
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, label_name=None):
+        self.name = name
+        self.help = help_text
+        self.type = "histogram"
+        self.buckets = tuple(buckets)
+        self.label_name = label_name
+        # ラベル値 -> [バケットごとの件数..., 合計, 件数]
+        self._series = {}
+        self._lock = threading.Lock()
+        # 生の値も欲しいとき（ベンチマークで百分位数を出すなど）に呼ばれる関数
+        self.listeners = []
+
+    def observe(self, value, label=None):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [0] * (len(self.buckets) + 3)
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+        for listener in self.listeners:
+            listener(value, label)
+
+    @contextmanager
+    def time(self, label=None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, label)
+
+    def samples(self):
+        with self._lock:
+            items = [(label, list(series)) for label, series in self._series.items()]
+        out = []
+        for label, series in items:
+            base = () if label is None else ((self.label_name, label),)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                out.append((self.name + "_bucket", base + (("le", _format_value(bound)),), cumulative))
+            out.append((self.name + "_sum", base, series[-2]))
+            out.append((self.name + "_count", base, series[-1]))
+        return out
+
+
+class RateMeter:
+    """直近 window 秒の1秒あたりの件数（配信FPSなど）"""
+
+    def __init__(self, window=FPS_WINDOW):
+        self.window = window
+        self._counts = [0] * window
+        self._seconds = [0] * window
+        self._lock = threading.Lock()
+
+    def mark(self, n=1):
+        now = int(time.time())
+        i = now % self.window
+        with self._lock:
+            if self._seconds[i] != now:
+                self._seconds[i] = now
+                self._counts[i] = 0
+            self._counts[i] += n
+
+    def rate(self):
+        now = int(time.time())
+        with self._lock:
+            # 集計中の今の1秒は除く
+            total = sum(c for c, s in zip(self._counts, self._seconds) if now - self.window < s < now)
+        return total / float(self.window - 1)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text):
+        return self.register(Counter(name, help_text))
+
+    def gauge(self, name, help_text, callback=None):
+        return self.register(Gauge(name, help_text, callback))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, label_name=None):
+        return self.register(Histogram(name, help_text, buckets, label_name))
+
+    def render(self):
+        """Prometheus のテキスト形式で全メトリクスを返す"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# ===============================
+# アプリ全体で使うメトリクス
+# ===============================
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "face_pipeline_stage_seconds",
+    "Time spent in each face pipeline stage (downscale/detect/encode/match/draw/imencode).",
+    label_name="stage",
+)
+STREAM_FRAMES = REGISTRY.counter("face_stream_frames_total", "MJPEG frames sent to viewers.")
+STREAM_FPS_METER = RateMeter()
+STREAM_FPS = REGISTRY.gauge(
+    "face_stream_fps", f"MJPEG frames per second over the last {FPS_WINDOW}s (all viewers).",
+    callback=STREAM_FPS_METER.rate,
+)
+DROPPED_FRAMES = REGISTRY.counter(
+    "face_stream_dropped_frames_total", "Camera frames dropped because the viewer fell behind.")
+ACTIVE_STREAMS = REGISTRY.gauge("face_stream_active", "Viewers currently receiving the stream.")
+RECOGNITIONS = REGISTRY.counter("face_recognitions_total", "Frames that went through face detection.")
+PREFILTER = REGISTRY.counter(
+    "face_prefilter_total", "Prefilter decisions before HOG detection (skip/roi/full).")
+BCRYPT_SECONDS = REGISTRY.histogram(
+    "auth_bcrypt_seconds", "Time spent in bcrypt hashing and verification.", label_name="op")
+DB_QUERY_SECONDS = REGISTRY.histogram("db_query_seconds", "Time spent executing SQL statements.")
+
+
+def observe_stream_frame():
+    STREAM_FRAMES.inc()
+    STREAM_FPS_METER.mark()
+
+
+def register_gauge(name, help_text, callback):
+    """件数などを出力時に取りに行くゲージを追加する（ギャラリー件数など）"""
+    return REGISTRY.gauge(name, help_text, callback)
+
+
+def instrument_engine(engine):
+    """SQLAlchemy の engine に SQL 実行時間の計測を付ける"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if starts:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection else None
+        if starts:
+            starts.pop()
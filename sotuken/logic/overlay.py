@@ -0,0 +1,120 @@
+# 映像への描画とJPEG化
+# 名前ラベルはユーザーごとに一度だけ画像化（スプライト）しておき、フレームに直接書き込む。
+# フレームのコピー先・縮小先のバッファは使い回し、1フレームごとの確保をなくす。
+import os
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# ===============================
+# 定数
+# ===============================
+# 上から順に存在するフォントを使う（どれも無ければ PIL 標準フォント）
+FONT_PATHS = (
+    "C:/Windows/Fonts/meiryo.ttc",
+    "/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+FONT_SIZE = 20
+LABEL_COLOR = (255, 255, 255)     # BGR
+KNOWN_COLOR = (0, 255, 0)
+UNKNOWN_COLOR = (255, 0, 0)
+JPEG_QUALITY = 80                 # 配信する JPEG の画質（0-100）
+STREAM_MAX_WIDTH = 640            # 配信する映像の最大幅（0 なら縮小しない）
+LABEL_CACHE_SIZE = 256
+
+
+def load_font(size=FONT_SIZE):
+    for path in FONT_PATHS:
+        if os.path.exists(path):
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError:
+                continue
+    return ImageFont.load_default()
+
+
+class OverlayRenderer:
+    """顔枠と名前ラベルを描画する（出力先バッファは使い回す）"""
+
+    def __init__(self, font_size=FONT_SIZE, unknown_name="未確認"):
+        self.font = load_font(font_size)
+        self.unknown_name = unknown_name
+        self._labels = {}
+        self._out = None
+
+    def label(self, name):
+        """名前ラベルのスプライト (BGR画像, 文字部分のマスク) を返す（初回のみ描画）"""
+        sprite = self._labels.get(name)
+        if sprite is None:
+            left, top, right, bottom = self.font.getbbox(name)
+            w, h = max(1, right - left), max(1, bottom - top)
+            mask = Image.new("L", (w, h), 0)
+            ImageDraw.Draw(mask).text((-left, -top), name, font=self.font, fill=255)
+
+            mask = np.asarray(mask)[:, :, None] > 127
+            img = np.empty((h, w, 3), dtype=np.uint8)
+            img[:] = LABEL_COLOR
+            sprite = (img, mask)
+
+            if len(self._labels) >= LABEL_CACHE_SIZE:
+                self._labels.clear()
+            self._labels[name] = sprite
+        return sprite
+
+    def _blit(self, out, sprite, x, y):
+        """スプライトを (x, y) に書き込む（はみ出す部分は切り取る）"""
+        img, mask = sprite
+        h, w = out.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + img.shape[1], w), min(y + img.shape[0], h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        sx, sy = x0 - x, y0 - y
+        np.copyto(
+            out[y0:y1, x0:x1],
+            img[sy:sy + y1 - y0, sx:sx + x1 - x0],
+            where=mask[sy:sy + y1 - y0, sx:sx + x1 - x0],
+        )
+
+    def render(self, frame, locations, names):
+        """
+        frame をバッファにコピーして枠と名前を描画し、そのバッファを返す
+        （frame 自体は他スレッドと共有しているので書き換えない）
+        """
+        if self._out is None or self._out.shape != frame.shape:
+            self._out = np.empty_like(frame)
+        out = self._out
+        np.copyto(out, frame)
+
+        for (t, r, b, l), name in zip(locations, names):
+            color = KNOWN_COLOR if name != self.unknown_name else UNKNOWN_COLOR
+            cv2.rectangle(out, (l, t), (r, b), color, 2)
+            self._blit(out, self.label(name), l + 6, b - 28)
+        return out
+
+
+class JpegEncoder:
+    """配信用の JPEG 化（縮小先バッファを使い回す）"""
+
+    def __init__(self, quality=JPEG_QUALITY, max_width=STREAM_MAX_WIDTH):
+        self.quality = quality
+        self.max_width = max_width
+        self._params = [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+        self._resized = None
+
+    def _fit(self, frame):
+        h, w = frame.shape[:2]
+        if not self.max_width or w <= self.max_width:
+            return frame
+        size = (self.max_width, int(h * self.max_width / w))
+        if self._resized is None or self._resized.shape[:2] != (size[1], size[0]):
+            self._resized = np.empty((size[1], size[0]) + frame.shape[2:], dtype=frame.dtype)
+        cv2.resize(frame, size, dst=self._resized, interpolation=cv2.INTER_AREA)
+        return self._resized
+
+    def encode(self, frame):
+        """JPEG のバイト列（numpy 配列）を返す"""
+        ok, buf = cv2.imencode(".jpg", self._fit(frame), self._params)
+        return buf if ok else None
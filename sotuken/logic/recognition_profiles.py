@@ -0,0 +1,85 @@
+# 認識プロファイル（速さと精度の設定のまとまり）
+# 検出モデル・アップサンプル回数・ランドマークモデル・jitter 回数・縮小率を名前付きでまとめ、
+# 処理ごと（配信 / ギャラリー読み込み / 画像からの特徴量生成）に使うプロファイルを選べるようにする。
+#
+# 環境変数で処理ごとに選ぶ（値はプロファイル名）：
+#   FACE_PROFILE_STREAM     配信中の認識（既定 realtime）
+#   FACE_PROFILE_GALLERY    picture/ の登録画像の読み込み・登録時の特徴量（既定 balanced）
+#                           enroll にすると精度は少し上がるが、特徴量の無い画像が多いと起動時の
+#                           GALLERY.refresh() が約5倍遅くなる（jitters=5）
+#   FACE_PROFILE_EMBEDDING  face_utils.get_face_embedding（既定 enroll）
+# ※ このファイルは logic/ 内のスクリプト（restore_face.py など）からも import されるので、
+#    logic パッケージの他のモジュールを import しないこと
+import os
+import face_recognition
+
+
+class RecognitionProfile:
+    def __init__(self, name, detector="hog", upsample=1, landmarks="small", jitters=1,
+                 scale=1.0, scales=None):
+        self.name = name
+        self.detector = detector      # face_locations の model（hog / cnn）
+        self.upsample = upsample      # face_locations の number_of_times_to_upsample
+        self.landmarks = landmarks    # face_encodings の model（small: 5点 / large: 68点）
+        self.jitters = jitters        # face_encodings の num_jitters
+        self.scale = scale            # 検出前の縮小率（配信では初期値）
+        # 配信で AdaptiveScheduler が選んでよい縮小率
+        self.scales = tuple(scales) if scales else (scale,)
+
+    def locations(self, rgb):
+        return face_recognition.face_locations(
+            rgb, number_of_times_to_upsample=self.upsample, model=self.detector)
+
+    def encodings(self, rgb, locations=None):
+        """locations を省略すると、このプロファイルの設定で検出してから特徴量を作る"""
+        if locations is None:
+            locations = self.locations(rgb)
+        return face_recognition.face_encodings(
+            rgb, locations, num_jitters=self.jitters, model=self.landmarks)
+
+    def to_dict(self):
+        return {
+            "name": self.name, "detector": self.detector, "upsample": self.upsample,
+            "landmarks": self.landmarks, "jitters": self.jitters,
+            "scale": self.scale, "scales": list(self.scales),
+        }
+
+    def __repr__(self):
+        return f"RecognitionProfile({self.to_dict()})"
+
+
+# ===============================
+# プロファイル一覧
+# ===============================
+PROFILES = {
+    # 配信向け：縮小した画像で検出し、5点ランドマーク・jitters=1（1回だけ計算して平均化しない）
+    "realtime": RecognitionProfile("realtime", upsample=1, landmarks="small", jitters=1,
+                                   scale=0.25, scales=(0.2, 0.25, 0.33, 0.5)),
+    # 少し遅くてよい場面（ギャラリーの既定）：大きめの画像・68点ランドマーク・jitters=1
+    "balanced": RecognitionProfile("balanced", upsample=1, landmarks="large", jitters=1,
+                                   scale=0.5, scales=(0.33, 0.5)),
+    # 登録・ギャラリー作成向け：元の大きさ・68点ランドマーク・jitter で平均化
+    "enroll": RecognitionProfile("enroll", upsample=1, landmarks="large", jitters=5, scale=1.0),
+}
+
+STAGE_PROFILES = {
+    "stream": os.environ.get("FACE_PROFILE_STREAM", "realtime"),
+    # 起動時に全画像を読み込むので、jitter で何倍も遅くならない設定を既定にする
+    "gallery": os.environ.get("FACE_PROFILE_GALLERY", "balanced"),
+    "embedding": os.environ.get("FACE_PROFILE_EMBEDDING", "enroll"),
+}
+
+
+def register_profile(profile):
+    """独自のプロファイルを追加する（同じ名前は上書き）"""
+    PROFILES[profile.name] = profile
+    return profile
+
+
+def get_profile(stage_or_name):
+    """処理名（stream / gallery / embedding）かプロファイル名からプロファイルを返す"""
+    name = STAGE_PROFILES.get(stage_or_name, stage_or_name)
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"unknown recognition profile: {name}") from None
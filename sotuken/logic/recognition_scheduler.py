@@ -0,0 +1,103 @@
+# 認識スケジューラ
+# 固定の「3フレームに1回」「1/4縮小」をやめ、実測した検出・特徴量計算の時間と
+# フレーム間の動き量から、今のフレームで認識するか・どの縮小率で認識するかを決める。
+import time
+import cv2
+import numpy as np
+
+# ===============================
+# 定数
+# ===============================
+TARGET_STREAM_FPS = 15            # 配信の目標FPS（これより頻繁には認識しない）
+CPU_BUDGET = 0.5                  # 1セッションが認識に使ってよいCPU時間の割合（1コア比）
+TARGET_LATENCY = 0.15             # 1回の認識（検出＋特徴量）にかけてよい時間（秒）
+SCALES = (0.2, 0.25, 0.33, 0.5)   # 選べる縮小率（小さいほど速い）
+DEFAULT_SCALE = 0.25
+MOTION_THRESHOLD = 2.0            # face_hiding.FaceAuthApp.check_motion と同じ基準
+IDLE_INTERVAL = 1.0               # 動きも顔も無いときの認識間隔（秒）
+EWMA_ALPHA = 0.3                  # 処理時間の平滑化係数
+SCALE_COOLDOWN = 5                # 縮小率を変えた後、次に変えるまでの認識回数
+MOTION_SIZE = (64, 48)            # 動き量を測るための縮小サイズ
+
+
+class AdaptiveScheduler:
+    def __init__(self, target_fps=TARGET_STREAM_FPS, cpu_budget=CPU_BUDGET,
+                 target_latency=TARGET_LATENCY, scales=SCALES, scale=DEFAULT_SCALE):
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget
+        self.target_latency = target_latency
+        self.scales = tuple(sorted(scales))
+        self._scale_idx = min(range(len(self.scales)), key=lambda i: abs(self.scales[i] - scale))
+
+        self.latency = None          # 平滑化した1回あたりの処理時間
+        self.detect_latency = None
+        self.encode_latency = None
+        self.motion_score = 0.0
+        self.faces_seen = False
+
+        self._last_run = 0.0
+        self._prev_gray = None
+        self._cooldown = 0
+
+    @property
+    def scale(self):
+        return self.scales[self._scale_idx]
+
+    # ---------- 判定 ----------
+    def motion(self, frame):
+        """縮小したグレー画像の前回との差分平均（安い動き量）"""
+        gray = cv2.cvtColor(cv2.resize(frame, MOTION_SIZE, interpolation=cv2.INTER_AREA),
+                            cv2.COLOR_BGR2GRAY)
+        prev, self._prev_gray = self._prev_gray, gray
+        if prev is None:
+            return float("inf")
+        self.motion_score = float(np.mean(cv2.absdiff(gray, prev)))
+        return self.motion_score
+
+    def interval(self):
+        """次の認識までに空けるべき時間"""
+        interval = 1.0 / self.target_fps
+        if self.latency is not None:
+            # 処理時間 / 間隔 <= CPU_BUDGET となるように間隔を広げる
+            interval = max(interval, self.latency / self.cpu_budget)
+        return interval
+
+    def should_run(self, frame, now=None):
+        """このフレームで認識を行うべきか"""
+        now = time.time() if now is None else now
+        motion = self.motion(frame)
+        elapsed = now - self._last_run
+
+        if elapsed < self.interval():
+            return False
+        # 静止していて顔も無ければ間隔を大きく空ける
+        if motion < MOTION_THRESHOLD and not self.faces_seen and elapsed < IDLE_INTERVAL:
+            return False
+
+        self._last_run = now
+        return True
+
+    # ---------- 計測結果の反映 ----------
+    @staticmethod
+    def _ewma(old, new):
+        return new if old is None else (1 - EWMA_ALPHA) * old + EWMA_ALPHA * new
+
+    def record(self, detect_time, encode_time, faces_found):
+        """1回分の処理時間を記録し、縮小率を調整する"""
+        self.detect_latency = self._ewma(self.detect_latency, detect_time)
+        self.encode_latency = self._ewma(self.encode_latency, encode_time)
+        self.latency = self._ewma(self.latency, detect_time + encode_time)
+        self.faces_seen = faces_found
+
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return
+
+        # 検出時間は縮小率の2乗にほぼ比例するので1段ずつ動かす
+        if self.detect_latency > self.target_latency and self._scale_idx > 0:
+            self._scale_idx -= 1
+            self._cooldown = SCALE_COOLDOWN
+        elif (self.detect_latency < self.target_latency * 0.4
+              and self._scale_idx < len(self.scales) - 1):
+            self._scale_idx += 1
+            self._cooldown = SCALE_COOLDOWN
@@ -0,0 +1,175 @@
+# 顔特徴量計算サービス
+# 全セッションの認識スレッドから顔の切り出し画像を集め、短い時間窓でまとめて
+# プロセスプールに投げる。結果は Future で各セッションに返す。
+# （Flask のスレッド同士が GIL を取り合わず、複数コアで並列に計算できる）
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import face_recognition
+
+from logic.recognition_profiles import get_profile
+
+# ===============================
+# 定数
+# ===============================
+RECOGNITION_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # 0 なら呼び出し元スレッドで計算
+MAX_BATCH_SIZE = 8        # 1バッチに入れる顔の最大数
+MAX_WAIT = 0.01           # バッチが埋まるのを待つ最大時間（秒）
+CROP_MARGIN = 0.25        # 切り出し時に顔枠の周りに付ける余白（枠サイズ比）
+
+
+def crop_face(rgb, location, margin=CROP_MARGIN):
+    """
+    顔の周辺だけを切り出し、切り出し画像内での顔枠と一緒に返す
+    （プロセス間で送るデータ量を減らす）
+    """
+    t, r, b, l = location
+    h, w = rgb.shape[:2]
+    m = int(max(b - t, r - l) * margin)
+    top, left = max(0, t - m), max(0, l - m)
+    bottom, right = min(h, b + m), min(w, r + m)
+    crop = rgb[top:bottom, left:right].copy()
+    return crop, (t - top, r - left, b - top, l - left)
+
+
+def _encode_batch(items, num_jitters=1, model="small"):
+    """ワーカープロセスで実行：[(crop, location), ...] -> [encoding or None, ...]"""
+    results = []
+    for crop, location in items:
+        enc = face_recognition.face_encodings(crop, [location], num_jitters=num_jitters, model=model)
+        results.append(enc[0] if enc else None)
+    return results
+
+
+class RecognitionService:
+    def __init__(self, workers=RECOGNITION_WORKERS, batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT,
+                 num_jitters=1, model="small"):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.num_jitters = num_jitters
+        self.model = model
+
+        self._queue = queue.Queue()
+        self._pool = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # ---------- 起動・停止 ----------
+    def _ensure_started(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._batch_loop, daemon=True)
+                self._thread.start()
+
+    def shutdown(self):
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread = None
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    # ---------- 受付 ----------
+    def submit(self, rgb, locations):
+        """
+        1フレーム分の顔特徴量計算を依頼し、Future を返す
+        Future の結果は locations と同じ長さ・同じ順のリスト（特徴量を作れなかった顔は None）
+        """
+        future = Future()
+        if not locations:
+            future.set_result([])
+            return future
+
+        if self.workers <= 0:
+            # プールを使わない設定：その場で計算する
+            try:
+                future.set_result(face_recognition.face_encodings(
+                    rgb, locations, num_jitters=self.num_jitters, model=self.model))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_started()
+        parts = [Future() for _ in locations]
+        for part, location in zip(parts, locations):
+            self._queue.put((crop_face(rgb, location), part))
+
+        # 顔ごとの結果を1フレーム分にまとめる
+        collect_lock = threading.Lock()
+
+        def _collect(_):
+            with collect_lock:
+                if future.done() or not all(p.done() for p in parts):
+                    return
+                try:
+                    # None も残して位置をそろえる（詰めると後ろの顔の結果がずれる）
+                    future.set_result([p.result() for p in parts])
+                except Exception as e:
+                    future.set_exception(e)
+
+        for part in parts:
+            part.add_done_callback(_collect)
+        return future
+
+    def encode(self, rgb, locations, timeout=None):
+        """submit().result() の省略形"""
+        return self.submit(rgb, locations).result(timeout)
+
+    # ---------- バッチ処理 ----------
+    def _batch_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            # 最初の1件が来てから max_wait 秒だけ待って、バッチを埋める
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        items = [crop for crop, _ in batch]
+        parts = [part for _, part in batch]
+        try:
+            job = self._pool.submit(_encode_batch, items, self.num_jitters, self.model)
+        except Exception as e:
+            for part in parts:
+                part.set_exception(e)
+            return
+
+        def _done(job):
+            try:
+                results = job.result()
+            except Exception as e:
+                for part in parts:
+                    part.set_exception(e)
+                return
+            for part, enc in zip(parts, results):
+                part.set_result(enc)
+
+        job.add_done_callback(_done)
+
+
+# プロセス全体で共有するサービス（配信用のプロファイルの設定で計算する）
+_stream_profile = get_profile("stream")
+RECOGNITION_SERVICE = RecognitionService(num_jitters=_stream_profile.jitters, model=_stream_profile.landmarks)
@@ -1,56 +1,76 @@
-# 暗号化とDB登録（パスワード付き）
-import sqlite3
-import bcrypt
-from crypto_utils import encrypt_bytes
-
-DB_NAME = "faces.db"
-
-def register_user(name: str, password: str):
-    """ユーザーを登録（パスワードをハッシュ化して保存）"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    # bcryptで安全にパスワードをハッシュ化
-    hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-
-    c.execute("INSERT INTO users (name, password_hash) VALUES (?, ?)", (name, hashed_pw))
-    user_id = c.lastrowid
-    conn.commit()
-    conn.close()
-
-    print(f"ユーザー '{name}' (ID: {user_id}) を登録しました。")
-    return user_id
-
-
-def register_face(user_id: int, image_path: str):
-    """顔画像を暗号化してDBに登録"""
-    with open(image_path, "rb") as f:
-        raw_data = f.read()
-
-    # 暗号化
-    enc_data = encrypt_bytes(raw_data)
-
-    # DBに登録
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("INSERT INTO faces (user_id, face_data) VALUES (?, ?)", (user_id, enc_data))
-    face_id = c.lastrowid
-    conn.commit()
-    conn.close()
-
-    print(f"ユーザーID {user_id} の顔画像 (Face ID: {face_id}) を登録しました。")
-
-    # ID と暗号化データを返す
-    return face_id, enc_data
-
-
-if __name__ == "__main__":
-    name = input("ユーザー名を入力してください: ")
-    password = input("パスワードを入力してください: ")
-    image_path = input("登録する画像のパスを入力してください: ")
-
-    # 1️⃣ ユーザーを登録
-    user_id = register_user(name, password)
-
-    # 2️⃣ そのユーザーに顔画像を登録
+# 暗号化とDB登録（パスワード付き）
+import sqlite3
+import bcrypt
+import numpy as np
+from crypto_utils import encrypt_bytes
+from db_create import ensure_embedding_column
+from face_utils import get_face_embedding
+
+DB_NAME = "faces.db"
+EMBEDDING_DTYPE = np.float32   # 保存する特徴量の型（128 x 4 = 512バイト）
+
+
+def encrypt_embedding(embedding) -> bytes:
+    """顔特徴量を float32 のバイト列にして暗号化する"""
+    return encrypt_bytes(np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes())
+
+
+def register_user(name: str, password: str):
+    """ユーザーを登録（パスワードをハッシュ化して保存）"""
+    conn = sqlite3.connect(DB_NAME)
+    c = conn.cursor()
+
+    # bcryptで安全にパスワードをハッシュ化
+    hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+    c.execute("INSERT INTO users (name, password_hash) VALUES (?, ?)", (name, hashed_pw))
+    user_id = c.lastrowid
+    conn.commit()
+    conn.close()
+
+    print(f"ユーザー '{name}' (ID: {user_id}) を登録しました。")
+    return user_id
+
+
+def register_face(user_id: int, image_path: str):
+    """顔画像と顔特徴量を暗号化してDBに登録"""
+    with open(image_path, "rb") as f:
+        raw_data = f.read()
+
+    # 特徴量は登録時に1回だけ作る（復元時に画像から作り直さなくてよいように）
+    try:
+        enc_embedding = encrypt_embedding(get_face_embedding(raw_data))
+    except ValueError as e:
+        # 顔が見つからない画像も従来どおり登録する（復元時は画像から作り直す）
+        print(f"ユーザーID {user_id} の特徴量を作成できませんでした: {e}")
+        enc_embedding = None
+
+    # 暗号化
+    enc_data = encrypt_bytes(raw_data)
+
+    # DBに登録
+    conn = sqlite3.connect(DB_NAME)
+    ensure_embedding_column(conn)
+    c = conn.cursor()
+    c.execute("INSERT INTO faces (user_id, face_data, face_embedding) VALUES (?, ?, ?)",
+              (user_id, enc_data, enc_embedding))
+    face_id = c.lastrowid
+    conn.commit()
+    conn.close()
+
+    print(f"ユーザーID {user_id} の顔画像 (Face ID: {face_id}) を登録しました。")
+
+    # ID と暗号化データを返す
+    return face_id, enc_data
+
+
+if __name__ == "__main__":
+    name = input("ユーザー名を入力してください: ")
+    password = input("パスワードを入力してください: ")
+    image_path = input("登録する画像のパスを入力してください: ")
+
+    # 1️⃣ ユーザーを登録
+    user_id = register_user(name, password)
+
+    # 2️⃣ そのユーザーに顔画像を登録
     register_face(user_id, image_path)
\ No newline at end of file
@@ -1,37 +1,185 @@
-import sqlite3
-from crypto_utils import decrypt_bytes
-from face_utils import get_face_embedding  # 顔特徴量生成用
-import gc
-
-DB_NAME = "faces.db"
-
-def restore_all_face_embeddings() -> dict:
-    """
-    DB内のすべての顔データを復号して
-    {user_id: 顔特徴量(numpy配列)} の辞書として返す
-    名前指定なし、比較は行わない
-    """
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT user_id, face_data FROM faces")
-    rows = c.fetchall()
-    conn.close()
-
-    embeddings = {}
-    for user_id, enc_data in rows:
-        try:
-            decrypted_data = decrypt_bytes(enc_data)  # 暗号化データを復号
-            embedding = get_face_embedding(decrypted_data)  # 特徴量取得
-            embeddings[user_id] = embedding
-        except Exception as e:
-            print(f"ユーザー {user_id} の復号・特徴量取得に失敗: {e}")
-        finally:
-            # メモリ解放
-            del decrypted_data
-            gc.collect()
-
-    return embeddings
-
-if __name__ == "__main__":
-    all_embeddings = restore_all_face_embeddings()
-    print(f"{len(all_embeddings)} 件の顔データを復号しました")
\ No newline at end of file
+import os
+import sqlite3
+from collections import deque
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from crypto_utils import encrypt_bytes, decrypt_bytes, decrypt_fixed_size_bulk
+from db_create import ensure_embedding_column
+from face_utils import get_face_embedding  # 顔特徴量生成用
+
+DB_NAME = "faces.db"
+EMBEDDING_DIM = 128
+EMBEDDING_DTYPE = np.float32   # register_face.py で保存した型
+EMBEDDING_BYTES = EMBEDDING_DIM * np.dtype(EMBEDDING_DTYPE).itemsize
+
+# ===============================
+# 復元の設定
+# ===============================
+CHUNK_SIZE = 256          # 1回に DB から読む行数（メモリ使用量はこの行数で決まる）
+MAX_PENDING_CHUNKS = 2    # 画像から作り直すとき、同時にプロセスプールへ渡しておくチャンク数
+
+
+def _iter_chunks(conn, column, stored, chunk_size):
+    """
+    faces を id の順に chunk_size 行ずつ読む（fetchall で全件をメモリに載せない）
+    stored=True なら face_embedding がある行、False なら無い行
+    id で区切って読むので、読み込みの合間に同じ接続で UPDATE してよい
+    """
+    condition = "IS NOT NULL" if stored else "IS NULL"
+    last_id = -1
+    while True:
+        rows = conn.execute(
+            f"SELECT id, user_id, {column} FROM faces "
+            f"WHERE face_embedding {condition} AND id > ? ORDER BY id LIMIT ?",
+            (last_id, chunk_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _decrypt_embeddings(rows):
+    """暗号化した特徴量をまとめて復号し (件数, 128) の float32 行列にする"""
+    enc_list = [enc for _, _, enc in rows]
+    try:
+        plain = decrypt_fixed_size_bulk(enc_list, EMBEDDING_BYTES)
+        return plain.view(EMBEDDING_DTYPE), [True] * len(rows)
+    except ValueError:
+        pass
+
+    # 壊れたデータが混ざっているときだけ1件ずつ復号して、その行を除く
+    matrix = np.zeros((len(rows), EMBEDDING_DIM), dtype=EMBEDDING_DTYPE)
+    ok = []
+    for i, (_, user_id, enc) in enumerate(rows):
+        try:
+            matrix[i] = np.frombuffer(decrypt_bytes(enc), dtype=EMBEDDING_DTYPE)
+            ok.append(True)
+        except ValueError as e:
+            print(f"ユーザー {user_id} の特徴量の復号に失敗: {e}")
+            ok.append(False)
+    return matrix, ok
+
+
+def _embed_row(row):
+    """（プロセスプール内）画像を復号して特徴量を作る。失敗したら理由を返す"""
+    face_id, user_id, enc_data = row
+    try:
+        embedding = get_face_embedding(decrypt_bytes(enc_data))
+        return face_id, user_id, np.asarray(embedding, dtype=EMBEDDING_DTYPE), None
+    except Exception as e:
+        return face_id, user_id, None, str(e)
+
+
+def _print_progress(done, total):
+    print(f"\r顔データを復元中: {done}/{total}", end="\n" if done >= total else "", flush=True)
+
+
+class _Restorer:
+    """チャンクごとの結果を集め、進捗の通知と特徴量の書き戻しを行う"""
+
+    def __init__(self, conn, total, progress, backfill):
+        self.conn = conn
+        self.total = total
+        self.progress = progress
+        self.backfill = backfill
+        self.done = 0
+        self.face_ids, self.user_ids, self.matrices = [], [], []
+
+    def add(self, face_ids, user_ids, matrix, n_rows):
+        self.face_ids.append(np.asarray(face_ids, dtype=np.int64))
+        self.user_ids.append(np.asarray(user_ids, dtype=np.int64))
+        self.matrices.append(matrix.reshape(-1, EMBEDDING_DIM))
+        self.done += n_rows
+        if self.progress is not None:
+            self.progress(self.done, self.total)
+
+    def add_embedded(self, results, n_rows):
+        """画像から作り直した結果を受け取る（次回からは復号だけで済むように DB に書き戻す）"""
+        ok = []
+        for face_id, user_id, embedding, error in results:
+            if error is not None:
+                print(f"ユーザー {user_id} の復号・特徴量取得に失敗: {error}")
+            else:
+                ok.append((face_id, user_id, embedding))
+        if self.backfill and ok:
+            self.conn.executemany(
+                "UPDATE faces SET face_embedding = ? WHERE id = ?",
+                [(encrypt_bytes(e.tobytes()), face_id) for face_id, _, e in ok])
+            self.conn.commit()
+        matrix = np.array([e for _, _, e in ok], dtype=EMBEDDING_DTYPE)
+        self.add([f for f, _, _ in ok], [u for _, u, _ in ok], matrix, n_rows)
+
+    def result(self):
+        if not self.matrices:
+            return np.empty(0, dtype=np.int64), np.empty((0, EMBEDDING_DIM), dtype=EMBEDDING_DTYPE)
+        face_ids = np.concatenate(self.face_ids)
+        # 登録順（faces.id の順）に並べる
+        order = np.argsort(face_ids, kind="stable")
+        return np.concatenate(self.user_ids)[order], np.concatenate(self.matrices)[order]
+
+
+def restore_embedding_matrix(chunk_size=CHUNK_SIZE, workers=None, progress=_print_progress,
+                             backfill=True):
+    """
+    DB内のすべての顔特徴量を復号して (user_ids, 特徴量行列) を返す
+    user_ids: (件数,) の int64 配列 / 特徴量行列: (件数, 128) の float32（faces.id の順）
+    ・登録時に保存した 512 バイトの特徴量は、チャンクごとにまとめて復号する
+    ・特徴量が無い（以前の版で登録した）行は、画像の復号と特徴量作成をプロセスプールで並列に行い、
+      backfill=True なら作った特徴量を face_embedding に書き戻す
+    workers: プロセス数（None なら CPU 数、0 ならプロセスプールを使わずにこのプロセスで処理する）
+    progress: progress(処理済み行数, 全行数) をチャンクごとに呼ぶ（None なら何もしない）
+    """
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        ensure_embedding_column(conn)
+        total = conn.execute("SELECT COUNT(*) FROM faces").fetchone()[0]
+        restorer = _Restorer(conn, total, progress, backfill)
+
+        for rows in _iter_chunks(conn, "face_embedding", True, chunk_size):
+            matrix, ok = _decrypt_embeddings(rows)
+            kept = [row for row, good in zip(rows, ok) if good]
+            restorer.add([r[0] for r in kept], [r[1] for r in kept], matrix[np.array(ok, dtype=bool)],
+                         len(rows))
+
+        legacy_chunks = _iter_chunks(conn, "face_data", False, chunk_size)
+        first = next(legacy_chunks, None)
+        if first is not None and workers == 0:
+            # プロセスを起動しない（GUI など、spawn で読み込み直されると困る呼び出し元向け）
+            for chunk in chain([first], legacy_chunks):
+                restorer.add_embedded(map(_embed_row, chunk), len(chunk))
+        elif first is not None:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # 先読みするチャンク数を制限して、メモリに載る画像を chunk_size 程度に抑える
+                pending = deque()
+                for chunk in chain([first], legacy_chunks):
+                    per_task = max(1, len(chunk) // (workers * 4))
+                    pending.append((pool.map(_embed_row, chunk, chunksize=per_task), len(chunk)))
+                    if len(pending) >= MAX_PENDING_CHUNKS:
+                        restorer.add_embedded(*pending.popleft())
+                while pending:
+                    restorer.add_embedded(*pending.popleft())
+
+        return restorer.result()
+    finally:
+        conn.close()
+
+
+def restore_all_face_embeddings(**kwargs) -> dict:
+    """
+    DB内のすべての顔データを復号して
+    {user_id: 顔特徴量の行列 (枚数, 128)} の辞書として返す
+    同じユーザーが複数枚登録している場合は全ての特徴量を残す（登録順）
+    名前指定なし、比較は行わない
+    """
+    user_ids, matrix = restore_embedding_matrix(**kwargs)
+    order = np.argsort(user_ids, kind="stable")
+    uniq, starts = np.unique(user_ids[order], return_index=True)
+    groups = np.split(matrix[order], starts[1:])
+    return {int(user_id): group for user_id, group in zip(uniq, groups)}
+
+if __name__ == "__main__":
+    all_embeddings = restore_all_face_embeddings()
+    count = sum(len(m) for m in all_embeddings.values())
+    print(f"{len(all_embeddings)} 人分・{count} 件の顔データを復号しました")
@@ -0,0 +1,142 @@
+# カメラ映像のパイプライン処理
+# 取得（capture）・認識（recognize）・描画/JPEG化（encode）を別々のペースで動かす。
+# 各段の間は上限付きキューで、いっぱいのときは古いフレームを捨てる。
+import threading
+import time
+from collections import deque
+
+# ===============================
+# 定数
+# ===============================
+FRAME_QUEUE_SIZE = 1      # 配信用キュー（常に最新フレームだけ持つ）
+RECOGNITION_QUEUE_SIZE = 1
+QUEUE_TIMEOUT = 1.0       # フレームが来ないときの待ち時間（秒）
+
+
+class LatestQueue:
+    """上限付きキュー（満杯なら古いものから捨てる）"""
+
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """取り出す（timeout まで来なければ None）"""
+        with self._cond:
+            if not self._items and not self.closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class StreamPipeline:
+    """
+    capture:   引数なしで (ret, frame) を返す関数（cap.read など）
+    recognize: フレームを受け取り認識結果を返す関数（認識スレッドで実行、None なら結果を更新しない）
+    frames() で (最新フレーム, 最新の認識結果) を順に取り出し、呼び出し側で描画・JPEG化する
+    """
+
+    def __init__(self, capture, recognize,
+                 frame_queue_size=FRAME_QUEUE_SIZE,
+                 recognition_queue_size=RECOGNITION_QUEUE_SIZE):
+        self.capture = capture
+        self.recognize = recognize
+
+        self.frame_queue = LatestQueue(frame_queue_size)
+        self.recognition_queue = LatestQueue(recognition_queue_size)
+
+        self._result = None
+        self._result_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+        # False にすると認識スレッドは新しいフレームを処理しない
+        self.recognition_enabled = True
+
+    # ---------- 各ステージ ----------
+    def _capture_loop(self):
+        """カメラから読み続け、最新フレームを両方のキューに入れる"""
+        while not self._stop.is_set():
+            ret, frame = self.capture()
+            if not ret:
+                break
+            self.frame_queue.put(frame)
+            if self.recognition_enabled:
+                self.recognition_queue.put(frame)
+        self._stop.set()
+        self.frame_queue.close()
+        self.recognition_queue.close()
+
+    def _recognition_loop(self):
+        """自分のペースで最新フレームを認識する"""
+        while not self._stop.is_set():
+            frame = self.recognition_queue.get(QUEUE_TIMEOUT)
+            if frame is None or not self.recognition_enabled:
+                continue
+            try:
+                result = self.recognize(frame)
+            except Exception as e:
+                print(f"認識処理でエラー: {e}")
+                continue
+            if result is None:
+                continue
+            with self._result_lock:
+                self._result = result
+
+    # ---------- 制御 ----------
+    def start(self):
+        for target in (self._capture_loop, self._recognition_loop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout=None):
+        """
+        各スレッドを止めて終了を待つ（取得スレッドが capture() から戻るまで待つので、
+        この後なら入力元を閉じてよい）。timeout を過ぎても終わらなければ False
+        """
+        self._stop.set()
+        self.frame_queue.close()
+        self.recognition_queue.close()
+        deadline = None if timeout is None else time.time() + timeout
+        for t in self._threads:
+            t.join(None if deadline is None else max(0.0, deadline - time.time()))
+        alive = any(t.is_alive() for t in self._threads)
+        if not alive:
+            self._threads = []
+        return not alive
+
+    @property
+    def result(self):
+        with self._result_lock:
+            return self._result
+
+    @property
+    def dropped_frames(self):
+        return self.frame_queue.dropped
+
+    def frames(self):
+        """配信ステージ：最新フレームと最新の認識結果を返し続ける"""
+        while not self._stop.is_set():
+            frame = self.frame_queue.get(QUEUE_TIMEOUT)
+            if frame is None:
+                if self.frame_queue.closed:
+                    break
+                continue
+            yield frame, self.result
@@ -0,0 +1,14 @@
+# 認証のしきい値（顔の特徴量の距離の許容値）
+# face_auth_core は import 時に DB・状態ストア・カメラ・認識プロセスを用意するので、
+# bench/ の評価スクリプトなどがしきい値だけ使えるように分けておく。
+# ※ このファイルでは標準ライブラリ以外を import しないこと
+import os
+
+# ===============================
+# 定数
+# ===============================
+# 許容値（1:N。誰か登録者に近ければ認証する）
+TOLERANCE_THRESHOLD = 1
+# 1:1 照合（?claim=<id>）の許容値。ID は誰でも指定できるので 1:N より厳しくする
+# bench.eval_accuracy の「FAR<=0.001 の推奨しきい値」で置き換えること
+VERIFY_THRESHOLD = float(os.environ.get("FACE_VERIFY_THRESHOLD", "0.5"))
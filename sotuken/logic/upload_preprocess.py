@@ -0,0 +1,94 @@
+# 登録画像のアップロード時の前処理
+# アップロードされた画像をそのまま保存すると、巨大な写真や顔の写っていない写真が
+# picture/ に残り、ギャラリーを読み込むたびに無駄な処理になる。そこで受け取った時点で
+#   展開 → 長辺 NORMALIZED_MAX_SIDE の JPEG に縮小して保存 → 顔がちょうど1つあるか確認 → 特徴量を作って保存
+# をスレッドプールで並列に行い、使えない画像はすぐに登録画面へ返す。
+# 保存した特徴量（face_gallery.embedding_sidecar_path）はギャラリーの読み込み時にそのまま使われる。
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from werkzeug.utils import secure_filename
+
+from logic.image_io import open_image, load_rgb, thread_buffer
+from logic.recognition_profiles import get_profile
+from logic.face_gallery import embedding_sidecar_path
+
+# ===============================
+# 定数
+# ===============================
+NORMALIZED_MAX_SIDE = 1024   # 保存する画像の長辺（ギャラリーの読み込み時はさらに縮小される）
+NORMALIZED_QUALITY = 90
+UPLOAD_WORKERS = 4
+
+_executor = ThreadPoolExecutor(UPLOAD_WORKERS, thread_name_prefix="face-upload")
+
+
+class UploadResult:
+    def __init__(self, original, filename=None, reason=None):
+        self.original = original    # アップロード時のファイル名
+        self.filename = filename    # 保存したファイル名（失敗時は None）
+        self.reason = reason        # 使えなかった理由（成功時は None）
+
+    @property
+    def ok(self):
+        return self.reason is None
+
+
+def _unique_names(originals):
+    """保存名を決める（拡張子は .jpg に統一。日本語名などで空になる場合や重複は番号を付ける）"""
+    names, used = [], set()
+    for i, original in enumerate(originals):
+        stem = secure_filename(os.path.splitext(original)[0]) or f"face_{i + 1}"
+        name, n = f"{stem}.jpg", 1
+        while name in used:
+            name = f"{stem}_{n}.jpg"
+            n += 1
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def _process(data, original, path):
+    """1枚分の前処理（スレッドプール内で実行）"""
+    try:
+        img = open_image(data, max_side=NORMALIZED_MAX_SIDE)
+    except Exception:
+        return UploadResult(original, reason="画像として読み込めません")
+
+    img.save(path, "JPEG", quality=NORMALIZED_QUALITY)
+    try:
+        # ギャラリーの読み込み時と同じ読み方・同じ設定で検出する（保存する特徴量が一致するように）
+        rgb = load_rgb(path, buffer=thread_buffer())
+        profile = get_profile("gallery")
+        locations = profile.locations(rgb)
+        if not locations:
+            raise ValueError("顔が検出できませんでした")
+        if len(locations) > 1:
+            raise ValueError(f"顔が {len(locations)} 人分写っています（1人だけの画像にしてください）")
+        embedding = profile.encodings(rgb, locations)[0]
+        np.save(embedding_sidecar_path(path), embedding)
+    except Exception as e:
+        _remove(path)
+        return UploadResult(original, reason=str(e))
+    return UploadResult(original, filename=os.path.basename(path))
+
+
+def _remove(path):
+    for p in (path, embedding_sidecar_path(path)):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+
+
+def preprocess_uploads(files, dest_dir):
+    """
+    アップロードされたファイル（werkzeug の FileStorage）を dest_dir に前処理して保存し、
+    UploadResult のリストを入力と同じ順で返す
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    originals = [f.filename for f in files]
+    # FileStorage の読み込みはリクエストのスレッドで行い、重い処理だけを並列にする
+    data = [f.read() for f in files]
+    paths = [os.path.join(dest_dir, name) for name in _unique_names(originals)]
+    return list(_executor.map(_process, data, originals, paths))
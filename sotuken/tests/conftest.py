@@ -0,0 +1,5 @@
+# tests/ から logic パッケージを import できるようにする（sotuken/ で python -m pytest を実行する）
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
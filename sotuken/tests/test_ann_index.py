@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from logic.ann_index import IVFIndex
+
+DIM = 32
+
+
+def _clustered(n, seed=0, centers=20):
+    """クラスタのあるデータ（実際の顔の特徴量も人ごとにまとまる）"""
+    rng = np.random.default_rng(seed)
+    c = rng.normal(size=(centers, DIM))
+    x = c[rng.integers(centers, size=n)] + 0.3 * rng.normal(size=(n, DIM))
+    return x.astype(np.float32)
+
+
+def _recall(index, vectors, queries, k=10, **kwargs):
+    """ANN の上位 k 件に含まれる、全件探索の上位 k 件の割合"""
+    hits = 0
+    for q, (_, ids) in zip(queries, index.search(queries, k=k, **kwargs)):
+        exact = np.argsort(np.linalg.norm(vectors - q, axis=1))[:k]
+        hits += len(set(exact.tolist()) & set(ids.tolist()))
+    return hits / (k * len(queries))
+
+
+@pytest.fixture(scope="module")
+def data():
+    vectors = _clustered(3000)
+    queries = _clustered(50, seed=1)
+    return vectors, queries
+
+
+@pytest.mark.parametrize("pq_m", [0, 8])
+def test_recall_against_brute_force(data, pq_m):
+    vectors, queries = data
+    index = IVFIndex(dim=DIM, nlist=32, nprobe=8, pq_m=pq_m, rerank=200)
+    index.train(vectors)
+    index.add(vectors, [str(i) for i in range(len(vectors))])
+
+    assert _recall(index, vectors, queries) >= 0.9
+    assert _recall(index, vectors, queries, exact=True) == 1.0
+
+
+def test_untrained_index_is_exact(data):
+    vectors, queries = data
+    index = IVFIndex(dim=DIM)
+    index.add(vectors[:200], ["a"] * 200)
+    assert _recall(index, vectors[:200], queries) == 1.0
+
+
+def test_remove_and_compact(data):
+    vectors, _ = data
+    index = IVFIndex(dim=DIM, nlist=16)
+    index.train(vectors)
+    ids = index.add(vectors[:100], [f"u{i % 10}" for i in range(100)])
+
+    index.remove(ids[:50])
+    assert len(index) == 50
+    assert index.deleted_fraction == pytest.approx(0.5)
+    _, found = index.search(vectors[0], k=1)[0]
+    assert found[0] != ids[0]
+
+    index.compact()
+    assert len(index) == 50
+    assert index.deleted_fraction == 0.0
+    # 詰めた後も同じ特徴量が自分自身を最近傍として返す
+    dist, found = index.search(vectors[60], k=1, exact=True)[0]
+    assert dist[0] == pytest.approx(0.0, abs=1e-3)
+    assert index.label(found[0]) == "u0"
+
+
+def test_match_groups_by_user(data):
+    vectors, _ = data
+    index = IVFIndex(dim=DIM, nlist=16)
+    index.train(vectors)
+    index.add(vectors[:100], [f"u{i % 10}" for i in range(100)])
+
+    top = index.match(vectors[3], k=3)[0]
+    assert top[0][0] == "u3"
+    assert len({user for user, _ in top}) == 3
+
+
+def test_save_and_load(tmp_path, data):
+    vectors, queries = data
+    index = IVFIndex(dim=DIM, nlist=16, pq_m=4)
+    index.train(vectors)
+    ids = index.add(vectors[:500], [str(i) for i in range(500)])
+    index.remove(ids[:10])
+
+    path = tmp_path / "index.npz"
+    index.save(path)
+    loaded = IVFIndex.load(path)
+
+    assert len(loaded) == len(index)
+    for (d1, i1), (d2, i2) in zip(index.search(queries, k=5), loaded.search(queries, k=5)):
+        np.testing.assert_array_equal(i1, i2)
+        np.testing.assert_allclose(d1, d2, rtol=1e-5)
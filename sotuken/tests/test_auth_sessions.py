@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+
+from logic import auth_sessions
+from logic.auth_sessions import (
+    AttemptLimiter, FaceAuthState, MemorySessionStore, SqliteSessionStore,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(auth_sessions.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, clock):
+    if request.param == "memory":
+        return MemorySessionStore(ttl=10)
+    return SqliteSessionStore(path=str(tmp_path / "auth.db"), ttl=10)
+
+
+def _state(username="alice"):
+    state = FaceAuthState()
+    state.username = username
+    return state
+
+
+def test_get_and_pop(store):
+    store.save("sid", _state())
+    assert store.get("sid").username == "alice"
+    assert "sid" in store
+    assert store.pop("sid").username == "alice"
+    assert store.get("sid") is None
+    assert store.get("", "default") == "default"
+
+
+def test_ttl_expiry(store, clock):
+    store.save("sid", _state())
+    clock.now += 9
+    assert store.get("sid") is not None
+
+    clock.now += 11
+    assert store.get("sid") is None
+    with pytest.raises(KeyError):
+        store["sid"]
+
+
+def test_purge_drops_only_expired(store, clock):
+    store.save("old", _state("old"))
+    clock.now += 6
+    store.save("new", _state("new"))
+    clock.now += 6
+
+    store.purge()
+    assert len(store) == 1
+    assert store.get("new").username == "new"
+
+
+def test_memory_store_is_bounded(clock):
+    store = MemorySessionStore(max_size=4, stripes=1)
+    for i in range(10):
+        store.save(f"sid{i}", _state())
+    assert len(store) == 4
+    assert store.get("sid0") is None
+    assert store.get("sid9") is not None
+
+
+def test_memory_store_touch_extends_ttl(clock):
+    store = MemorySessionStore(ttl=10)
+    store.save("sid", _state())
+    for _ in range(3):
+        clock.now += 8
+        assert store.get("sid") is not None
+
+
+def test_wait_for_change_wakes_on_save():
+    store = MemorySessionStore()
+    state = _state()
+    store.save("sid", state)
+    last = state.snapshot()
+
+    def authenticate():
+        changed = _state()
+        changed.authenticated = True
+        store.save("sid", changed)
+
+    timer = threading.Timer(0.05, authenticate)
+    timer.start()
+    changed, snap = store.wait_for_change("sid", last, timeout=5)
+    timer.join()
+    assert changed.authenticated
+    assert snap != last
+
+
+def test_attempt_limiter_window():
+    limiter = AttemptLimiter(max_attempts=2, window=60)
+    assert limiter.hit("sid:a", now=0)
+    assert limiter.hit("sid:a", now=1)
+    assert not limiter.hit("sid:a", now=2)
+    # 窓を過ぎれば再び試せる
+    assert limiter.hit("sid:a", now=61)
+
+
+def test_attempt_limiter_checks_every_key():
+    limiter = AttemptLimiter(max_attempts=1, window=60)
+    assert limiter.hit("sid:a", "ip:1", now=0)
+    # IP が上限なら sid を変えても通らず、新しい sid も記録されない
+    assert not limiter.hit("sid:b", "ip:1", now=1)
+    assert limiter.hit("sid:b", now=2)
+
+
+def test_attempt_limiter_is_bounded():
+    limiter = AttemptLimiter(max_attempts=1, window=60, max_keys=3)
+    for i in range(5):
+        assert limiter.hit(f"sid:{i}", now=0)
+    # 古いキーから忘れる
+    assert limiter.hit("sid:0", now=1)
+    assert not limiter.hit("sid:4", now=1)
@@ -0,0 +1,73 @@
+import pytest
+
+from logic.face_tracker import (
+    FaceTracker, UNKNOWN_NAME, MAX_MISSES, KNOWN_REENCODE, UNKNOWN_REENCODE, iou,
+)
+
+# (top, right, bottom, left)
+BOX = (100, 200, 200, 100)
+MOVED = (105, 205, 205, 105)
+FAR = (300, 500, 400, 400)
+
+
+def test_iou():
+    assert iou(BOX, BOX) == pytest.approx(1.0)
+    assert iou(BOX, FAR) == 0.0
+    # 半分ずらすと 重なり 50 / 和 150
+    assert iou(BOX, (100, 250, 200, 150)) == pytest.approx(1 / 3)
+
+
+def test_track_is_kept_while_face_moves():
+    tracker = FaceTracker()
+    (first,), need = tracker.update([BOX], now=0.0)
+    assert need == [0]
+    FaceTracker.set_identity(first, "alice", 0.3, now=0.0)
+
+    (second,), need = tracker.update([MOVED], now=0.1)
+    assert second is first
+    assert second.box == MOVED
+    # 照合済みで少ししか動いていなければ特徴量を計算し直さない
+    assert need == []
+
+
+def test_reencode_intervals():
+    tracker = FaceTracker()
+    (known,), _ = tracker.update([BOX], now=0.0)
+    FaceTracker.set_identity(known, "alice", 0.3, now=0.0)
+    assert not known.needs_encoding(KNOWN_REENCODE - 0.01)
+    assert known.needs_encoding(KNOWN_REENCODE + 0.01)
+
+    FaceTracker.set_identity(known, UNKNOWN_NAME, None, now=0.0)
+    assert known.needs_encoding(UNKNOWN_REENCODE + 0.01)
+
+
+def test_large_motion_lowers_confidence():
+    tracker = FaceTracker()
+    (track,), _ = tracker.update([BOX], now=0.0)
+    FaceTracker.set_identity(track, "alice", 0.3, now=0.0)
+
+    (same,), need = tracker.update([(130, 230, 230, 130)], now=0.1)
+    assert same is track
+    assert need == [0]
+
+
+def test_new_face_gets_new_track():
+    tracker = FaceTracker()
+    (a,), _ = tracker.update([BOX], now=0.0)
+    (a2, b), need = tracker.update([BOX, FAR], now=0.1)
+    assert a2 is a
+    assert b is not a
+    assert 1 in need
+
+
+def test_lost_track_is_dropped():
+    tracker = FaceTracker()
+    (track,), _ = tracker.update([BOX], now=0.0)
+    for i in range(MAX_MISSES):
+        tracker.update([], now=0.1 * (i + 1))
+    assert tracker.tracks == [track]
+
+    tracker.update([], now=1.0)
+    assert tracker.tracks == []
+    (again,), _ = tracker.update([BOX], now=1.1)
+    assert again is not track
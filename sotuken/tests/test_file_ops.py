@@ -0,0 +1,91 @@
+import os
+import time
+
+import pytest
+
+from logic import file_ops
+from logic.file_ops import (
+    STAGING_OWNER_FILE, collect_stale_stagings, commit_staging, create_staging,
+    discard_staging, set_staging_owner, staging_dir,
+)
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # STAGING_ROOT / PICTURE_DIR は作業ディレクトリからの相対パス
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _write(key, name, data=b"jpeg"):
+    with open(os.path.join(staging_dir(key), name), "wb") as f:
+        f.write(data)
+
+
+def test_commit_moves_whole_staging():
+    key = create_staging()
+    _write(key, "a.jpg")
+    _write(key, "b.jpg")
+    set_staging_owner(key, 7)
+
+    dst = commit_staging(key, 7)
+    assert dst == os.path.join(file_ops.PICTURE_DIR, "7")
+    assert sorted(os.listdir(dst)) == ["a.jpg", "b.jpg"]
+    assert not os.path.exists(staging_dir(key))
+
+
+def test_commit_does_not_overwrite_existing_user():
+    os.makedirs(os.path.join(file_ops.PICTURE_DIR, "7"))
+    key = create_staging()
+    _write(key, "a.jpg")
+
+    with pytest.raises(RuntimeError):
+        commit_staging(key, 7)
+    # 失敗してもステージングは残る（呼び出し側が破棄する）
+    assert os.listdir(staging_dir(key)) == ["a.jpg"]
+
+
+def test_concurrent_registrations_are_separate():
+    a, b = create_staging(), create_staging()
+    _write(a, "a.jpg")
+    _write(b, "b.jpg")
+    commit_staging(a, 1)
+
+    assert os.listdir(staging_dir(b)) == ["b.jpg"]
+    assert os.listdir(os.path.join(file_ops.PICTURE_DIR, "1")) == ["a.jpg"]
+
+
+def test_invalid_key_is_rejected():
+    for key in ("../picture", "", None, "A" * 32):
+        with pytest.raises(ValueError):
+            staging_dir(key)
+    # discard は不正なキーを無視する
+    discard_staging("../picture")
+
+
+def test_discard():
+    key = create_staging()
+    _write(key, "a.jpg")
+    discard_staging(key)
+    assert not os.path.exists(staging_dir(key))
+    discard_staging(key)
+
+
+def test_collect_stale_stagings_reports_owner():
+    stale, fresh, orphan = create_staging(), create_staging(), create_staging()
+    set_staging_owner(stale, 3)
+    set_staging_owner(fresh, 4)
+    old = time.time() - 3600
+    os.utime(staging_dir(stale), (old, old))
+    os.utime(staging_dir(orphan), (old, old))
+
+    expired = []
+    removed = collect_stale_stagings(ttl=60, on_expire=expired.append)
+    assert removed == 2
+    assert expired == ["3"]
+    assert not os.path.exists(staging_dir(stale))
+    assert os.path.exists(os.path.join(staging_dir(fresh), STAGING_OWNER_FILE))
+
+
+def test_collect_without_staging_root():
+    assert collect_stale_stagings(ttl=0) == 0
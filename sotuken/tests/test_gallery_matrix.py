@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from logic.gallery_matrix import GalleryMatrix
+
+
+def _gallery(seed=0, users=5, per_user=3, dim=128):
+    rng = np.random.default_rng(seed)
+    encodings = rng.normal(size=(users * per_user, dim)).astype(np.float32)
+    # 名前の順番を混ぜて渡す（内部でユーザーごとに並べ直される）
+    names = [f"u{i % users}" for i in range(users * per_user)]
+    return encodings, names
+
+
+def test_match_equals_brute_force():
+    encodings, names = _gallery()
+    gallery = GalleryMatrix(encodings, names)
+    queries = encodings[[0, 4, 7]] + 0.01
+
+    for q, top in zip(queries, gallery.match(queries, k=3)):
+        best = {}
+        for enc, name in zip(encodings, names):
+            d = float(np.linalg.norm(q - enc))
+            best[name] = min(d, best.get(name, np.inf))
+        expected = sorted(best.items(), key=lambda item: item[1])[:3]
+        assert [u for u, _ in top] == [u for u, _ in expected]
+        np.testing.assert_allclose([d for _, d in top], [d for _, d in expected], rtol=1e-4, atol=1e-4)
+
+
+def test_rows_grouped_by_user():
+    encodings, names = _gallery()
+    gallery = GalleryMatrix(encodings, names)
+    assert len(gallery) == len(encodings)
+    assert gallery.user_ids == sorted(set(names))
+    assert gallery.labels == sorted(names)
+
+
+def test_centroid_mode():
+    encodings, names = _gallery()
+    gallery = GalleryMatrix(encodings, names)
+    centroid = np.mean([e for e, n in zip(encodings, names) if n == "u2"], axis=0)
+
+    (user, distance), = gallery.match(centroid, k=1, mode="centroid")[0]
+    assert user == "u2"
+    assert distance == pytest.approx(0.0, abs=1e-3)
+
+
+def test_empty_gallery_and_queries():
+    assert GalleryMatrix().match(np.zeros(128)) == [[]]
+    gallery = GalleryMatrix(*_gallery())
+    assert gallery.match(np.zeros((0, 128))) == []
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        GalleryMatrix(*_gallery()).user_distances(np.zeros(128), mode="mean")
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from logic.stream_pipeline import LatestQueue, StreamPipeline
+
+
+def test_latest_queue_drops_oldest():
+    q = LatestQueue(maxsize=2)
+    for i in range(5):
+        q.put(i)
+    assert q.dropped == 3
+    assert q.get(0) == 3
+    assert q.get(0) == 4
+    assert q.get(0) is None
+
+
+def test_latest_queue_get_waits_for_put():
+    q = LatestQueue()
+    timer = threading.Timer(0.05, q.put, args=("frame",))
+    timer.start()
+    assert q.get(timeout=5) == "frame"
+    timer.join()
+
+
+def test_latest_queue_close_wakes_getter():
+    q = LatestQueue()
+    timer = threading.Timer(0.05, q.close)
+    timer.start()
+    t0 = time.monotonic()
+    assert q.get(timeout=5) is None
+    assert time.monotonic() - t0 < 4
+    timer.join()
+
+
+def _counting_capture(limit, delay=0.001):
+    counter = iter(range(limit))
+
+    def capture():
+        time.sleep(delay)
+        i = next(counter, None)
+        return (i is not None), i
+    return capture
+
+
+def test_pipeline_yields_frames_until_capture_ends():
+    pipeline = StreamPipeline(_counting_capture(50), lambda frame: ("seen", frame)).start()
+    frames = [frame for frame, _ in pipeline.frames()]
+    assert pipeline.stop(timeout=5)
+
+    # 古いフレームは捨てられるが、順番は入れ替わらない
+    assert frames == sorted(frames)
+    assert frames[-1] == 49
+    assert len(frames) + pipeline.dropped_frames == 50
+
+
+def test_slow_recognition_does_not_block_stream():
+    def slow_recognize(frame):
+        time.sleep(0.05)
+        return frame
+
+    pipeline = StreamPipeline(_counting_capture(200), slow_recognize).start()
+    results = [result for _, result in pipeline.frames()]
+    assert pipeline.stop(timeout=5)
+
+    # 認識は数回しか終わらないが、配信は止まらない
+    assert len(set(r for r in results if r is not None)) < len(results)
+
+
+def test_stop_joins_threads():
+    release = threading.Event()
+
+    def capture():
+        release.wait(5)
+        return True, "frame"
+
+    pipeline = StreamPipeline(capture, lambda frame: None).start()
+    assert not pipeline.stop(timeout=0.05)
+    release.set()
+    assert pipeline.stop(timeout=5)